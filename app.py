@@ -1,14 +1,24 @@
 import streamlit as st
 import pandas as pd
-from engine.anj_loader import load_anj_data, ANJ_URL
+from engine.anj_loader import load_anj_data, load_anj_workbook, get_refresher, get_source_ref, start_refreshers
+from engine.regulators import DEFAULT_REGULATOR, REGULATORS
+from engine.cross_sport import SPORT_SHEETS, search_all_sports
+from engine.autocomplete import suggest, record_pick
 from engine.football_handler import handle_football_search, decide_football
 from engine.badminton_handler import handle_badminton_search, decide_badminton
 from engine.golf_handler import handle_golf_search, decide_golf
-from engine.templates import TEMPLATES, get_emoji, localize_value
 from engine.snooker_handler import handle_snooker_search, decide_snooker
+from engine.query_cache import QUERY_CACHE
+from engine import chat_history as chat
+from engine.chat_history import CHAT_PAGE_SIZE, ChatHistory
+from engine import metrics
 
 # --- 1. CONFIGURATION ---
 st.set_page_config(page_title="Compliance ChatBot", layout="wide")
+ALL_SPORTS = "All sports (auto)"
+GENDER_LABELS = {"Homme": "Men", "Femme": "Women", "Mixte": "Mixed", "N/A": "Open"}
+# Durée de cette exécution du script (jusqu'au rerun ou à la fin de la page)
+RERUN_TIMER = metrics.start_timer("rerun")
 
 
 def reset_selection_state():
@@ -16,6 +26,23 @@ def reset_selection_state():
     st.session_state.options = []
 
 
+def rerun():
+    RERUN_TIMER.stop()
+    st.rerun()
+
+
+def format_age(seconds) -> str:
+    if seconds is None:
+        return "never"
+    if seconds < 60:
+        return "just now"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} min ago"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)} h ago"
+    return f"{int(seconds // 86400)} days ago"
+
+
 # --- 2. SIDEBAR ---
 with st.sidebar:
     try:
@@ -31,56 +58,204 @@ with st.sidebar:
     page = st.radio("Go to:", ["🏠 Home", "💬 Compliance ChatBot", "📂 Source Files"])
     st.divider()
 
+    # Listes de tous les régulateurs chargées en parallèle, celle choisie est servie
+    start_refreshers()
+    regulator = DEFAULT_REGULATOR
+    if len(REGULATORS) > 1:
+        regulator = st.selectbox("Regulator:", list(REGULATORS), format_func=lambda key: REGULATORS[key].name,
+                                 key="regulator", on_change=reset_selection_state)
+    SOURCE_URL = REGULATORS[regulator].url
+
+    # Âge des données servies : la liste est revalidée en arrière-plan
+    refresher = get_refresher(SOURCE_URL)
+    try:
+        refresher.current()
+    except RuntimeError:
+        pass  # Erreur de chargement affichée par la page
+    data_status = refresher.status()
+    st.caption(f"🕒 ANJ list checked {format_age(data_status['age_seconds'])}")
+    if data_status["last_error"]:
+        st.caption(f"⚠️ Refresh failing ({data_status['failures']} attempts), serving the last loaded list")
+
     if page == "💬 Compliance ChatBot":
         if st.button("🗑️ Clear Question History", width='stretch'):
-            st.session_state.chat_history = []
+            st.session_state.chat_history = ChatHistory()
+            st.session_state.chat_pages = 1
             st.session_state.awaiting_choice = False
             st.session_state.options = []
-            st.rerun()
+            rerun()
 
 # --- 3. SESSION STATE ---
-if 'chat_history' not in st.session_state: st.session_state.chat_history = []
+if 'chat_history' not in st.session_state: st.session_state.chat_history = ChatHistory()
+if 'chat_pages' not in st.session_state: st.session_state.chat_pages = 1
+if 'chat_mark' not in st.session_state: st.session_state.chat_mark = 0
 if 'awaiting_choice' not in st.session_state: st.session_state.awaiting_choice = False
 if 'options' not in st.session_state: st.session_state.options = []
 
 
 # --- 4. LOGIC FUNCTIONS ---
-def display_final_decision(comp_name, df, lang, sport, genre=None, discipline=None):
-    if sport == "Football":
-        data = decide_football(comp_name, df, genre=genre)
-    elif sport == "Badminton":
-        data = decide_badminton(comp_name, df, genre=genre, discipline=discipline)
-    elif sport == "Golf":
-        data = decide_golf(comp_name, df, genre=genre)
-    elif sport == "Snooker":
-        data = decide_snooker(comp_name, df)
-
-    # Sécurité si la compétition n'a pas été trouvée (évite le KeyError)
-    if not data.get('allowed') and 'restrictions' not in data:
-        msg = TEMPLATES[lang]["not_found"].format(source=df.attrs.get('source_ref', "ANJ List"))
-        st.session_state.chat_history.append(("assistant", msg))
-        st.rerun()
+# Callbacks du chat : exécutés avant le rerun du fragment, ils ne font qu'ajouter à l'historique
+def record_decision(comp_name, df, lang, sport, genre=None, discipline=None):
+    history = st.session_state.chat_history
+    with metrics.timed("display_decision", sport):
+        if sport == "Football":
+            data = decide_football(comp_name, df, genre=genre)
+        elif sport == "Badminton":
+            data = decide_badminton(comp_name, df, genre=genre, discipline=discipline)
+        elif sport == "Golf":
+            data = decide_golf(comp_name, df, genre=genre)
+        elif sport == "Snooker":
+            data = decide_snooker(comp_name, df)
+
+        # Sécurité si la compétition n'a pas été trouvée (évite le KeyError)
+        if not data.get('allowed') and 'restrictions' not in data:
+            history.append(chat.not_found(df.attrs.get('source_ref', "ANJ List"), lang))
+            return
+
+        history.append(chat.decision(data, lang, discipline))
+
+
+def submit_prompt(selected_sport, selected_discipline, df_anj, all_sheets, source):
+    user_prompt = st.session_state.chat_prompt
+    if not user_prompt or st.session_state.awaiting_choice:
         return
+    history = st.session_state.chat_history
+    history.append(chat.user_text(user_prompt))
+
+    # 1. RECHERCHE
+    route_sport = selected_sport
+    if selected_sport == ALL_SPORTS:
+        # Même filtre de discipline que le handler badminton
+        matches = search_all_sports(user_prompt, all_sheets, discipline=selected_discipline)
+        # Sport déduit seulement si tous les résultats sont du même sport : sinon, boutons par sport
+        sports = {m[3] for m in matches}
+        route_sport = sports.pop() if len(sports) == 1 else None
+        if route_sport:
+            df_anj = load_anj_data(SOURCE_URL, SPORT_SHEETS[route_sport])
+    elif selected_sport == "Football":
+        matches = handle_football_search(user_prompt, df_anj)
+    elif selected_sport == "Badminton":
+        matches = handle_badminton_search(user_prompt, df_anj, selected_discipline)
+    elif selected_sport == "Golf":
+        matches = handle_golf_search(user_prompt, df_anj)
+    elif selected_sport == "Snooker":
+        matches = handle_snooker_search(user_prompt, df_anj)
+
+    # 2. LOGIQUE DE ROUTAGE
+    # Match unique et précis (Score >= 90)
+    if len(matches) == 1 and matches[0][1] >= 90 and route_sport in ["Football", "Golf", "Snooker"]:
+        record_decision(matches[0][0], df_anj, "en", route_sport, genre=matches[0][2])
+
+    # Cas spécifique SNOOKER : Message pédagogique direct au lieu de boutons compliqués
+    elif route_sport == "Snooker":
+        history.append(chat.message("snooker_rules"))
+
+    elif len(matches) > 0:
+        st.session_state.awaiting_choice = True
+        st.session_state.options = matches
+
+        # Cas spécifique Evian / Golf
+        if any("evian" in str(m[0]).lower() and (m[3] if len(m) > 3 else route_sport) == "Golf" for m in matches):
+            history.append(chat.message("golf_gender_evian"))
+
+    elif route_sport == "Golf":
+        st.session_state.awaiting_choice = True
+        st.session_state.options = [("Men's Tournament", 0, "Homme"), ("Women's Tournament", 0, "Femme")]
+        history.append(chat.message("golf_gender"))
+
+    else:
+        history.append(chat.not_found(source))
+
+
+def choose_option(opt, opt_sport, selected_sport, selected_discipline, df_anj):
+    st.session_state.awaiting_choice = False
+    if opt[1] == 0 or "Tournament" in str(opt[0]):
+        st.session_state.chat_history.append(
+            chat.message("golf_circuits_women" if opt[2] == "Femme" else "golf_circuits_men"))
+    else:
+        df_opt = df_anj if opt_sport == selected_sport else load_anj_data(SOURCE_URL, SPORT_SHEETS[opt_sport])
+        discipline = selected_discipline if opt_sport == "Badminton" else None
+        record_decision(opt[0], df_opt, "en", opt_sport, genre=opt[2], discipline=discipline)
+    st.session_state.options = []
 
-    data['restrictions'] = localize_value(data['restrictions'], lang, 'restrictions')
-    data['phases'] = localize_value(data['phases'], lang, 'phases')
-    data['emoji'] = get_emoji(data.get('country', 'International'))
 
-    g_map = {"Homme": "Men", "Femme": "Women", "Mixte": "Mixed", "N/A": "Open/Mixed"}
-    data['genre_en'] = g_map.get(data.get('genre'), "Open/Mixed")
-    data['discipline_en'] = discipline if discipline else "N/A"
+def suggestion_label(suggestion) -> str:
+    if not suggestion.genre:
+        return f"{suggestion.competition} · {suggestion.sport}"
+    return f"{suggestion.competition} ({GENDER_LABELS.get(suggestion.genre, suggestion.genre)}) · {suggestion.sport}"
 
-    response = TEMPLATES[lang]["allowed"].format(**data)
-    st.session_state.chat_history.append(("assistant", response))
-    st.rerun()
+
+def choose_suggestion(suggestion, selected_discipline, all_sheets):
+    st.session_state.chat_history.append(chat.user_text(suggestion_label(suggestion)))
+    reset_selection_state()
+    discipline = selected_discipline if suggestion.sport == "Badminton" else None
+    record_decision(suggestion.competition, load_anj_data(SOURCE_URL, SPORT_SHEETS[suggestion.sport]), "en",
+                    suggestion.sport, genre=suggestion.genre, discipline=discipline)
+    record_pick(suggestion, all_sheets)
+    st.session_state.suggest_query = ""
+
+
+def show_older_messages():
+    st.session_state.chat_pages += 1
+
+
+def show_entries(entries):
+    for entry in entries:
+        st.chat_message(entry.role).markdown(chat.render(entry))
+
+
+@st.fragment
+def chat_panel(selected_sport, selected_discipline, df_anj, all_sheets, source):
+    """
+    New messages, question input and option panel. An interaction only reruns this fragment:
+    the history above it, drawn by the last full run, is not redrawn.
+    """
+    with metrics.timed("chat_fragment"):
+        new_entries = st.session_state.chat_history.since(st.session_state.chat_mark)
+        if len(new_entries) > CHAT_PAGE_SIZE:
+            # Rerun complet : ces messages passent dans l'historique paginé
+            st.rerun()
+        show_entries(new_entries)
+
+        auto_sport = selected_sport == ALL_SPORTS
+        # Saisie semi-automatique : la décision sans passer par la recherche ni les boutons d'options
+        typed = st.text_input("🔎 Find a competition", key="suggest_query", type="search", live="200ms",
+                              placeholder="Start typing a competition name...")
+        if typed and all_sheets:
+            suggestions = suggest(typed, all_sheets, sports=None if auto_sport else [selected_sport])
+            if not suggestions:
+                st.caption("No competition name starts with these words.")
+            for i, suggestion in enumerate(suggestions):
+                st.button(suggestion_label(suggestion), key=f"suggestion_{i}", width='stretch',
+                          on_click=choose_suggestion, args=(suggestion, selected_discipline, all_sheets))
+
+        st.chat_input("Your question about any sport..." if auto_sport
+                      else f"Your question about {selected_sport}...",
+                      key="chat_prompt", on_submit=submit_prompt,
+                      args=(selected_sport, selected_discipline, df_anj, all_sheets, source))
+
+        if st.session_state.awaiting_choice:
+            with st.chat_message("assistant"):
+                st.info("Please select an option:")
+
+                for i, opt in enumerate(st.session_state.options):
+                    gender_display = GENDER_LABELS.get(opt[2], opt[2])
+                    label = f"{opt[0]} ({gender_display})" if opt[1] != 0 else opt[0]
+                    # Résultats multi-sports : (compétition, score, genre, sport)
+                    opt_sport = opt[3] if len(opt) > 3 else selected_sport
+                    if len(opt) > 3:
+                        label = f"{label} · {opt_sport}"
+
+                    st.button(label, key=f"btn_{selected_sport}_{i}_{opt[2]}", width='stretch',
+                              on_click=choose_option,
+                              args=(opt, opt_sport, selected_sport, selected_discipline, df_anj))
 
 
 # --- 5. PAGE CONTENT ---
 if page == "🏠 Home":
     st.title("🤖 Compliance ChatBot")
     st.subheader("Welcome to your Compliance Assistant.")
-    df_home = load_anj_data(ANJ_URL, "Football")
-    DYNAMIC_SOURCE = df_home.attrs.get('source_ref', "ANJ Regulatory List")
+    DYNAMIC_SOURCE = get_source_ref(SOURCE_URL)
 
     st.markdown(f"""
     This tool allows you to instantly check if a competition is authorized by the ANJ.
@@ -96,114 +271,72 @@ if page == "🏠 Home":
 
 elif page == "💬 Compliance ChatBot":
     st.title("💬 Compliance Q&A")
-    selected_sport = st.selectbox("Choose a sport:", ["Football", "Badminton", "Golf", "Snooker"],
+    selected_sport = st.selectbox("Choose a sport:", [ALL_SPORTS, "Football", "Badminton", "Golf", "Snooker"],
                                   on_change=reset_selection_state)
+    auto_sport = selected_sport == ALL_SPORTS
 
     selected_discipline = None
     if selected_sport == "Badminton":
         selected_discipline = st.radio("Choose Discipline:", ["Singles", "Doubles"], horizontal=True)
+    elif auto_sport:
+        # Les résultats badminton de la recherche multi-sports sont filtrés par discipline
+        selected_discipline = st.radio("Badminton discipline:", ["Singles", "Doubles"], horizontal=True)
 
-    # Aiguillage vers l'onglet Billard pour le Snooker
-    target_sheet = "Billard" if selected_sport == "Snooker" else selected_sport
-    df_anj = load_anj_data(ANJ_URL, target_sheet)
-    DYNAMIC_SOURCE = df_anj.attrs.get('source_ref', "ANJ Regulatory List")
-
-    for role, message in st.session_state.chat_history:
-        st.chat_message(role).markdown(message)
-
-    user_prompt = st.chat_input(f"Your question about {selected_sport}...")
-
-    if user_prompt and not st.session_state.awaiting_choice:
-        st.session_state.chat_history.append(("user", user_prompt))
-
-        # 1. RECHERCHE
-        if selected_sport == "Football":
-            matches = handle_football_search(user_prompt, df_anj)
-        elif selected_sport == "Badminton":
-            matches = handle_badminton_search(user_prompt, df_anj, selected_discipline)
-        elif selected_sport == "Golf":
-            matches = handle_golf_search(user_prompt, df_anj)
-        elif selected_sport == "Snooker":
-            matches = handle_snooker_search(user_prompt, df_anj)
-
-        # 2. LOGIQUE DE ROUTAGE
-        # Match unique et précis (Score >= 90)
-        if len(matches) == 1 and matches[0][1] >= 90 and selected_sport in ["Football", "Golf", "Snooker"]:
-            display_final_decision(matches[0][0], df_anj, "en", selected_sport, genre=matches[0][2])
-
-        # Cas spécifique SNOOKER : Message pédagogique direct au lieu de boutons compliqués
-        elif selected_sport == "Snooker":
-            msg = (
-                "🔍 **Snooker Regulatory Framework:**\n\n"
-                "Only professional tournaments belonging to the **World Snooker Tour (WST)** are authorized.\n\n"
-                "⚠️ **Major Restrictions:**\n"
-                "* **Authorized Phases:** All matches except **group stages** (phase de poule).\n"
-                "* **Forbidden:** Qualifying tournaments known as **Q-School** are strictly prohibited.\n"
-                "* **Minor Players:** Bets are forbidden on any match involving a player under 18.\n\n"
-            )
-            st.session_state.chat_history.append(("assistant", msg))
-            st.rerun()
-
-        elif len(matches) > 0:
-            st.session_state.awaiting_choice = True
-            st.session_state.options = matches
-
-            # Cas spécifique Evian / Golf
-            if selected_sport == "Golf" and any("evian" in str(m[0]).lower() for m in matches):
-                msg = "Is this a **Men's** or **Women's** tournament?\n\n💡 *Note: **Evian Championship** is a Women's major.*"
-                st.session_state.chat_history.append(("assistant", msg))
-            st.rerun()
-
-        elif selected_sport == "Golf":
-            st.session_state.awaiting_choice = True
-            st.session_state.options = [("Men's Tournament", 0, "Homme"), ("Women's Tournament", 0, "Femme")]
-            msg = "Is this a **Men's** or **Women's** tournament?\n\n💡 *Note: **LPGA Tour** (Women), **PGA/DP World/LIV** (Men).*"
-            st.session_state.chat_history.append(("assistant", msg))
-            st.rerun()
-
-        else:
-            msg = TEMPLATES["en"]["not_found"].format(source=DYNAMIC_SOURCE)
-            st.session_state.chat_history.append(("assistant", msg))
-            st.rerun()
-
-    if st.session_state.awaiting_choice:
-        with st.chat_message("assistant"):
-            st.info("Please select an option:")
-
-            for i, opt in enumerate(st.session_state.options):
-                g_map = {"Homme": "Men", "Femme": "Women", "Mixte": "Mixed", "N/A": "Open"}
-                gender_display = g_map.get(opt[2], opt[2])
-                label = f"{opt[0]} ({gender_display})" if opt[1] != 0 else opt[0]
-
-                if st.button(label, key=f"btn_{selected_sport}_{i}_{opt[2]}", width='stretch'):
-                    st.session_state.awaiting_choice = False
-
-                    if opt[1] == 0 or "Tournament" in str(opt[0]):
-                        genre_label = "Women" if opt[2] == "Femme" else "Men"
-                        if opt[2] == "Femme":
-                            circuit_txt = "**LPGA Tour**"
-                            warning_txt = ""
-                        else:
-                            circuit_txt = "**PGA Tour**, **DP World Tour**, or **LIV International Golf Series**"
-                            warning_txt = "\n\n⚠️ **Important:** Do not confuse the *PGA Tour* (Authorized) with the *PGA Tour Champions* (Not Authorized)."
-
-                        resp = f"For **{genre_label}** golf, the authorized circuits are: {circuit_txt}.{warning_txt}"
-                        st.session_state.chat_history.append(("assistant", resp))
-                    else:
-                        display_final_decision(opt[0], df_anj, "en", selected_sport, genre=opt[2],
-                                               discipline=selected_discipline)
-
-                    st.session_state.options = []
-                    st.rerun()
+    # Toutes les feuilles : recherche multi-sports et suggestions
+    all_sheets = {}
+    try:
+        all_sheets = load_anj_workbook(SOURCE_URL)
+    except Exception as e:
+        st.error(f"Error loading ANJ data: {e}")
+    if auto_sport:
+        # Recherche sur toutes les feuilles : le sport est déduit du meilleur résultat
+        df_anj = None
+        DYNAMIC_SOURCE = get_source_ref(SOURCE_URL)
+    else:
+        # Aiguillage vers l'onglet Billard pour le Snooker
+        df_anj = load_anj_data(SOURCE_URL, SPORT_SHEETS[selected_sport])
+        DYNAMIC_SOURCE = df_anj.attrs.get('source_ref', "ANJ Regulatory List")
+
+    # Historique : dessiné seulement par un rerun complet, une page à la fois
+    history = st.session_state.chat_history
+    st.session_state.chat_mark = history.end
+    older, entries = history.window(history.end, st.session_state.chat_pages * CHAT_PAGE_SIZE)
+    if older:
+        st.button(f"⬆️ Show older messages ({older})", on_click=show_older_messages)
+    show_entries(entries)
+
+    chat_panel(selected_sport, selected_discipline, df_anj, all_sheets, DYNAMIC_SOURCE)
 
 elif page == "📂 Source Files":
     st.title("📂 Files and Data")
     preview_sport = st.selectbox("Preview data for:", ["Football", "Badminton", "Golf", "Snooker"])
 
     # Aiguillage correct pour l'aperçu du Snooker
-    target_preview = "Billard" if preview_sport == "Snooker" else preview_sport
-    df_preview = load_anj_data(ANJ_URL, target_preview)
+    df_preview = load_anj_data(SOURCE_URL, SPORT_SHEETS[preview_sport])
 
     st.info(f"Regulatory document: **{df_preview.attrs.get('source_ref')}**")
-    st.link_button("🔗 Open ANJ File (Google Drive)", ANJ_URL)
-    st.dataframe(df_preview, width='stretch')
\ No newline at end of file
+    st.link_button(f"🔗 Open the {REGULATORS[regulator].name} list", SOURCE_URL)
+    st.dataframe(df_preview, width='stretch')
+
+    with st.expander("🔄 Data refresh"):
+        if st.button("Check the ANJ list now"):
+            refresher.refresh_now()
+            st.toast("Refresh requested, the current list is served meanwhile.")
+        st.json(refresher.status())
+
+    with st.expander("⚙️ Query cache"):
+        st.json(QUERY_CACHE.stats())
+
+    with st.expander("⏱️ Latency metrics"):
+        record = st.toggle("Record stage timings (all sessions)", value=metrics.ENABLED)
+        if record != metrics.ENABLED:
+            metrics.enable() if record else metrics.disable()
+        stage_rows = metrics.REGISTRY.snapshot()
+        if stage_rows:
+            st.dataframe(pd.DataFrame(stage_rows), width='stretch', hide_index=True)
+            st.download_button("⬇️ Prometheus export", metrics.render_prometheus(),
+                               file_name="anj_metrics.prom", mime="text/plain")
+        else:
+            st.caption("No timings recorded yet.")
+
+RERUN_TIMER.stop()
\ No newline at end of file
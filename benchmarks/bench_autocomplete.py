@@ -0,0 +1,72 @@
+"""
+Latency and hit rate of the typeahead index on synthetic competition names.
+
+    python -m benchmarks.bench_autocomplete [--sizes 1000 10000 100000] [--queries 500] [--k 8]
+
+Queries are what an analyst has typed so far: the start of a name cut anywhere (from one
+letter), sometimes with a letter dropped (typo). Hit: the typed competition is in the top k.
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_competitions
+from engine.autocomplete import AutocompleteIndex
+
+
+def typed_prefixes(names: list, n_queries: int, seed: int = 0) -> list:
+    """(typed text, competition) pairs."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n_queries):
+        name = rng.choice(names)
+        typed = name[:rng.randint(1, len(name))]
+        if len(typed) > 4 and rng.random() < 0.2:
+            pos = rng.randrange(1, len(typed) - 1)
+            typed = typed[:pos] + typed[pos + 1:]
+        queries.append((typed.lower(), name))
+    return queries
+
+
+def run(n_rows: int, n_queries: int, k: int) -> dict:
+    df = synthetic_competitions(n_rows)
+    start = time.perf_counter()
+    index = AutocompleteIndex(df["Nom commun"], df["Sport"], df["Genre"])
+    build_s = time.perf_counter() - start
+
+    timings, hits = [], 0
+    for typed, name in typed_prefixes(df["Nom commun"].tolist(), n_queries, seed=n_rows):
+        start = time.perf_counter()
+        suggestions = index.suggest(typed, k)
+        timings.append((time.perf_counter() - start) * 1000)
+        hits += any(s.competition == name for s in suggestions)
+    return {
+        "rows": n_rows,
+        "suggestions": len(index),
+        "terms": len(index.terms),
+        "index_build_s": round(build_s, 3),
+        "p50_ms": round(float(np.percentile(timings, 50)), 3),
+        "p99_ms": round(float(np.percentile(timings, 99)), 3),
+        "max_ms": round(max(timings), 3),
+        "hit_rate": round(hits / n_queries, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=8)
+    args = parser.parse_args()
+
+    header = ["rows", "suggestions", "terms", "index_build_s", "p50_ms", "p99_ms", "max_ms", "hit_rate"]
+    print(" | ".join(header))
+    for n_rows in args.sizes:
+        result = run(n_rows, args.queries, args.k)
+        print(" | ".join(str(result[h]) for h in header), flush=True)
+
+
+if __name__ == "__main__":
+    main()
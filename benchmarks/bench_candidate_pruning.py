@@ -0,0 +1,69 @@
+"""
+Recall and speed of the inverted-index pre-filter against the full fuzzy scan.
+
+    python -m benchmarks.bench_candidate_pruning [--sizes 1000 10000 100000] [--queries 50]
+
+Recall@1: the pruned search returns the same best match as the full scan.
+Recall: share of the full-scan matches also returned by the pruned search.
+Exact: the whole candidate list (names, scores, order) is identical.
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import synthetic_competitions, synthetic_queries
+from engine.matcher import CompetitionIndex, get_matches_multiples
+
+
+def run(n_rows: int, n_queries: int, threshold: int = 60) -> dict:
+    df = synthetic_competitions(n_rows)
+    queries = synthetic_queries(df, n_queries, seed=n_rows)
+
+    start = time.perf_counter()
+    index = CompetitionIndex.from_frame(df)
+    _ = index.token_index
+    build_s = time.perf_counter() - start
+
+    full, pruned = [], []
+    start = time.perf_counter()
+    for q in queries:
+        full.append(get_matches_multiples(q, index, threshold=threshold, prune=False))
+    full_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for q in queries:
+        pruned.append(get_matches_multiples(q, index, threshold=threshold, prune=True))
+    pruned_s = time.perf_counter() - start
+
+    top1 = sum(1 for a, b in zip(full, pruned) if a[:1] == b[:1] or (a and b and a[0][1] == b[0][1]))
+    exact = sum(1 for a, b in zip(full, pruned) if a == b)
+    expected = sum(len(a) for a in full)
+    found = sum(len(set(a) & set(b)) for a, b in zip(full, pruned))
+    return {
+        "rows": n_rows,
+        "queries": n_queries,
+        "index_build_s": round(build_s, 3),
+        "full_ms_per_query": round(full_s / n_queries * 1000, 2),
+        "pruned_ms_per_query": round(pruned_s / n_queries * 1000, 2),
+        "speedup": round(full_s / pruned_s, 1) if pruned_s else None,
+        "recall_at_1": round(top1 / n_queries, 3),
+        "recall": round(found / expected, 3) if expected else 1.0,
+        "exact_list_match": round(exact / n_queries, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    header = ["rows", "index_build_s", "full_ms_per_query", "pruned_ms_per_query", "speedup",
+              "recall_at_1", "recall", "exact_list_match"]
+    print(" | ".join(header))
+    for n_rows in args.sizes:
+        result = run(n_rows, args.queries)
+        print(" | ".join(str(result[h]) for h in header), flush=True)
+
+
+if __name__ == "__main__":
+    main()
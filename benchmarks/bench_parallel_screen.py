@@ -0,0 +1,54 @@
+"""
+Scaling of the multi-process screening mode on a synthetic fixture feed.
+
+    python -m benchmarks.bench_parallel_screen [--fixtures 100000] [--competitions 5000] [--workers 1 2 4 8]
+
+Fixtures are mostly unique queries so that the memo does not hide the matching cost.
+"""
+import argparse
+import os
+import time
+
+from benchmarks.synthetic import synthetic_competitions, synthetic_queries
+from engine.screen import Screener
+
+
+def synthetic_sheets(n_competitions: int) -> dict:
+    df = synthetic_competitions(n_competitions)
+    df.attrs.update(source_ref="Synthetic ANJ list", sport_name="Football",
+                    content_hash=f"synthetic-{n_competitions}")
+    return {"Football": df}
+
+
+def run(sheets: dict, fixtures: list, workers: int, chunk_size: int) -> float:
+    screener = Screener(sheets)
+    start = time.perf_counter()
+    count = sum(1 for _ in screener.screen_parallel(fixtures, workers=workers, chunk_size=chunk_size))
+    assert count == len(fixtures)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", type=int, default=100_000)
+    parser.add_argument("--competitions", type=int, default=5000)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    args = parser.parse_args()
+
+    sheets = synthetic_sheets(args.competitions)
+    queries = synthetic_queries(sheets["Football"], args.fixtures, seed=1)
+    fixtures = [("Football", q, None, None) for q in queries]
+
+    print(f"cpu_count={os.cpu_count()} fixtures={args.fixtures} competitions={args.competitions}")
+    print("workers | seconds | rows/sec | speedup")
+    baseline = None
+    for workers in args.workers:
+        elapsed = run(sheets, fixtures, workers, args.chunk_size)
+        baseline = baseline or elapsed
+        print(f"{workers} | {elapsed:.2f} | {len(fixtures) / elapsed:,.0f} | {baseline / elapsed:.2f}x", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Startup time of several regulator lists loaded one after the other vs concurrently.
+
+    python -m benchmarks.bench_regulators [--sources 4] [--rows 5000] [--latency 0.5] [--repeat 3]
+
+A local HTTP server serves --sources copies of a synthetic workbook, each answer delayed by
+--latency seconds (network and server time of a real regulator). Every load is a cold one
+(empty snapshot): download + parse of every list. The concurrent load (refresh_regulators)
+should take about as long as one source, the sequential one the sum of all of them.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def serve(content: bytes, latency: float) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sources", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=5000, help="Football rows of each workbook")
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before each answer")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from benchmarks.workbook import synthetic_workbook
+    from engine.anj_loader import PARSE_WORKERS, read_workbook, refresh_regulators, refresh_workbook
+    from engine.regulators import ANJ_LAYOUT, RegulatorSource
+    from engine.snapshot import SnapshotStore
+
+    content = synthetic_workbook(args.rows)
+    server = serve(content, args.latency)
+    port = server.server_address[1]
+    sources = [RegulatorSource(f"bench{i}", f"Bench {i}", f"http://127.0.0.1:{port}/list{i}.xlsx", ANJ_LAYOUT)
+               for i in range(args.sources)]
+
+    start = time.perf_counter()
+    read_workbook(content)
+    parse_s = time.perf_counter() - start
+
+    sequential, concurrent = [], []
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            os.environ["ANJ_SNAPSHOT_DIR"] = snapshot_dir
+            start = time.perf_counter()
+            for source in sources:
+                refresh_workbook(source.url, store=SnapshotStore(os.path.join(snapshot_dir, source.key)),
+                                 layout=source.layout)
+            sequential.append(time.perf_counter() - start)
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            os.environ["ANJ_SNAPSHOT_DIR"] = snapshot_dir
+            start = time.perf_counter()
+            loaded = refresh_regulators(sources)
+            concurrent.append(time.perf_counter() - start)
+            assert len(loaded) == len(sources)
+    server.shutdown()
+
+    print(f"{args.sources} sources, {len(content) / 2 ** 20:.1f} MB each, latency {args.latency}s, "
+          f"parse {parse_s:.2f}s, {PARSE_WORKERS} parse process(es), {os.cpu_count()} CPU(s)")
+    print(f"sequential: {statistics.median(sequential):.2f}s  concurrent: {statistics.median(concurrent):.2f}s  "
+          f"(slowest source alone: ~{args.latency + parse_s:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
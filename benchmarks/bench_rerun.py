@@ -0,0 +1,80 @@
+"""
+Cost of a Streamlit rerun of the chatbot page on a synthetic ANJ workbook.
+
+    python -m benchmarks.bench_rerun [--rows 100000] [--reruns 30] [--sport Football]
+
+The workbook is parsed once into a temporary snapshot (no HTTP request), then the app is run
+with AppTest: the chatbot page with one sport selected is rerun --reruns times. Reports the
+median / p95 wall time of a rerun and the process RSS before and after the reruns.
+"""
+import argparse
+import os
+import resource
+import statistics
+import tempfile
+import time
+
+
+def rss_mb() -> float:
+    """Current resident set size (peak RSS where /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="Football rows")
+    parser.add_argument("--reruns", type=int, default=30)
+    parser.add_argument("--sport", default="Football", choices=["Football", "Badminton", "Golf", "Snooker"])
+    args = parser.parse_args()
+
+    snapshot_dir = tempfile.mkdtemp(prefix="anj_bench_")
+    # Avant l'import du loader : snapshot servi tel quel, pas de refresh en arrière-plan
+    os.environ.update(ANJ_SNAPSHOT_DIR=snapshot_dir, ANJ_SNAPSHOT_MAX_AGE="86400", ANJ_REFRESH_INTERVAL="0")
+
+    from streamlit.testing.v1 import AppTest
+
+    from benchmarks.workbook import synthetic_workbook
+    from engine.anj_loader import ANJ_URL, content_hash, read_workbook
+    from engine.snapshot import SnapshotStore
+
+    content = synthetic_workbook(args.rows)
+    sheets = read_workbook(content)
+    SnapshotStore(snapshot_dir).save(sheets, {
+        "source_url": ANJ_URL,
+        "source_ref": next(iter(sheets.values())).attrs.get('source_ref'),
+        "content_hash": content_hash(content),
+        "fetched_at": time.time(),
+    })
+    del sheets
+
+    app = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+    at = AppTest.from_file(app, default_timeout=300).run()
+    at.sidebar.radio[0].set_value("💬 Compliance ChatBot").run()
+    at.selectbox[0].set_value(args.sport).run()
+    assert not at.exception, at.exception
+    # Un rerun de chauffe (index, caches Streamlit)
+    at.run()
+
+    rss_before = rss_mb()
+    timings = []
+    for _ in range(args.reruns):
+        start = time.perf_counter()
+        at.run()
+        timings.append((time.perf_counter() - start) * 1000)
+    assert not at.exception, at.exception
+    rss_after = rss_mb()
+
+    timings.sort()
+    print(f"rows={args.rows} sport={args.sport} reruns={args.reruns}")
+    print(f"rerun median {statistics.median(timings):.1f} ms, "
+          f"p95 {timings[min(len(timings) - 1, int(0.95 * len(timings)))]:.1f} ms")
+    print(f"RSS {rss_before:.0f} MB -> {rss_after:.0f} MB, "
+          f"peak {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
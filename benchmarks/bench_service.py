@@ -0,0 +1,82 @@
+"""
+Latency of the HTTP decision service under concurrent load.
+
+    python -m benchmarks.bench_service [--clients 16] [--requests 200] [--workbook anj.xlsx]
+
+Starts the service in-process on a free port and runs keep-alive clients that alternate
+/search and /decide requests; reports client-side p50 / p99 and throughput.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from benchmarks.bench_parallel_screen import synthetic_sheets
+from benchmarks.synthetic import synthetic_queries
+from engine.screen import Screener
+from engine.service import DecisionService, percentile
+
+
+async def client(port: int, requests: list, latencies: list):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for path, payload in requests:
+        body = json.dumps(payload).encode("utf-8")
+        start = time.perf_counter()
+        writer.write(f"POST {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+        length = 0
+        status = await reader.readline()
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        await reader.readexactly(length)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert b" 200 " in status, status
+    writer.close()
+
+
+async def run(screener: Screener, clients: int, per_client: int):
+    service = DecisionService(screener)
+    await service.run_blocking(screener.warm)
+    server = await service.start("127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    df = screener.sheets["Football"]
+    queries = synthetic_queries(df, 500, seed=2)
+    names = df["Nom commun"].tolist()
+    rng = random.Random(0)
+    plans = [[("/search", {"sport": "Football", "query": rng.choice(queries)}) if i % 2 == 0 else
+              ("/decide", {"sport": "Football", "competition": rng.choice(names), "lang": "en"})
+              for i in range(per_client)] for _ in range(clients)]
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, plan, latencies) for plan in plans))
+    elapsed = time.perf_counter() - start
+    server.close()
+    await server.wait_closed()
+    service.executor.shutdown()
+    return latencies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="requests per client")
+    parser.add_argument("--competitions", type=int, default=1000, help="synthetic Football sheet size")
+    parser.add_argument("--workbook", help="local ANJ xlsx instead of the synthetic sheet")
+    args = parser.parse_args()
+
+    screener = Screener.from_file(args.workbook) if args.workbook else Screener(synthetic_sheets(args.competitions))
+    latencies, elapsed = asyncio.run(run(screener, args.clients, args.requests))
+    print(f"clients={args.clients} requests={len(latencies)} throughput={len(latencies) / elapsed:,.0f} req/s "
+          f"p50={percentile(latencies, 50):.2f}ms p99={percentile(latencies, 99):.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Relevance and latency of the sport handlers on the golden query corpus, with parameter sweeps.
+
+    python -m benchmarks.relevance [--workbook anj.xlsx] [--corpus benchmarks/corpus/golden_queries_v1.json]
+                                   [--k 3] [--auto] [--sweep football_threshold=55,60,65 --sweep window=5,10]
+
+For every combination of the swept settings and every handler: recall@1 (the first candidate
+is an expected competition), recall@k, share of the negative queries (expected = []) that get
+no candidate, average candidate count (= buttons shown to the analyst) and per-query latency.
+--auto also runs every query through the cross-sport search (the sport must be inferred too).
+"""
+import argparse
+import contextlib
+import inspect
+import itertools
+import json
+import statistics
+import sys
+import time
+
+from engine import cross_sport, football_handler, matcher, snooker_handler
+from engine.anj_loader import ANJ_URL, read_workbook, refresh_workbook
+from engine.badminton_handler import handle_badminton_search
+from engine.cross_sport import SPORT_SHEETS, search_all_sports
+from engine.football_handler import handle_football_search
+from engine.golf_handler import handle_golf_search
+from engine.snooker_handler import handle_snooker_search
+
+DEFAULT_CORPUS = "benchmarks/corpus/golden_queries_v1.json"
+
+# Les caches de requêtes masqueraient le coût réel et les changements de réglages
+SEARCHES = {
+    "Football": inspect.unwrap(handle_football_search),
+    "Badminton": inspect.unwrap(handle_badminton_search),
+    "Golf": inspect.unwrap(handle_golf_search),
+    "Snooker": inspect.unwrap(handle_snooker_search),
+}
+
+# Réglages balayables : nom -> (module, attribut)
+PARAMS = {
+    "football_threshold": (football_handler, "FOOTBALL_THRESHOLD"),
+    "snooker_threshold": (snooker_handler, "SNOOKER_THRESHOLD"),
+    "country_bonus": (matcher, "COUNTRY_BONUS"),
+    "country_penalty": (matcher, "COUNTRY_PENALTY"),
+    "super_penalty": (matcher, "SUPER_PENALTY"),
+    "window": (matcher, "MATCH_WINDOW"),
+    "auto_window": (cross_sport, "SCORE_WINDOW"),
+    "sport_hint_bonus": (cross_sport, "SPORT_HINT_BONUS"),
+}
+
+
+def load_corpus(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        corpus = json.load(f)
+    for entry in corpus["queries"]:
+        entry["expected_keys"] = {str(e).strip().lower() for e in entry["expected"]}
+    return corpus
+
+
+@contextlib.contextmanager
+def applied(settings: dict):
+    """Sets the given PARAMS for the duration of the block."""
+    previous = {}
+    try:
+        for name, value in settings.items():
+            module, attr = PARAMS[name]
+            previous[name] = getattr(module, attr)
+            setattr(module, attr, value)
+        yield
+    finally:
+        for name, value in previous.items():
+            module, attr = PARAMS[name]
+            setattr(module, attr, value)
+
+
+def parse_sweeps(specs) -> list:
+    """["window=5,10", "super_penalty=10,15"] -> every combination as a dict."""
+    axes = []
+    for spec in specs or []:
+        name, _, values = spec.partition("=")
+        if name not in PARAMS or not values:
+            raise SystemExit(f"invalid --sweep {spec!r} (parameters: {', '.join(PARAMS)})")
+        axes.append([(name, float(v) if "." in v else int(v)) for v in values.split(",")])
+    return [dict(combo) for combo in itertools.product(*axes)] or [{}]
+
+
+def _search(sport, entry, sheets):
+    if sport == "auto":
+        return inspect.unwrap(search_all_sports)(entry["query"], sheets, discipline=entry.get("discipline"))
+    df = sheets[SPORT_SHEETS[sport]]
+    if sport == "Badminton":
+        return SEARCHES[sport](entry["query"], df, entry.get("discipline") or "Singles")
+    return SEARCHES[sport](entry["query"], df)
+
+
+def _is_hit(match, entry, sport) -> bool:
+    if sport == "auto" and match[3] != entry["sport"]:
+        return False
+    return str(match[0]).strip().lower() in entry["expected_keys"]
+
+
+def evaluate(corpus: dict, sheets: dict, k: int = 3, auto: bool = False) -> dict:
+    """Metrics per handler (the sport of each query, plus "auto")."""
+    names = {sport: {str(n).strip().lower() for n in sheets[sheet]["Nom commun"]}
+             for sport, sheet in SPORT_SHEETS.items() if sheet in sheets}
+    stats = {}
+    for entry in corpus["queries"]:
+        sport = entry["sport"]
+        if sport not in names:
+            continue
+        # Attente absente du fichier chargé : corpus à mettre à jour, la requête ne compte pas
+        stale = bool(entry["expected_keys"]) and not entry["expected_keys"] & names[sport]
+        for handler in [sport] + (["auto"] if auto else []):
+            s = stats.setdefault(handler, {"positives": 0, "hit1": 0, "hitk": 0, "negatives": 0, "clean": 0,
+                                           "candidates": [], "latency_ms": [], "stale": [], "misses": []})
+            if stale:
+                if handler == sport:
+                    s["stale"].append(entry["id"])
+                continue
+            start = time.perf_counter()
+            matches = _search(handler, entry, sheets)
+            s["latency_ms"].append((time.perf_counter() - start) * 1000)
+            s["candidates"].append(len(matches))
+            if entry["expected_keys"]:
+                s["positives"] += 1
+                hits = [_is_hit(m, entry, handler) for m in matches]
+                s["hit1"] += bool(hits[:1] and hits[0])
+                s["hitk"] += any(hits[:k])
+                if not any(hits[:k]):
+                    s["misses"].append(entry["id"])
+            else:
+                s["negatives"] += 1
+                s["clean"] += not matches
+                if matches:
+                    s["misses"].append(entry["id"])
+
+    report = {}
+    for handler, s in stats.items():
+        latencies = sorted(s["latency_ms"])
+        report[handler] = {
+            "queries": len(latencies),
+            "recall_at_1": round(s["hit1"] / s["positives"], 3) if s["positives"] else None,
+            f"recall_at_{k}": round(s["hitk"] / s["positives"], 3) if s["positives"] else None,
+            "negatives_clean": round(s["clean"] / s["negatives"], 3) if s["negatives"] else None,
+            "avg_candidates": round(statistics.fmean(s["candidates"]), 2) if s["candidates"] else None,
+            "p50_ms": round(statistics.median(latencies), 3) if latencies else None,
+            "p95_ms": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 3) if latencies else None,
+            "misses": s["misses"],
+            "stale": s["stale"],
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--workbook", help="local ANJ xlsx (default: the ANJ URL through the snapshot)")
+    parser.add_argument("--url", default=ANJ_URL)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--auto", action="store_true", help="also evaluate the cross-sport search")
+    parser.add_argument("--sweep", action="append", metavar="PARAM=V1,V2",
+                        help=f"values to try, repeatable ({', '.join(PARAMS)})")
+    parser.add_argument("--json", help="write every result to this file")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus)
+    if args.workbook:
+        with open(args.workbook, "rb") as f:
+            sheets = read_workbook(f.read())
+    else:
+        sheets = refresh_workbook(args.url)
+
+    # Index construits une fois, hors mesure
+    evaluate(corpus, sheets, args.k, args.auto)
+
+    runs = []
+    print(f"corpus v{corpus.get('version')} ({len(corpus['queries'])} queries)")
+    print(f"settings | handler | recall@1 | recall@{args.k} | negatives_clean | avg_candidates | p50_ms | p95_ms")
+    for settings in parse_sweeps(args.sweep):
+        with applied(settings):
+            report = evaluate(corpus, sheets, args.k, args.auto)
+        label = ",".join(f"{k}={v}" for k, v in settings.items()) or "current"
+        for handler, r in report.items():
+            print(f"{label} | {handler} | {r['recall_at_1']} | {r[f'recall_at_{args.k}']} | {r['negatives_clean']} "
+                  f"| {r['avg_candidates']} | {r['p50_ms']} | {r['p95_ms']}")
+        runs.append({"settings": settings, "report": report})
+
+    stale = sorted({q for run in runs for r in run["report"].values() for q in r["stale"]})
+    if stale:
+        print(f"warning: expected competitions not in this workbook, skipped: {', '.join(stale)}", file=sys.stderr)
+    if len(runs) == 1:
+        for handler, r in runs[0]["report"].items():
+            if r["misses"]:
+                print(f"{handler} misses: {', '.join(r['misses'])}", file=sys.stderr)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"corpus_version": corpus.get("version"), "k": args.k, "runs": runs}, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Offline benchmark suite of the engine on a synthetic ANJ workbook.
+
+    python -m benchmarks.suite [--rows 10000] [--queries 200] [--save results.json]
+                               [--baseline benchmarks/baselines/rows-10000.json] [--threshold 0.25]
+
+Times the workbook parsing behind load_anj_data, the index / decision table builds,
+get_matches_multiples, every handle_*_search and every decide_* (median / p95 per call, query
+cache bypassed). --save writes the results as a JSON baseline; --baseline compares against one
+and exits with status 1 when a median is more than --threshold slower (relative) than the baseline.
+"""
+import argparse
+import inspect
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+from benchmarks.synthetic import synthetic_queries
+from benchmarks.workbook import synthetic_workbook
+from engine import matcher
+from engine.anj_loader import read_workbook
+from engine.badminton_handler import handle_badminton_search, decide_badminton
+from engine.decision_table import DecisionTable
+from engine.football_handler import handle_football_search, decide_football, _resolve_football
+from engine.golf_handler import handle_golf_search, decide_golf
+from engine.snooker_handler import handle_snooker_search, decide_snooker
+
+# Écart absolu (ms) en dessous duquel une variation est considérée comme du bruit
+NOISE_FLOOR_MS = 0.05
+DEFAULT_THRESHOLD = 0.25
+
+
+def measure(fn, args_list, repeat: int = 1) -> dict:
+    """Per-call timings (ms) of fn(*args) over args_list, `repeat` times."""
+    timings = []
+    for _ in range(repeat):
+        for args in args_list:
+            start = time.perf_counter()
+            fn(*args)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "calls": len(timings),
+        "median_ms": round(statistics.median(timings), 4),
+        "p95_ms": round(timings[min(len(timings) - 1, int(0.95 * len(timings)))], 4),
+        "mean_ms": round(statistics.fmean(timings), 4),
+    }
+
+
+def _uncached(fn):
+    # Le cache de requêtes masquerait le coût réel : on appelle la fonction d'origine
+    return inspect.unwrap(fn)
+
+
+def run_suite(rows: int, n_queries: int, parse_repeat: int = 3, seed: int = 0) -> dict:
+    results = {}
+    content = synthetic_workbook(rows, seed=seed)
+    results["parse.read_workbook"] = measure(read_workbook, [(content,)], repeat=parse_repeat)
+    sheets = read_workbook(content)
+    football, badminton, golf, billard = (sheets[s] for s in ("Football", "Badminton", "Golf", "Billard"))
+
+    results["build.competition_index"] = measure(matcher.CompetitionIndex.from_frame, [(football,)], repeat=3)
+    results["build.token_index"] = measure(matcher.TokenIndex, [(matcher.get_competition_index(football).targets,)], repeat=3)
+    results["build.decision_table"] = measure(
+        lambda df: DecisionTable.from_frame(df, _resolve_football, casefold=True), [(football,)], repeat=3)
+
+    queries = {name: synthetic_queries(df, n_queries, seed=seed + 1)
+               for name, df in (("football", football), ("badminton", badminton), ("golf", golf),
+                                ("snooker", billard))}
+    # Construction des index hors mesure
+    _uncached(handle_football_search)("warm up", football)
+    _uncached(handle_badminton_search)("warm up", badminton, "Singles")
+    _uncached(handle_golf_search)("warm up", golf)
+    _uncached(handle_snooker_search)("warm up", billard)
+
+    index = matcher.get_competition_index(football)
+    results["match.get_matches_multiples"] = measure(
+        matcher.get_matches_multiples, [(q, index, 60) for q in queries["football"]])
+    results["search.football"] = measure(_uncached(handle_football_search), [(q, football) for q in queries["football"]])
+    results["search.badminton"] = measure(_uncached(handle_badminton_search),
+                                          [(q, badminton, d) for q in queries["badminton"] for d in ("Singles", "Doubles")])
+    results["search.golf"] = measure(_uncached(handle_golf_search), [(q, golf) for q in queries["golf"]])
+    results["search.snooker"] = measure(_uncached(handle_snooker_search), [(q, billard) for q in queries["snooker"]])
+
+    def sample(df, n):
+        return df[["Nom commun", "Genre"]].drop_duplicates().head(n).values.tolist()
+
+    for name, fn, df in (("football", decide_football, football), ("badminton", decide_badminton, badminton),
+                         ("golf", decide_golf, golf), ("snooker", decide_snooker, billard)):
+        pairs = sample(df, n_queries)
+        fn = _uncached(fn)
+        if name == "snooker":
+            args = [(comp, df) for comp, _ in pairs]
+        else:
+            args = [(comp, df, genre) for comp, genre in pairs]
+        fn(*args[0])
+        results[f"decide.{name}"] = measure(fn, args + [("unknown competition", df)])
+    return results
+
+
+def report(rows: int, n_queries: int, results: dict) -> dict:
+    return {
+        "meta": {
+            "rows": rows,
+            "queries": n_queries,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """Names of the benchmarks whose median regressed more than `threshold` against the baseline."""
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        now, before = result["median_ms"], base["median_ms"]
+        if now - before > NOISE_FLOOR_MS and now > before * (1 + threshold):
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000, help="Football rows of the synthetic workbook")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--parse-repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON baseline to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed relative slowdown of the medians (default: 0.25)")
+    args = parser.parse_args(argv)
+
+    current = report(args.rows, args.queries, run_suite(args.rows, args.queries, args.parse_repeat, args.seed))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("rows") != args.rows:
+            print(f"warning: baseline was recorded with --rows {baseline['meta'].get('rows')}", file=sys.stderr)
+
+    print("benchmark | median_ms | p95_ms | calls" + (" | baseline_ms | ratio" if baseline else ""))
+    for name, result in current["results"].items():
+        line = f"{name} | {result['median_ms']:.3f} | {result['p95_ms']:.3f} | {result['calls']}"
+        base = baseline["results"].get(name) if baseline else None
+        if base:
+            line += f" | {base['median_ms']:.3f} | {result['median_ms'] / base['median_ms']:.2f}x"
+        print(line)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+            f.write("\n")
+
+    if baseline:
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"REGRESSION (> {args.threshold:.0%} slower): {', '.join(regressions)}", file=sys.stderr)
+            return 1
+        print(f"No regression above {args.threshold:.0%}.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Synthetic competitions shaped like the ANJ sheets, for offline benchmarks."""
+import random
+
+import pandas as pd
+
+COUNTRIES = ["France", "Espagne", "Italie", "Allemagne", "Portugal", "Ecosse", "Suisse", "Angleterre",
+             "Belgique", "Pays-Bas", "Brésil", "Argentine", "Japon", "Mexique", "Europe", "International"]
+KINDS = ["Ligue", "Coupe", "Championnat", "Super Coupe", "Trophée", "Division", "Premier League",
+         "Copa", "Coppa", "Taça", "Cup", "Serie", "Primera", "Liga", "Pokal", "Challenge"]
+QUALIFIERS = ["Nationale", "Régionale", "Elite", "Pro", "Espoirs", "U19", "U21", "Féminine", "Amateur",
+              "Junior", "Senior", "Open", "Masters", "Classic", "Series", "Play-offs"]
+SYLLABLES = ["ka", "ro", "mi", "la", "ton", "ber", "vi", "sa", "nor", "del", "ga", "pe", "lu", "rio", "ste", "fan"]
+GENRES = ["Homme", "Femme"]
+
+
+def _proper_name(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+
+
+def synthetic_competitions(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """n_rows distinct competitions with Nom commun / Genre / Pays / Restrictions / Phases."""
+    rng = random.Random(seed)
+    rows, seen = [], set()
+    while len(rows) < n_rows:
+        parts = [rng.choice(KINDS)]
+        if rng.random() < 0.6:
+            parts.append(_proper_name(rng))
+        if rng.random() < 0.5:
+            parts.append(rng.choice(QUALIFIERS))
+        if rng.random() < 0.4:
+            parts.append(str(rng.randint(1, 5)))
+        name = " ".join(parts)
+        country = rng.choice(COUNTRIES)
+        genre = rng.choice(GENRES)
+        if (name, genre, country) in seen:
+            continue
+        seen.add((name, genre, country))
+        rows.append({
+            "Sport": "Football",
+            "Pays": country,
+            "Genre": genre,
+            "Nom commun": name,
+            "Restrictions": "Aucune" if rng.random() < 0.8 else "Classement FIFA **",
+            "Phases": "Aucune" if rng.random() < 0.7 else "A partir des 8èmes de finales",
+        })
+    return pd.DataFrame(rows)
+
+
+def synthetic_queries(df: pd.DataFrame, n_queries: int, seed: int = 0) -> list:
+    """Analyst-like queries: exact names, lower-cased, truncated, typos, with the country, or unknown."""
+    rng = random.Random(seed)
+    names = df["Nom commun"].tolist()
+    countries = df["Pays"].tolist()
+    queries = []
+    for _ in range(n_queries):
+        i = rng.randrange(len(names))
+        name, kind = names[i], rng.random()
+        if kind < 0.2:
+            query = name
+        elif kind < 0.4:
+            query = " ".join(name.split()[:2]).lower()
+        elif kind < 0.6:
+            pos = rng.randrange(len(name))
+            query = (name[:pos] + name[pos + 1:]).lower()
+        elif kind < 0.8:
+            query = f"{name} {countries[i]}".lower()
+        else:
+            query = f"{_proper_name(rng)} {rng.choice(KINDS)}".lower()
+        queries.append(query)
+    return queries
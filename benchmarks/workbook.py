@@ -0,0 +1,139 @@
+"""
+Synthetic xlsx workbooks shaped like the ANJ file, for offline benchmarks.
+
+    python -m benchmarks.workbook anj_synthetic.xlsx [--rows 100000] [--seed 0]
+
+Same sheet names as the ANJ list, source reference in A1, header on row 5 (row 4 for Billard),
+Sport / Pays / Genre (and Discipline) only written on the first row of each group like the
+merged cells of the real file, then "Nom commun" / "Restrictions" / "Phases".
+"""
+import argparse
+import random
+from io import BytesIO
+
+import openpyxl
+import pandas as pd
+
+from benchmarks.synthetic import COUNTRIES, GENRES, QUALIFIERS, _proper_name, synthetic_competitions
+
+SOURCE_REF = "Liste des compétitions ANJ - synthetic benchmark workbook"
+
+# Colonnes de chaque onglet, dans l'ordre du fichier ANJ
+SHEET_COLUMNS = {
+    "Football": ["Sport", "Pays", "Club/Nation", "Nom générique", "Genre", "Nom commun", "Restrictions", "Phases"],
+    "Badminton": ["Sport", "Discipline", "Pays", "Genre", "Nom commun", "Restrictions", "Phases"],
+    "Golf": ["Sport", "Pays", "Genre", "Nom commun", "Restrictions", "Phases"],
+    "Billard": ["Sport", "Discipline", "Pays", "Genre", "Nom commun", "Restrictions", "Phases"],
+}
+# Ligne d'en-tête (1-based) : Billard = 4, autres = 5
+HEADER_ROWS = {"Football": 5, "Badminton": 5, "Golf": 5, "Billard": 4}
+# Colonnes fusionnées dans le vrai fichier : valeur sur la première ligne du groupe seulement
+GROUPED_COLS = ["Sport", "Discipline", "Pays", "Genre"]
+
+# Compétitions réelles mêlées aux noms générés, pour que les règles des handlers s'exercent
+ANCHORS = {
+    "Badminton": ["Uber Cup", "Thomas Cup", "Sudirman Cup", "Jeux Olympiques", "Championnat du monde BWF",
+                  "Championnat d'Europe", "Jeux Européens", "BWF World Tour Finals"],
+    "Golf": ["Ryder Cup", "Solheim Cup", "Evian Championship", "Jeux Olympiques", "PGA Tour", "LPGA Tour",
+             "DP World Tour", "LIV International Golf Series"],
+    "Billard": ["Championnat du monde", "Masters", "UK Championship", "WST Classic", "Players Championship"],
+}
+KINDS = {
+    "Badminton": ["Open", "Masters", "International Challenge", "Super 300", "Super 500", "Super 750"],
+    "Golf": ["Open", "Championship", "Classic", "Invitational", "Masters", "Tour Championship"],
+    "Billard": ["Open", "Masters", "Classic", "Championship", "Shoot Out", "Grand Prix"],
+}
+DISCIPLINES = {"Badminton": ["Simple", "Double", "Simple et double"], "Billard": ["Snooker"]}
+
+
+def _minor_sheet(sheet: str, n_rows: int, rng: random.Random) -> pd.DataFrame:
+    rows, seen = [], set()
+    names = list(ANCHORS[sheet])
+    while len(rows) < n_rows:
+        if names:
+            name = names.pop(0)
+        else:
+            parts = [_proper_name(rng), rng.choice(KINDS[sheet])]
+            if rng.random() < 0.4:
+                parts.append(rng.choice(QUALIFIERS))
+            name = " ".join(parts)
+        genre = rng.choice(GENRES + ["Mixte"]) if sheet == "Badminton" else rng.choice(GENRES)
+        country = rng.choice(COUNTRIES)
+        if (name, genre, country) in seen:
+            continue
+        seen.add((name, genre, country))
+        rows.append({
+            "Sport": "Snooker" if sheet == "Billard" else sheet,
+            "Discipline": rng.choice(DISCIPLINES.get(sheet, [None])),
+            "Pays": country,
+            "Genre": genre,
+            "Nom commun": name,
+            "Restrictions": "Aucune" if rng.random() < 0.8 else "Hors phases de qualification",
+            "Phases": "Toutes" if rng.random() < 0.7 else "Tableau final uniquement",
+        })
+    return pd.DataFrame(rows)
+
+
+def synthetic_sheet_frames(rows: int, minor_rows: int = None, seed: int = 0) -> dict:
+    """Cleaned-looking frames per sheet (before the grouping blanks): Football gets `rows` rows."""
+    rng = random.Random(seed)
+    minor_rows = minor_rows if minor_rows is not None else max(len(ANCHORS["Badminton"]), rows // 10)
+    football = synthetic_competitions(rows, seed=seed)
+    football["Club/Nation"] = "Club"
+    football["Nom générique"] = football["Nom commun"].str.split().str[0]
+    frames = {"Football": football}
+    for sheet in ("Badminton", "Golf", "Billard"):
+        frames[sheet] = _minor_sheet(sheet, max(minor_rows, len(ANCHORS[sheet])), rng)
+    return frames
+
+
+def _sheet_rows(sheet: str, df: pd.DataFrame):
+    columns = SHEET_COLUMNS[sheet]
+    grouped = [c for c in GROUPED_COLS if c in columns]
+    df = df.sort_values(grouped, kind="stable")[columns]
+    previous = None
+    for record in df.itertuples(index=False, name=None):
+        values = dict(zip(columns, record))
+        # Une colonne groupée est vide tant qu'elle et les niveaux au-dessus ne changent pas
+        blank, same = set(), previous is not None
+        for col in grouped:
+            same = same and previous[col] == values[col]
+            if same:
+                blank.add(col)
+        yield [None if col in blank or pd.isna(values[col]) else values[col] for col in columns]
+        previous = values
+
+
+def write_workbook(frames: dict, out, source_ref: str = SOURCE_REF):
+    """Writes the frames as an ANJ-like xlsx to a path or binary file object."""
+    wb = openpyxl.Workbook(write_only=True)
+    for sheet, df in frames.items():
+        ws = wb.create_sheet(sheet)
+        ws.append([source_ref])
+        for _ in range(HEADER_ROWS[sheet] - 2):
+            ws.append([])
+        ws.append(SHEET_COLUMNS[sheet])
+        for row in _sheet_rows(sheet, df):
+            ws.append(row)
+    wb.save(out)
+
+
+def synthetic_workbook(rows: int, minor_rows: int = None, seed: int = 0) -> bytes:
+    """xlsx bytes of a synthetic ANJ workbook (what fetch_workbook would return)."""
+    buffer = BytesIO()
+    write_workbook(synthetic_sheet_frames(rows, minor_rows, seed), buffer)
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output")
+    parser.add_argument("--rows", type=int, default=1000, help="Football rows")
+    parser.add_argument("--minor-rows", type=int, help="rows of the other sheets (default: rows / 10)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_workbook(synthetic_sheet_frames(args.rows, args.minor_rows, args.seed), args.output)
+
+
+if __name__ == "__main__":
+    main()
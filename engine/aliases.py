@@ -0,0 +1,126 @@
+"""
+Query rewrites and competition nicknames of each sport, and the exact-hit lookup built on them.
+
+aliases.json holds one table per sport:
+- "rewrites": English -> French wording of the sheet, applied to whole words only, longest
+  phrase first, in a single pass (an AliasTable compiles them into one regex),
+- "nicknames": other names of a competition -> its "Nom commun".
+The "auto" table only holds the rewrites of the cross-sport search that no single sport has;
+that search applies every sport's rewrites, then these ones (which win on a conflict).
+A query equal to a competition name or a nickname (case, accents and spacing aside) is an
+exact hit: the handlers answer it from a hash lookup, without any fuzzy scoring.
+"""
+import json
+import re
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from engine.columns import COMPETITION_COL, GENRE_COL
+from engine.substring_index import get_sheet_index
+
+ALIASES_FILE = Path(__file__).resolve().parent / "aliases.json"
+# Table de la recherche multi-sports (même libellé que ses métriques)
+CROSS_SPORT = "auto"
+
+
+def alias_key(text) -> str:
+    """Lookup key of a name or query: accents removed, case folded, spaces collapsed."""
+    if not isinstance(text, str):
+        return ""
+    text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return " ".join(text.casefold().split())
+
+
+class AliasTable:
+    """Phrases rewritten in a (lower-cased) query: whole words only, longest first, one pass."""
+
+    def __init__(self, rewrites: dict):
+        self.rewrites = dict(rewrites)
+        phrases = sorted(self.rewrites, key=len, reverse=True)
+        self._pattern = re.compile(r"\b(" + "|".join(map(re.escape, phrases)) + r")\b") if phrases else None
+
+    def rewrite(self, query: str) -> str:
+        if self._pattern is None:
+            return query
+        return self._pattern.sub(lambda m: self.rewrites[m.group(1)], query)
+
+
+@dataclass(frozen=True)
+class SportAliases:
+    rewrites: AliasTable
+    nicknames: dict
+
+
+def load_aliases(path=ALIASES_FILE) -> dict:
+    """Sport -> SportAliases of an aliases.json file."""
+    with open(path, encoding="utf-8") as f:
+        tables = json.load(f)
+    return {sport: SportAliases(AliasTable(table.get("rewrites", {})), dict(table.get("nicknames", {})))
+            for sport, table in tables.items()}
+
+
+def merged_rewrites(aliases: dict) -> AliasTable:
+    """Rewrites of every table of load_aliases(), the CROSS_SPORT one last so that it wins."""
+    tables = sorted(aliases, key=lambda sport: sport == CROSS_SPORT)
+    return AliasTable({phrase: text for sport in tables for phrase, text in aliases[sport].rewrites.rewrites.items()})
+
+
+SPORT_ALIASES = load_aliases()
+
+
+@dataclass(frozen=True, eq=False)
+class ExactIndex:
+    """alias_key of every competition name and nickname -> positions of its rows (file order)."""
+    names: tuple
+    genres: tuple
+    rows_by_key: dict
+
+    @classmethod
+    def from_names(cls, names, genres, nicknames) -> "ExactIndex":
+        """nicknames: (nickname, competition name) pairs; those of absent competitions are ignored."""
+        positions = {}
+        for i, name in enumerate(names):
+            key = alias_key(name)
+            if key:
+                positions.setdefault(key, []).append(i)
+        by_nickname = {}
+        for nickname, name in nicknames:
+            by_nickname.setdefault(alias_key(nickname), set()).update(positions.get(alias_key(name), ()))
+        # Un vrai nom de compétition prime sur un surnom identique
+        for key, rows in by_nickname.items():
+            if key and rows and key not in positions:
+                positions[key] = sorted(rows)
+        return cls(tuple(names), tuple(genres),
+                   {key: np.array(rows, dtype=np.intp) for key, rows in positions.items()})
+
+    @classmethod
+    def from_frame(cls, df, nicknames) -> "ExactIndex":
+        genres = df[GENRE_COL] if GENRE_COL in df.columns else [None] * len(df)
+        return cls.from_names(list(df[COMPETITION_COL]), list(genres), nicknames)
+
+    def rows(self, *queries) -> np.ndarray | None:
+        """Rows of the first query that is a name or a nickname, None when none is."""
+        for query in queries:
+            rows = self.rows_by_key.get(alias_key(query))
+            if rows is not None:
+                return rows
+        return None
+
+    def matches(self, rows, score) -> list:
+        """(competition, score, genre) of the rows, one per competition and genre."""
+        matches, seen = [], set()
+        for i in rows:
+            key = (self.names[i], str(self.genres[i]))
+            if key not in seen:
+                seen.add(key)
+                matches.append((self.names[i], score, self.genres[i]))
+        return matches
+
+
+def get_exact_index(df, sport: str) -> ExactIndex:
+    """Exact-hit index of a loaded sheet with the nicknames of `sport`, built once per sheet content."""
+    nicknames = SPORT_ALIASES[sport].nicknames.items()
+    return get_sheet_index(df, f"exact_{sport.lower()}", lambda d: ExactIndex.from_frame(d, nicknames))
@@ -1,111 +1,464 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from email.utils import formatdate
+from http import HTTPStatus
+from urllib.parse import urlparse
+from urllib.request import url2pathname
 import pandas as pd
 import streamlit as st
 import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
 from io import BytesIO
+from engine import cross_sport, query_cache
+from engine.columns import COMPETITION_COL, RESTRICTION_COL, PHASES_COL, COUNTRY_COL, GENRE_COL, DISCIPLINE_COL
+from engine.decision_table import DecisionRecord, carry_over_tables, get_decision_table
+from engine.matcher import carry_over_index
+from engine.metrics import timed, timed_call
+from engine.regulators import (ANJ_LAYOUT, DEFAULT_REGULATOR, REGULATORS, SheetLayout,
+                               layout_for_url, regulator_for_url)
+from engine.sheet_diff import diff_workbook, sheet_hash, summary
+from engine.snapshot import SnapshotStore
 
-# Direct download URL for the Drive file
-ANJ_URL = "https://docs.google.com/spreadsheets/d/1-2Kkd2xk0xXcO5DMG0-RXpZ_EgdVQk9l/export?format=xlsx"
+logger = logging.getLogger(__name__)
 
-# Column names
-COMPETITION_COL = "Nom commun"
-RESTRICTION_COL = "Restrictions"
-PHASES_COL = "Phases"
-COUNTRY_COL = "Pays"
-GENRE_COL = "Genre"
-DISCIPLINE_COL = "Discipline"
+# Direct download URL for the Drive file (see engine/regulators.json)
+ANJ_URL = REGULATORS[DEFAULT_REGULATOR].url
 
 
-@st.cache_data
-def load_anj_data(url: str, sport_name: str) -> pd.DataFrame:
+# Sheets used by the chatbot (Snooker lives in the "Billard" tab)
+SHEET_NAMES = ["Football", "Badminton", "Golf", "Billard"]
+DEFAULT_SOURCE_REF = "ANJ Regulatory List"
+REQUEST_TIMEOUT = 30
+# Délai de connexion : une source injoignable ne bloque pas le chargement des autres
+CONNECT_TIMEOUT = 5
+# Connexions gardées ouvertes par hôte dans la session HTTP partagée
+HTTP_POOL_SIZE = max(4, len(REGULATORS))
+# Processus de parsing des classeurs (1 = dans le thread appelant) ; par défaut un par liste et par cœur
+PARSE_WORKERS = int(os.environ.get("ANJ_PARSE_WORKERS", "0")) or min(len(REGULATORS), os.cpu_count() or 1)
+# Âge (secondes) en dessous duquel le snapshot local est servi sans requête HTTP
+SNAPSHOT_MAX_AGE = int(os.environ.get("ANJ_SNAPSHOT_MAX_AGE", "0"))
+# Nombre de lignes inspectées pour trouver la ligne d'en-tête
+HEADER_SEARCH_ROWS = 10
+
+
+class FileAdapter(BaseAdapter):
+    """file:// URLs through a requests session (local lists, offline runs): 200, 304 or 404."""
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        path = url2pathname(urlparse(request.url).path)
+        try:
+            last_modified = formatdate(os.stat(path).st_mtime, usegmt=True)
+            response.headers["Last-Modified"] = last_modified
+            if request.headers.get("If-Modified-Since") == last_modified:
+                response.status_code, content = 304, b""
+            else:
+                with open(path, "rb") as f:
+                    response.status_code, content = 200, f.read()
+        except FileNotFoundError:
+            response.status_code, content = 404, b""
+        except OSError as e:
+            raise requests.ConnectionError(e, request=request)
+        response.reason = HTTPStatus(response.status_code).phrase
+        response.raw = BytesIO(content)
+        return response
+
+    def close(self):
+        pass
+
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+
+def http_session() -> requests.Session:
+    """Session shared by every download: connections reused across refreshes and sources."""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.mount("file://", FileAdapter())
+            _SESSION = session
+        return _SESSION
+
+
+@timed_call("download")
+def fetch_workbook(url: str, timeout: int = REQUEST_TIMEOUT) -> bytes:
+    response = http_session().get(url, timeout=(CONNECT_TIMEOUT, timeout))
+    response.raise_for_status()
+    return response.content
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def _clean_header(value) -> str:
+    # Nettoyage des noms de colonnes (enlève les retours à la ligne Excel)
+    return str(value).replace('\n', ' ').strip()
+
+
+def _find_header_row(raw: pd.DataFrame, sport_name: str, layout: SheetLayout = ANJ_LAYOUT) -> int:
+    """Index de la ligne d'en-tête : la première ligne contenant la colonne compétition."""
+    for idx in range(min(HEADER_SEARCH_ROWS, len(raw))):
+        if any(layout.column(_clean_header(v)) == COMPETITION_COL for v in raw.iloc[idx] if pd.notna(v)):
+            return idx
+    # ANJ : Billard = Ligne 4 (index 3), Autres = Ligne 5 (index 4)
+    return layout.header_row(sport_name)
+
+
+def prepare_sheet(raw: pd.DataFrame, sport_name: str, layout: SheetLayout = ANJ_LAYOUT) -> pd.DataFrame:
+    """
+    Turns a raw sheet (read with header=None) into the cleaned competition table, with the
+    columns of the engine (see engine.regulators for the layouts of the other regulators).
+    """
+    sport_name = layout.sheet_name(sport_name)
+    # 1. EXTRACT DYNAMIC SOURCE (Cell A1)
+    source_val = layout.source_ref or (raw.iloc[0, 0] if not raw.empty else DEFAULT_SOURCE_REF)
+
+    # 2. HEADER
+    header_idx = _find_header_row(raw, sport_name, layout)
+    df = raw.iloc[header_idx + 1:].reset_index(drop=True)
+    df.columns = [layout.column(_clean_header(c)) for c in raw.iloc[header_idx]]
+
+    cols_to_fill = [col for col in layout.propagate if col in df.columns]
+    df[cols_to_fill] = df[cols_to_fill].ffill(axis=0)
+
+    # Cleaning
+    df = df[df[COMPETITION_COL].notna()]
+
+    # Store metadata
+    df.attrs['source_ref'] = source_val
+    df.attrs['sport_name'] = sport_name
+    return df
+
+
+@timed_call("parse")
+def read_workbook(content: bytes, layout: SheetLayout = None) -> dict:
+    """Parses every sheet of the workbook in a single openpyxl pass (ANJ layout by default)."""
+    layout = layout or ANJ_LAYOUT
+    raw_sheets = pd.read_excel(BytesIO(content), engine='openpyxl', sheet_name=None, header=None)
+    sheets = {}
+    for sport_name, raw in raw_sheets.items():
+        try:
+            df = prepare_sheet(raw, sport_name, layout)
+        except KeyError:
+            # Onglet sans colonne "Nom commun" (notes, légende...) : ignoré
+            continue
+        # Empreinte par feuille : une feuille inchangée garde ses index et son cache au refresh
+        df.attrs['content_hash'] = sheet_hash(df)
+        sheets[df.attrs['sport_name']] = df
+    return sheets
+
+
+_PARSE_POOL = None
+
+
+def _parse_pool() -> ProcessPoolExecutor:
+    global _PARSE_POOL
+    with _SESSION_LOCK:
+        if _PARSE_POOL is None:
+            # Pas de fork : le processus a déjà des threads (rafraîchissements, session HTTP)
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _PARSE_POOL = ProcessPoolExecutor(PARSE_WORKERS, mp_context=multiprocessing.get_context(method))
+        return _PARSE_POOL
+
+
+def parse_workbook(content: bytes, layout: SheetLayout = None) -> dict:
+    """
+    read_workbook() in the pool of PARSE_WORKERS processes when there is one: openpyxl holds the
+    GIL, so the workbooks of several regulators are only parsed in parallel by separate processes.
+    """
+    if PARSE_WORKERS <= 1:
+        return read_workbook(content, layout)
+    with timed("parse"):
+        return _parse_pool().submit(read_workbook, content, layout).result()
+
+
+def snapshot_store(regulator: str = DEFAULT_REGULATOR) -> SnapshotStore:
+    """Local snapshot of a regulator's list: the snapshot directory itself for the ANJ, a sub-directory otherwise."""
+    store = SnapshotStore()
+    return store if regulator == DEFAULT_REGULATOR else SnapshotStore(store.directory / regulator)
+
+
+def snapshot_store_for_url(url: str) -> SnapshotStore:
+    """Snapshot of the regulator registered at url; any other URL gets its own sub-directory."""
+    source = regulator_for_url(url)
+    if source is not None:
+        return snapshot_store(source.key)
+    # Jamais le snapshot de l'ANJ : son repli hors ligne serait écrasé par une autre liste
+    return snapshot_store(f"url-{hashlib.sha256(url.encode('utf-8')).hexdigest()[:12]}")
+
+
+def refresh_workbook(url: str, store: SnapshotStore = None, max_age: int = SNAPSHOT_MAX_AGE,
+                     offline: bool = True, layout: SheetLayout = None) -> dict:
+    """
+    Returns the cleaned sheets, going through the local snapshot:
+    - snapshot younger than max_age: served without any HTTP request,
+    - conditional GET (ETag / If-Modified-Since): 304 or same content hash -> snapshot reused,
+    - new content: parsed once and written back to the snapshot, diffed against the previous
+      snapshot (change log + incremental update of the warm caches),
+    - network error: the last snapshot is served (offline mode), or the error is raised
+      when offline=False (background refresh keeping its current sheets).
+    url may be a file:// URL; store and layout default to those of the regulator at url.
+    """
+    store = store or snapshot_store_for_url(url)
+    layout = layout or layout_for_url(url)
+    meta = store.load_meta()
+    if meta and meta.get("source_url") != url:
+        meta = None
+
+    if meta and max_age and store.age(meta) < max_age:
+        try:
+            return store.load_sheets(meta)
+        except Exception as e:
+            logger.warning("Unreadable ANJ snapshot, refetching: %s", e)
+            meta = None
+
+    headers = {}
+    if meta and meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta and meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        with timed("download"):
+            response = http_session().get(url, headers=headers, timeout=(CONNECT_TIMEOUT, REQUEST_TIMEOUT))
+        if response.status_code != 304:
+            response.raise_for_status()
+    except requests.RequestException as e:
+        if not meta or not offline:
+            raise
+        logger.warning("ANJ source unreachable, serving snapshot from %s: %s", meta.get("fetched_at"), e)
+        return store.load_sheets(meta)
+
+    validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "fetched_at": time.time(),
+    }
+
+    if meta and (response.status_code == 304 or meta.get("content_hash") == content_hash(response.content)):
+        try:
+            sheets = store.load_sheets(meta)
+            if response.status_code == 304:
+                validators = {k: v or meta.get(k) for k, v in validators.items()}
+            store.write_meta(dict(meta, **validators))
+            for df in sheets.values():
+                df.attrs['fetched_at'] = validators["fetched_at"]
+            return sheets
+        except Exception as e:
+            logger.warning("Unreadable ANJ snapshot, refetching: %s", e)
+            if response.status_code == 304:
+                # Le 304 n'a pas de corps : téléchargement complet
+                return _parse_and_store(fetch_workbook(url), url, store, layout,
+                                        dict(validators, etag=None, last_modified=None))
+
+    return _parse_and_store(response.content, url, store, layout, validators, previous_meta=meta)
+
+
+def _parse_and_store(content: bytes, url: str, store: SnapshotStore, layout: SheetLayout, validators: dict,
+                     previous_meta: dict = None) -> dict:
+    sheets = parse_workbook(content, layout)
+    previous = None
+    if previous_meta:
+        try:
+            previous = store.load_sheets(previous_meta)
+        except Exception as e:
+            logger.warning("Previous ANJ snapshot unreadable, no change log for this refresh: %s", e)
+    meta = {
+        "source_url": url,
+        "source_ref": next((df.attrs.get('source_ref') for df in sheets.values()), DEFAULT_SOURCE_REF),
+        "content_hash": content_hash(content),
+        **validators,
+    }
+    for df in sheets.values():
+        df.attrs['fetched_at'] = meta["fetched_at"]
+        df.attrs['source_url'] = url
+    try:
+        store.save(sheets, meta)
+    except OSError as e:
+        # Disque en lecture seule : on sert quand même les données fraîches
+        logger.warning("Could not write ANJ snapshot: %s", e)
+    if previous is not None:
+        _record_changes(previous, sheets, previous_meta, meta, store)
+    return sheets
+
+
+def refresh_regulators(sources=None, **kwargs) -> dict:
+    """
+    key -> sheets of every registered regulator (or of `sources`), each through refresh_workbook()
+    with its own snapshot. The lists are downloaded concurrently on the shared session and parsed
+    in parallel (parse_workbook), so loading them all takes about as long as the slowest one.
+    """
+    sources = list(REGULATORS.values() if sources is None else sources)
+    if not sources:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="regulator") as pool:
+        futures = {source.key: pool.submit(refresh_workbook, source.url, store=snapshot_store(source.key),
+                                           layout=source.layout, **kwargs)
+                   for source in sources}
+        return {key: future.result() for key, future in futures.items()}
+
+
+def _record_changes(previous: dict, sheets: dict, previous_meta: dict, meta: dict, store: SnapshotStore):
+    with timed("diff"):
+        changes = diff_workbook(previous, sheets)
+    carry_over_caches(previous, sheets, changes)
+    if not changes["sheets"]:
+        return
+    logger.info("ANJ list changed: %s", summary(changes))
+    changes.update({
+        "source_url": meta["source_url"],
+        "source_ref": meta["source_ref"],
+        "previous_content_hash": previous_meta.get("content_hash"),
+        "content_hash": meta["content_hash"],
+        "previous_fetched_at": previous_meta.get("fetched_at"),
+        "fetched_at": meta["fetched_at"],
+    })
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        content = BytesIO(response.content)
+        store.append_change_log(changes)
+    except OSError as e:
+        logger.warning("Could not write the ANJ change log: %s", e)
 
-        # 1. EXTRACT DYNAMIC SOURCE (Cell A1)
-        df_meta = pd.read_excel(content, engine='openpyxl', sheet_name=sport_name, nrows=1, header=None)
-        source_val = df_meta.iloc[0, 0] if not df_meta.empty else "ANJ Regulatory List"
 
-        content.seek(0)
+def carry_over_caches(old_sheets: dict, new_sheets: dict, changes: dict):
+    """
+    Derives the indexes, decision tables and cached decisions of the refreshed sheets from those
+    of the previous version still in memory, recomputing only the competitions in the diff.
+    """
+    for sheet, new in new_sheets.items():
+        old = old_sheets.get(sheet)
+        if old is None or old.attrs.get('content_hash') == new.attrs.get('content_hash'):
+            continue
+        competitions = changes["sheets"].get(sheet, {}).get("competitions", [])
+        carry_over_index(old, new)
+        carry_over_tables(old, new, competitions)
+        query_cache.carry_over(old, new, competitions)
+    cross_sport.carry_over_index(old_sheets, new_sheets)
 
-        # 2. LOAD FULL DATA
-        df = pd.read_excel(content, engine='openpyxl', sheet_name=sport_name, header=None)
 
-        # --- AJUSTEMENT DE LA LIGNE D'EN-TETE ---
-        # Billard = Ligne 4 (index 3), Autres = Ligne 5 (index 4)
-        header_idx = 3 if sport_name == "Billard" else 4
+@st.cache_resource(show_spinner=False)
+def get_refresher(url: str):
+    """Background refresher of the ANJ sheets shared by every session, started by the first page load."""
+    # Imports locaux : refresher et screen importent les handlers, qui importent ce module
+    from engine.refresher import DatasetRefresher
+    from engine.screen import warm_sheets
+    return DatasetRefresher(url, warm=warm_sheets).start()
 
-        df.columns = df.iloc[header_idx]
-        df = df.iloc[header_idx + 1:].reset_index(drop=True)
 
-        # Nettoyage des noms de colonnes (enlève les retours à la ligne Excel)
-        df.columns = [str(c).replace('\n', ' ').strip() for c in df.columns]
+@st.cache_resource(show_spinner=False)
+def start_refreshers() -> dict:
+    """Refreshers of every registered regulator, started together: their lists load concurrently."""
+    return {key: get_refresher(source.url) for key, source in REGULATORS.items()}
 
-        # List of columns to propagate (ffill)
-        propagation_cols = ['Sport', 'Discipline', 'Pays', 'Club/Nation', 'Nom générique', 'Genre']
-        cols_to_fill = [col for col in propagation_cols if col in df.columns]
-        df[cols_to_fill] = df[cols_to_fill].ffill(axis=0)
 
-        # Cleaning
-        df = df[df[COMPETITION_COL].notna()]
+def load_anj_workbook(url: str) -> Mapping:
+    """
+    Sheets currently served, shared by every session and rerun (one download and one parse for
+    every sport): a read-only mapping whose frames must not be mutated.
+    """
+    return get_refresher(url).current()
 
-        # Store metadata
-        df.attrs['source_ref'] = source_val
-        df.attrs['sport_name'] = sport_name
 
-        return df
+def load_anj_data(url: str, sport_name: str) -> pd.DataFrame:
+    """
+    One sheet of the served version, without copying its data: a copy-on-write view of the shared
+    frame, so a caller writing to it only ever modifies its own view (pandas >= 3, where
+    copy-on-write is always on: see requirements.txt).
+    """
+    try:
+        sheets = get_refresher(url).current()
+        if sport_name not in sheets:
+            raise KeyError(f"Worksheet named '{sport_name}' not found")
+        return sheets[sport_name].copy(deep=False)
     except Exception as e:
         st.error(f"Error loading {sport_name} data: {e}")
         return pd.DataFrame()
 
 
+def get_source_ref(url: str) -> str:
+    """Source reference (cell A1) without copying any sheet."""
+    try:
+        sheets = load_anj_workbook(url)
+    except Exception:
+        return DEFAULT_SOURCE_REF
+    for df in sheets.values():
+        return df.attrs.get('source_ref', DEFAULT_SOURCE_REF)
+    return DEFAULT_SOURCE_REF
+
+
+def _resolve_fr_sport(row: dict) -> DecisionRecord:
+    restrictions_value = row.get(RESTRICTION_COL)
+    phases_value = row.get(PHASES_COL)
+
+    # --- LOGIQUE FIFA ---
+    if str(restrictions_value).strip() == "Classement FIFA **":
+        restrictions_code = "Classement FIFA **"
+        phases_code = "** FIFA category A international friendly matches, between two teams both ranked in the top fifty of the FIFA rankings..."
+    else:
+        is_restrictions_none = pd.isna(restrictions_value) or str(restrictions_value).strip().lower() in ['aucune',
+                                                                                                          'none']
+        is_phases_none = pd.isna(phases_value) or str(phases_value).strip().lower() in ['aucune', 'all', 'toutes']
+
+        restrictions_code = "NONE" if is_restrictions_none else str(restrictions_value)
+        phases_code = "ALL" if is_phases_none else str(phases_value)
+
+        if phases_code != "ALL" and restrictions_code == "NONE":
+            restrictions_code = "LIMITED_PHASES"
+
+    return DecisionRecord(
+        competition=row[COMPETITION_COL],
+        genre=str(row.get(GENRE_COL, "N/A")),
+        country=str(row.get(COUNTRY_COL, "International")),
+        restrictions=restrictions_code,
+        phases=phases_code,
+    )
+
+
 def decide_fr_sport(comp_name: str, df: pd.DataFrame, genre: str = None, discipline: str = None):
     try:
+        table = get_decision_table(df, "fr_sport", _resolve_fr_sport, casefold=True)
+
         # 1. Filtrage par nom
-        mask = df[COMPETITION_COL].str.lower() == comp_name.lower()
+        comp_key = comp_name.lower()
 
         # 2. Filtrage par Genre (Uniquement si la colonne existe ET que le sport n'est pas Golf/Snooker)
         # On sécurise ici pour éviter le crash si GENRE_COL est absent
-        if genre and GENRE_COL in df.columns and genre != "N/A":
-            mask = mask & (df[GENRE_COL].str.lower() == genre.lower())
+        genre_key = None
+        if genre and table.has_genre and genre != "N/A":
+            genre_key = genre.lower()
 
         # 3. Filtrage par Discipline (Singles/Doubles)
-        if discipline and DISCIPLINE_COL in df.columns:
-            search_discipline = "Simple" if discipline == "Singles" else "Double"
-            mask = mask & (df[DISCIPLINE_COL].str.lower() == search_discipline.lower())
+        discipline_key = None
+        if discipline and table.has_discipline:
+            discipline_key = "simple" if discipline == "Singles" else "double"
 
-        if not mask.any():
+        record = table.lookup(comp_key, genre=genre_key, discipline=discipline_key)
+        if record is None:
             return {"allowed": False, "competition": comp_name}
 
-        row = df[mask].iloc[0]
-        restrictions_value = row.get(RESTRICTION_COL)
-        phases_value = row.get(PHASES_COL)
-
-        # --- LOGIQUE FIFA ---
-        if str(restrictions_value).strip() == "Classement FIFA **":
-            restrictions_code = "Classement FIFA **"
-            phases_code = "** FIFA category A international friendly matches, between two teams both ranked in the top fifty of the FIFA rankings..."
-        else:
-            is_restrictions_none = pd.isna(restrictions_value) or str(restrictions_value).strip().lower() in ['aucune',
-                                                                                                              'none']
-            is_phases_none = pd.isna(phases_value) or str(phases_value).strip().lower() in ['aucune', 'all', 'toutes']
-
-            restrictions_code = "NONE" if is_restrictions_none else str(restrictions_value)
-            phases_code = "ALL" if is_phases_none else str(phases_value)
-
-            if phases_code != "ALL" and restrictions_code == "NONE":
-                restrictions_code = "LIMITED_PHASES"
-
         return {
             "allowed": True,
             "competition": comp_name,
-            "restrictions": restrictions_code,
-            "phases": phases_code,
+            "restrictions": record.restrictions,
+            "phases": record.phases,
             "source": df.attrs.get('source_ref', "ANJ Source"),
-            "country": str(row.get(COUNTRY_COL, "International")),
+            "country": record.country,
             "sport": df.attrs.get('sport_name'),
-            "genre": str(row.get(GENRE_COL, "N/A")),
+            "genre": record.genre,
             "discipline": discipline if discipline else "N/A"
         }
     except Exception:
-        return {"allowed": False, "competition": comp_name, "source": df.attrs.get('source_ref', "ANJ Source")}
\ No newline at end of file
+        return {"allowed": False, "competition": comp_name, "source": df.attrs.get('source_ref', "ANJ Source")}
@@ -0,0 +1,265 @@
+"""
+Typeahead over the competition names of every sport.
+
+The words of every "Nom commun" (accents removed, case folded), of the nicknames of
+aliases.json and the CONCEPT_GROUPS variants of those words ("spanish" for "Rey", "cup" for
+"Coppa") are kept in one sorted term array with, for each term, the suggestions containing it.
+Every typed word is a prefix of a term ("cop del r"); the suggestions matching every word are
+ranked by frequency: entries of the competition in the list (one per country, genre and
+discipline), plus the times it was picked.
+A word that prefixes no term is matched with an edit distance of 1 (2 from 6 letters).
+
+    suggest("coupe de fr", sheets, k=8, sports=["Football"]) -> [Suggestion(...), ...]
+"""
+import bisect
+import re
+import threading
+import weakref
+from dataclasses import dataclass
+
+import numpy as np
+from rapidfuzz import process
+from rapidfuzz.distance import Levenshtein
+
+from engine.aliases import SPORT_ALIASES, alias_key
+from engine.cross_sport import get_cross_sport_index
+from engine.matcher import CONCEPT_GROUPS
+from engine.metrics import timed, timed_call
+
+DEFAULT_SUGGESTIONS = 8
+# Poids d'un choix de l'analyste, en entrées de la liste
+PICK_WEIGHT = 5.0
+# Préfixes dont l'union des listes est calculée à la construction (les autres à la demande)
+PRECOMPUTED_PREFIX_LENGTH = 2
+PREFIX_CACHE_SIZE = 4096
+# Les mots plus courts ne sont pas corrigés (trop de termes à distance 1)
+MIN_FUZZY_LENGTH = 3
+MAX_FUZZY_TERMS = 64
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _words(text) -> list:
+    return _WORD_RE.findall(alias_key(text))
+
+
+@dataclass(frozen=True, slots=True)
+class Suggestion:
+    competition: str
+    sport: str
+    genre: str | None
+    weight: float
+
+
+class AutocompleteIndex:
+    """Sorted terms -> suggestion ids, one suggestion per (competition, sport, genre)."""
+
+    def __init__(self, names, sports, genres, nicknames: dict = None):
+        """names / sports / genres: one entry per row or index entry; nicknames: sport -> {nickname: name}."""
+        ids, suggestions, weights = {}, [], []
+        for name, sport, genre in zip(names, sports, genres):
+            if not isinstance(name, str) or not name.strip():
+                continue
+            genre = genre if isinstance(genre, str) else None
+            key = (name, sport, genre)
+            if key not in ids:
+                ids[key] = len(suggestions)
+                suggestions.append(key)
+                weights.append(0.0)
+            weights[ids[key]] += 1
+        self.suggestions = suggestions
+        self._ids = ids
+        self.weights = np.array(weights, dtype=float)
+        self.sports = np.array([s for _, s, _ in suggestions], dtype=object)
+        self._lengths = np.array([len(n) for n, _, _ in suggestions], dtype=np.int64)
+        self._rank_weights()
+
+        literal, expanded = {}, {}
+        by_name = {}
+        keys = {name: alias_key(name) for name, _, _ in suggestions}
+        for i, (name, sport, _) in enumerate(suggestions):
+            key = keys[name]
+            by_name.setdefault((key, sport), []).append(i)
+            for word in _WORD_RE.findall(key):
+                literal.setdefault(word, set()).add(i)
+        for sport, table in (nicknames or {}).items():
+            for nickname, name in table.items():
+                targets = by_name.get((alias_key(name), sport), ())
+                for word in _words(nickname):
+                    literal.setdefault(word, set()).update(targets)
+        # Variantes de concept : "spanish", "espagne"... trouvent aussi les noms contenant "rey", "españa"...
+        for variants in CONCEPT_GROUPS.values():
+            group = {w for v in variants for w in _words(v)}
+            members = set().union(*(literal.get(w, ()) for w in group))
+            if members:
+                for word in group:
+                    expanded.setdefault(word, set()).update(members)
+
+        self.terms = sorted(literal.keys() | expanded.keys())
+        self.postings = [np.array(sorted(literal.get(t, set()) | expanded.get(t, set())), dtype=np.int64)
+                         for t in self.terms]
+        self.literal = [np.array(sorted(literal.get(t, ())), dtype=np.int64) for t in self.terms]
+        self._sport_masks = {s: self.sports == s for s in set(self.sports)}
+        # Sessions Streamlit et pool du service interrogent le même index depuis plusieurs threads
+        self._lock = threading.Lock()
+        self._prefix_cache = {}
+        self._prefixes_by_length = {}
+        self._precompute_prefixes(PRECOMPUTED_PREFIX_LENGTH)
+
+    @classmethod
+    def from_cross_sport(cls, index) -> "AutocompleteIndex":
+        nicknames = {sport: aliases.nicknames for sport, aliases in SPORT_ALIASES.items()}
+        return cls(index.competitions.names, index.sports, index.competitions.genres, nicknames)
+
+    def __len__(self):
+        return len(self.suggestions)
+
+    def _rank_weights(self):
+        # Rang entier de chaque suggestion : poids, puis nom le plus court, puis ordre du fichier
+        order = np.lexsort((np.arange(len(self.weights)), self._lengths, -self.weights))
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order), 0, -1)
+        # Remplacé d'un bloc : suggest() ne lit jamais un rang à moitié recalculé
+        self._rank = rank
+
+    def _union(self, arrays) -> np.ndarray:
+        if not arrays:
+            return np.empty(0, dtype=np.int64)
+        if len(arrays) == 1:
+            return arrays[0]
+        if sum(len(a) for a in arrays) < len(self) // 16:
+            return np.unique(np.concatenate(arrays))
+        # Grandes listes : un masque sur toutes les suggestions évite le tri de np.unique
+        mask = np.zeros(len(self), dtype=bool)
+        for a in arrays:
+            mask[a] = True
+        return np.flatnonzero(mask)
+
+    def _intersect(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        if len(a) + len(b) < len(self) // 16:
+            return np.intersect1d(a, b, assume_unique=True)
+        mask = np.zeros(len(self), dtype=bool)
+        mask[b] = True
+        return a[mask[a]]
+
+    def _precompute_prefixes(self, length: int):
+        groups = {}
+        for i, term in enumerate(self.terms):
+            for n in range(1, min(length, len(term)) + 1):
+                groups.setdefault(term[:n], []).append(i)
+        for prefix, positions in groups.items():
+            self._prefix_cache[prefix] = (self._union([self.postings[i] for i in positions]),
+                                          self._union([self.literal[i] for i in positions if len(self.literal[i])]))
+
+    def _cache(self, key: str, ids: tuple) -> tuple:
+        with self._lock:
+            if len(self._prefix_cache) >= PREFIX_CACHE_SIZE:
+                self._prefix_cache.pop(next(iter(self._prefix_cache)))
+            self._prefix_cache[key] = ids
+        return ids
+
+    def _prefix_ids(self, prefix: str) -> tuple | None:
+        """(suggestions with a term starting with prefix, those where the term is in the name or a
+        nickname rather than a concept variant), None when no term starts with prefix."""
+        ids = self._prefix_cache.get(prefix)
+        if ids is not None:
+            return ids
+        lo = bisect.bisect_left(self.terms, prefix)
+        hi = bisect.bisect_left(self.terms, prefix + "\U0010ffff", lo)
+        if lo == hi:
+            return None
+        return self._cache(prefix, (self._union(self.postings[lo:hi]),
+                                    self._union([a for a in self.literal[lo:hi] if len(a)])))
+
+    def _prefixes(self, length: int) -> list:
+        """Distinct starts of `length` characters of the terms."""
+        prefixes = self._prefixes_by_length.get(length)
+        if prefixes is None:
+            prefixes = self._prefixes_by_length[length] = list(dict.fromkeys(t[:length] for t in self.terms))
+        return prefixes
+
+    def _fuzzy_ids(self, word: str) -> tuple:
+        """Suggestions with a term starting within edit distance of word (a typo: never literal)."""
+        empty = np.empty(0, dtype=np.int64)
+        if len(word) < MIN_FUZZY_LENGTH:
+            return empty, empty
+        # Mis en cache : chaque frappe renvoie aussi les mots déjà tapés
+        key = "~" + word
+        ids = self._prefix_cache.get(key)
+        if ids is not None:
+            return ids
+        max_distance = 1 if len(word) < 6 else 2
+        # Le début voulu peut avoir une lettre de plus ou de moins que le mot tapé
+        matched = []
+        for length in range(max(MIN_FUZZY_LENGTH, len(word) - 1), len(word) + 2):
+            hits = process.extract(word, self._prefixes(length), scorer=Levenshtein.distance,
+                                   score_cutoff=max_distance, limit=MAX_FUZZY_TERMS)
+            matched.extend(self._prefix_ids(prefix)[0] for prefix, _, _ in hits)
+        return self._cache(key, (self._union(matched), empty))
+
+    def suggest(self, text: str, k: int = DEFAULT_SUGGESTIONS, sports=None) -> list:
+        """
+        Top-k suggestions whose words start with the typed words, in any order: first those matching
+        the most typed words literally (not through a concept variant or a typo), then by weight.
+        """
+        words = list(dict.fromkeys(_words(text)))
+        if not words or k <= 0:
+            return []
+        candidates, literal = None, []
+        # Mots les plus longs d'abord : les plus sélectifs, l'intersection rétrécit vite
+        for word in sorted(words, key=len, reverse=True):
+            ids, literal_ids = self._prefix_ids(word) or self._fuzzy_ids(word)
+            candidates = ids if candidates is None else self._intersect(candidates, ids)
+            if not len(candidates):
+                return []
+            literal.append(literal_ids)
+        if sports:
+            mask = np.zeros(len(self), dtype=bool)
+            for sport in sports:
+                mask |= self._sport_masks.get(sport, False)
+            candidates = candidates[mask[candidates]]
+        score = self._rank[candidates]
+        flags = np.zeros(len(self), dtype=bool)
+        for literal_ids in literal:
+            flags[:] = False
+            flags[literal_ids] = True
+            score = score + flags[candidates] * len(self)
+        if len(candidates) > k:
+            top = np.argpartition(-score, k)[:k]
+            candidates, score = candidates[top], score[top]
+        candidates = candidates[np.argsort(-score)]
+        return [Suggestion(*self.suggestions[i], float(self.weights[i])) for i in candidates]
+
+    def record_pick(self, suggestion: Suggestion):
+        """Counts a chosen suggestion: it ranks higher for everyone afterwards."""
+        i = self._ids.get((suggestion.competition, suggestion.sport, suggestion.genre))
+        if i is not None:
+            with self._lock:
+                self.weights[i] += PICK_WEIGHT
+                self._rank_weights()
+
+
+# Un index par index multi-sports (même durée de vie : libéré quand celui-ci sort du cache)
+_AUTOCOMPLETE_INDEXES = weakref.WeakKeyDictionary()
+
+
+def get_autocomplete_index(sheets: dict) -> AutocompleteIndex:
+    """Typeahead index of the loaded sheets, built once per workbook content."""
+    cross_index = get_cross_sport_index(sheets)
+    index = _AUTOCOMPLETE_INDEXES.get(cross_index)
+    if index is None:
+        with timed("autocomplete_build", "auto"):
+            index = AutocompleteIndex.from_cross_sport(cross_index)
+        _AUTOCOMPLETE_INDEXES[cross_index] = index
+    return index
+
+
+@timed_call("suggest", "auto")
+def suggest(text: str, sheets: dict, k: int = DEFAULT_SUGGESTIONS, sports=None) -> list:
+    """Top-k competitions (all sports, or `sports` only) completing what the analyst is typing."""
+    return get_autocomplete_index(sheets).suggest(text, k, sports)
+
+
+def record_pick(suggestion: Suggestion, sheets: dict):
+    """Ranks a suggestion the analyst picked higher in the next suggestions."""
+    get_autocomplete_index(sheets).record_pick(suggestion)
@@ -1,6 +1,13 @@
 import pandas as pd
+import numpy as np
 import re
+from dataclasses import dataclass
 from engine.anj_loader import COMPETITION_COL, GENRE_COL, DISCIPLINE_COL, RESTRICTION_COL, PHASES_COL, COUNTRY_COL
+from engine.aliases import SPORT_ALIASES, get_exact_index
+from engine.decision_table import DecisionRecord, get_decision_table
+from engine.metrics import timed_call
+from engine.query_cache import cached_query
+from engine.substring_index import SubstringIndex, get_sheet_index
 
 
 def clean_string(s):
@@ -8,82 +15,111 @@ def clean_string(s):
     return re.sub(r'[^a-z0-9]', '', str(s).lower())
 
 
+# Coupes par équipes : la discipline du fichier est ignorée
+TEAM_CUPS = ("uber", "thomas", "sudirman")
+
+
+@dataclass(frozen=True, eq=False)
+class BadmintonIndex:
+    """Cleaned names, disciplines and cup flags of the badminton sheet, computed once at load."""
+    names: tuple
+    genres: tuple
+    substrings: SubstringIndex
+    # cups[word][i] : le nom nettoyé de la ligne i contient la coupe `word`
+    cups: dict
+    is_cup: np.ndarray
+    singles: np.ndarray
+    doubles: np.ndarray
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "BadmintonIndex":
+        names = tuple(str(n) for n in df[COMPETITION_COL])
+        clean_names = [clean_string(n).replace("bwf", "") for n in names]
+        disciplines = [str(d).lower() for d in df[DISCIPLINE_COL]]
+        cups = {word: np.array([word in n for n in clean_names], dtype=bool) for word in TEAM_CUPS}
+        return cls(
+            names=names,
+            genres=tuple(df[GENRE_COL]),
+            substrings=SubstringIndex(clean_names),
+            cups=cups,
+            is_cup=np.logical_or.reduce(list(cups.values())),
+            singles=np.array(["simple" in d for d in disciplines], dtype=bool),
+            doubles=np.array(["double" in d for d in disciplines], dtype=bool),
+        )
+
+
+def _filter_rows(index: BadmintonIndex, rows: np.ndarray, query_clean: str, selected_discipline) -> np.ndarray:
+    # --- CAS A : LES "CUPS" (Uber, Thomas, Sudirman) ---
+    # On bypass la discipline stricte car ce sont des tournois mixtes/equipes
+    cup_ok = np.zeros(len(rows), dtype=bool)
+    for word, mask in index.cups.items():
+        if word in query_clean:
+            cup_ok |= mask[rows]
+
+    # --- CAS B : JEUX OLYMPIQUES / EUROPÉENS / CHAMPIONNATS ---
+    # La discipline choisie (Singles/Doubles) doit être incluse dans la colonne du fichier
+    # (Gère "Simple", "Double", ou "Simple et double")
+    discipline_ok = (index.singles if selected_discipline == "Singles" else index.doubles)[rows]
+    return rows[np.where(index.is_cup[rows], cup_ok, discipline_ok)]
+
+
+@timed_call("search", "Badminton")
+@cached_query(normalize_text=True)
 def handle_badminton_search(user_prompt, df_anj, selected_discipline):
     # 1. TRADUCTION PRÉVENTIVE
     # On transforme la requête pour qu'elle contienne les mots du fichier Excel FR
-    query_raw = user_prompt.lower()
-    mapping_keywords = {
-        "olympic games": "jeux olympiques",
-        "olympic": "olympiques",
-        "european games": "jeux europeens",
-        "european championship": "championnat d'europe",
-        "world championship": "championnat du monde",
-        "world championships": "championnat du monde"
-    }
-    for eng, fr in mapping_keywords.items():
-        query_raw = query_raw.replace(eng, fr)
+    query_raw = SPORT_ALIASES["Badminton"].rewrites.rewrite(user_prompt.lower())
 
     # 2. NETTOYAGE FINAL
     query_clean = clean_string(query_raw).replace("bwf", "")
-    matches = []
+    index = get_sheet_index(df_anj, "badminton", BadmintonIndex.from_frame)
 
     # 3. LOGIQUE DE RECHERCHE
-    for idx, row in df_anj.iterrows():
-        file_name_orig = str(row[COMPETITION_COL])
-        file_name_clean = clean_string(file_name_orig).replace("bwf", "")
-
-        # Test de correspondance
-        if query_clean in file_name_clean or file_name_clean in query_clean:
-
-            file_genre = str(row[GENRE_COL]).lower()
-            file_discipline = str(row[DISCIPLINE_COL]).lower()
-
-            # --- CAS A : LES "CUPS" (Uber, Thomas, Sudirman) ---
-            # On bypass la discipline stricte car ce sont des tournois mixtes/equipes
-            is_cup = any(word in file_name_clean for word in ["uber", "thomas", "sudirman"])
-
-            if is_cup:
-                if "uber" in query_clean and "uber" in file_name_clean:
-                    matches.append((file_name_orig, 100, row[GENRE_COL]))
-                elif "thomas" in query_clean and "thomas" in file_name_clean:
-                    matches.append((file_name_orig, 100, row[GENRE_COL]))
-                elif "sudirman" in query_clean and "sudirman" in file_name_clean:
-                    matches.append((file_name_orig, 100, row[GENRE_COL]))
-
-            # --- CAS B : JEUX OLYMPIQUES / EUROPÉENS / CHAMPIONNATS ---
-            else:
-                # On vérifie si la discipline choisie (Singles/Doubles) est incluse dans la colonne du fichier
-                # (Gère "Simple", "Double", ou "Simple et double")
-                search_val = "simple" if selected_discipline == "Singles" else "double"
-                if search_val in file_discipline:
-                    matches.append((file_name_orig, 100, row[GENRE_COL]))
-
-    return list(set(matches))
-
-
+    # Nom exact ou surnom connu : ses lignes directement, si l'une passe le filtre de discipline
+    keep = None
+    rows = get_exact_index(df_anj, "Badminton").rows(user_prompt, query_raw)
+    if rows is not None:
+        keep = _filter_rows(index, rows, query_clean, selected_discipline)
+    if keep is None or not len(keep):
+        # Test de correspondance : le nom contient la requête ou la requête contient le nom
+        rows = index.substrings.rows_either_way(query_clean)
+        keep = _filter_rows(index, rows, query_clean, selected_discipline)
+
+    return list({(index.names[i], 100, index.genres[i]): None for i in keep})
+
+
+def _resolve_badminton(row: dict) -> DecisionRecord:
+    return DecisionRecord(
+        competition=row[COMPETITION_COL],
+        genre=str(row[GENRE_COL]),
+        country=str(row[COUNTRY_COL]) if not pd.isna(row[COUNTRY_COL]) else "International",
+        restrictions=str(row[RESTRICTION_COL]) if not pd.isna(row[RESTRICTION_COL]) else "NONE",
+        phases=str(row[PHASES_COL]) if not pd.isna(row[PHASES_COL]) else "ALL",
+    )
+
+
+@timed_call("decide", "Badminton")
+@cached_query(normalize_text=False)
 def decide_badminton(comp_name: str, df: pd.DataFrame, genre: str = None, discipline: str = None):
-    # On cherche la ligne
-    mask = (df[COMPETITION_COL] == comp_name)
-    if genre:
-        mask = mask & (df[GENRE_COL] == genre)
-
     try:
-        rows = df[mask]
-        if rows.empty:
+        table = get_decision_table(df, "badminton", _resolve_badminton)
+        # On cherche la ligne
+        record = table.lookup(comp_name, genre=genre or None)
+        if record is None:
             # Fallback sans le genre si besoin
-            row = df[df[COMPETITION_COL] == comp_name].iloc[0]
-        else:
-            row = rows.iloc[0]
+            record = table.lookup(comp_name)
+        if record is None:
+            raise LookupError(comp_name)
 
         return {
             "allowed": True,
             "competition": comp_name,
-            "restrictions": str(row[RESTRICTION_COL]) if not pd.isna(row[RESTRICTION_COL]) else "NONE",
-            "phases": str(row[PHASES_COL]) if not pd.isna(row[PHASES_COL]) else "ALL",
+            "restrictions": record.restrictions,
+            "phases": record.phases,
             "source": df.attrs.get('source_ref', "ANJ Source"),
-            "country": str(row[COUNTRY_COL]) if not pd.isna(row[COUNTRY_COL]) else "International",
+            "country": record.country,
             "sport": "Badminton",
-            "genre": str(row[GENRE_COL])
+            "genre": record.genre
         }
     except:
-        return {"allowed": False, "competition": comp_name}
\ No newline at end of file
+        return {"allowed": False, "competition": comp_name}
@@ -0,0 +1,188 @@
+"""
+Precomputed decision catalogue of the ANJ list, for front-ends that serve answers without the engine.
+
+For every competition of every sheet, and every genre (and every discipline for Badminton), the
+decision is resolved with the same decide_* as the chatbot and rendered in every language of
+TEMPLATES. The catalogue is written as JSON (or MessagePack with the msgpack package), keyed by
+source_ref: building into an existing file adds or replaces the catalogue of that source only.
+
+    python -m engine.catalogue --out catalogue.json [--workbook anj.xlsx | --url URL] [--format json|msgpack]
+
+Lookup: catalogues[source_ref]["sports"][sport][catalogue_key(competition, genre, discipline)]
+is the position of the entry in catalogues[source_ref]["decisions"] (see lookup()).
+"""
+import argparse
+import inspect
+import json
+import math
+import os
+import sys
+import time
+
+from engine.anj_loader import ANJ_URL, decide_fr_sport, read_workbook, refresh_workbook
+from engine.badminton_handler import decide_badminton
+from engine.columns import COMPETITION_COL, GENRE_COL
+from engine.cross_sport import SPORT_SHEETS
+from engine.football_handler import decide_football
+from engine.golf_handler import decide_golf
+from engine.metrics import timed
+from engine.templates import TEMPLATES, render_decision, translation_key
+
+CATALOGUE_FORMAT = "anj-decision-catalogue"
+# À incrémenter à chaque changement de structure du catalogue
+CATALOGUE_VERSION = 1
+LANGUAGES = list(TEMPLATES)
+# Disciplines proposées par le chatbot (rendues dans la réponse Badminton)
+BADMINTON_DISCIPLINES = ["Singles", "Doubles"]
+
+
+def _decide(sport: str, competition: str, df, genre: str, discipline: str) -> dict:
+    # Fonctions d'origine : le catalogue ne doit ni remplir ni vider le cache de requêtes
+    if sport == "Football":
+        return inspect.unwrap(decide_football)(competition, df, genre=genre)
+    if sport == "Badminton":
+        return inspect.unwrap(decide_badminton)(competition, df, genre=genre, discipline=discipline)
+    if sport == "Golf":
+        return inspect.unwrap(decide_golf)(competition, df, genre=genre)
+    return decide_fr_sport(competition, df)
+
+
+def catalogue_key(competition, genre=None, discipline=None) -> str:
+    """Lookup key of a decision: normalized competition|genre|discipline (empty = any)."""
+    return "|".join(translation_key(part) if part else "" for part in (competition, genre, discipline))
+
+
+def _plain(value):
+    # NaN n'existe pas en JSON : cellule vide
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+
+
+def _variants(df, sport: str) -> list:
+    """(competition, genre, discipline) asked to decide_*, genre / discipline None = any."""
+    genres = {}
+    has_genre = GENRE_COL in df.columns and sport != "Snooker"
+    columns = [COMPETITION_COL, GENRE_COL] if has_genre else [COMPETITION_COL]
+    for values in df[columns].drop_duplicates().itertuples(index=False, name=None):
+        competition, genre = values[0], values[1] if has_genre else None
+        if not isinstance(competition, str):
+            continue
+        options = genres.setdefault(competition, [None])
+        if isinstance(genre, str) and genre not in options:
+            options.append(genre)
+    disciplines = [None]
+    if sport == "Badminton":
+        # decide_badminton retombe sur la compétition sans genre : tous les genres de la feuille répondent
+        every_genre = list(dict.fromkeys(g for options in genres.values() for g in options))
+        genres = dict.fromkeys(genres, every_genre)
+        disciplines = BADMINTON_DISCIPLINES
+    return [(competition, genre, discipline) for competition, options in genres.items()
+            for genre in options for discipline in disciplines]
+
+
+def build_catalogue(sheets: dict) -> dict:
+    """Catalogue of one version of the sheets (one source_ref)."""
+    decisions, positions, sports, hashes = [], {}, {}, {}
+    source_ref = next((df.attrs.get('source_ref') for df in sheets.values()), None)
+    for sport, sheet in SPORT_SHEETS.items():
+        df = sheets.get(sheet)
+        if df is None or COMPETITION_COL not in df.columns:
+            continue
+        hashes[sheet] = df.attrs.get('content_hash')
+        index = sports.setdefault(sport, {})
+        with timed("catalogue_build", sport):
+            for competition, genre, discipline in _variants(df, sport):
+                data = _decide(sport, competition, df, genre, discipline)
+                if not data.get('allowed'):
+                    continue
+                decision = {field: _plain(value) for field, value in data.items()}
+                # Réponses identiques (genre "any" = première ligne) partagées entre les clés
+                signature = (tuple(decision.items()), discipline)
+                position = positions.get(signature)
+                if position is None:
+                    position = positions[signature] = len(decisions)
+                    decisions.append({
+                        "decision": decision,
+                        "responses": {lang: render_decision(data, lang, discipline) for lang in LANGUAGES},
+                    })
+                index.setdefault(catalogue_key(competition, genre, discipline), position)
+    return {
+        "source_ref": source_ref,
+        "content_hashes": hashes,
+        "generated_at": time.time(),
+        "languages": LANGUAGES,
+        "sports": sports,
+        "decisions": decisions,
+    }
+
+
+def lookup(document: dict, source_ref: str, sport: str, competition: str, genre: str = None,
+           discipline: str = None, lang: str = "en") -> str | None:
+    """Rendered response of a catalogue document, None when the competition is not in it."""
+    catalogue = document["catalogues"].get(source_ref)
+    if catalogue is None:
+        return None
+    position = catalogue["sports"].get(sport, {}).get(catalogue_key(competition, genre, discipline))
+    if position is None:
+        return None
+    return catalogue["decisions"][position]["responses"].get(lang)
+
+
+def _codec(fmt: str):
+    if fmt == "json":
+        return (lambda f: json.load(f),
+                lambda doc, f: f.write(json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")))
+    try:
+        import msgpack
+    except ImportError:
+        raise SystemExit("--format msgpack needs the msgpack package (pip install msgpack)")
+    return (lambda f: msgpack.unpack(f, raw=False, strict_map_key=False),
+            lambda doc, f: msgpack.pack(doc, f, use_bin_type=True))
+
+
+def write_catalogue(catalogue: dict, path: str, fmt: str = "json") -> dict:
+    """Adds (or replaces) the catalogue of its source_ref in the document at path."""
+    load, dump = _codec(fmt)
+    document = None
+    if os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                document = load(f)
+        except (OSError, ValueError) as e:
+            print(f"warning: unreadable catalogue {path}, rewritten: {e}", file=sys.stderr)
+    if not document or document.get("format") != CATALOGUE_FORMAT or document.get("version") != CATALOGUE_VERSION:
+        document = {"format": CATALOGUE_FORMAT, "version": CATALOGUE_VERSION, "catalogues": {}}
+    document["catalogues"][catalogue["source_ref"]] = catalogue
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        dump(document, f)
+    os.replace(tmp, path)
+    return document
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="catalogue file (created or updated)")
+    parser.add_argument("--workbook", help="local ANJ xlsx (default: the ANJ URL through the snapshot)")
+    parser.add_argument("--url", default=ANJ_URL)
+    parser.add_argument("--format", choices=["json", "msgpack"], default="json")
+    args = parser.parse_args(argv)
+
+    if args.workbook:
+        with open(args.workbook, "rb") as f:
+            sheets = read_workbook(f.read())
+    else:
+        sheets = refresh_workbook(args.url)
+
+    start = time.perf_counter()
+    catalogue = build_catalogue(sheets)
+    write_catalogue(catalogue, args.out, args.format)
+    counts = ", ".join(f"{sport}: {len(keys)}" for sport, keys in catalogue["sports"].items())
+    print(f"{catalogue['source_ref']}: {len(catalogue['decisions'])} decisions ({counts} keys) "
+          f"in {time.perf_counter() - start:.1f}s -> {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
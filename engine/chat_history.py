@@ -0,0 +1,116 @@
+"""
+Chat history of one Streamlit session, kept as compact records rendered on display.
+
+An entry stores the user's text, the key of a fixed message or the fields of a decision
+(references to the values of the decision tables), not the formatted markdown. The history
+keeps the last CHAT_HISTORY_LIMIT entries; the page shows them CHAT_PAGE_SIZE at a time.
+"""
+import os
+from dataclasses import dataclass
+
+from engine.templates import TEMPLATES, render_decision
+
+# Entrées conservées par session (les plus anciennes sont supprimées)
+CHAT_HISTORY_LIMIT = int(os.environ.get("ANJ_CHAT_HISTORY_LIMIT", "500"))
+# Entrées affichées par page d'historique
+CHAT_PAGE_SIZE = int(os.environ.get("ANJ_CHAT_PAGE_SIZE", "20"))
+
+# Champs d'un retour decide_* repris dans l'entrée, dans l'ordre du tuple stocké
+DECISION_FIELDS = ("sport", "competition", "country", "genre", "restrictions", "phases", "source")
+
+MESSAGES = {
+    "snooker_rules": (
+        "🔍 **Snooker Regulatory Framework:**\n\n"
+        "Only professional tournaments belonging to the **World Snooker Tour (WST)** are authorized.\n\n"
+        "⚠️ **Major Restrictions:**\n"
+        "* **Authorized Phases:** All matches except **group stages** (phase de poule).\n"
+        "* **Forbidden:** Qualifying tournaments known as **Q-School** are strictly prohibited.\n"
+        "* **Minor Players:** Bets are forbidden on any match involving a player under 18.\n\n"
+    ),
+    "golf_gender_evian": "Is this a **Men's** or **Women's** tournament?\n\n💡 *Note: **Evian Championship** is a Women's major.*",
+    "golf_gender": "Is this a **Men's** or **Women's** tournament?\n\n💡 *Note: **LPGA Tour** (Women), **PGA/DP World/LIV** (Men).*",
+    "golf_circuits_women": "For **Women** golf, the authorized circuits are: **LPGA Tour**.",
+    "golf_circuits_men": (
+        "For **Men** golf, the authorized circuits are: "
+        "**PGA Tour**, **DP World Tour**, or **LIV International Golf Series**."
+        "\n\n⚠️ **Important:** Do not confuse the *PGA Tour* (Authorized) with the *PGA Tour Champions* (Not Authorized)."
+    ),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class ChatEntry:
+    """
+    One message: kind "text" (value = the text), "message" (value = key of MESSAGES),
+    "not_found" (value = source reference) or "decision" (value = DECISION_FIELDS values).
+    """
+    role: str
+    kind: str
+    value: object
+    lang: str = "en"
+    discipline: str = None
+
+
+def user_text(text: str) -> ChatEntry:
+    return ChatEntry("user", "text", text)
+
+
+def message(key: str) -> ChatEntry:
+    return ChatEntry("assistant", "message", key)
+
+
+def not_found(source: str, lang: str = "en") -> ChatEntry:
+    return ChatEntry("assistant", "not_found", source, lang)
+
+
+def decision(data: dict, lang: str = "en", discipline: str = None) -> ChatEntry:
+    """Entry of an "allowed" decision (data = retour d'un decide_*)."""
+    return ChatEntry("assistant", "decision", tuple(data.get(f) for f in DECISION_FIELDS), lang, discipline)
+
+
+def render(entry: ChatEntry) -> str:
+    """Markdown of an entry, formatted when it is displayed."""
+    if entry.kind == "decision":
+        return render_decision(dict(zip(DECISION_FIELDS, entry.value)), entry.lang, entry.discipline)
+    if entry.kind == "not_found":
+        return TEMPLATES[entry.lang]["not_found"].format(source=entry.value)
+    if entry.kind == "message":
+        return MESSAGES[entry.value]
+    return entry.value
+
+
+class ChatHistory:
+    """
+    Entries of a session with absolute positions: position 0 is the first entry of the session,
+    even once it has been dropped past `limit`.
+    """
+
+    def __init__(self, limit: int = CHAT_HISTORY_LIMIT):
+        self.entries = []
+        self.limit = limit
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def end(self) -> int:
+        """Position after the last entry."""
+        return self.dropped + len(self.entries)
+
+    def append(self, entry: ChatEntry):
+        self.entries.append(entry)
+        excess = len(self.entries) - self.limit
+        if excess > 0:
+            del self.entries[:excess]
+            self.dropped += excess
+
+    def since(self, position: int) -> list:
+        """Entries appended at or after `position`."""
+        return self.entries[max(0, position - self.dropped):]
+
+    def window(self, end: int, count: int) -> tuple:
+        """(number of older entries still kept, the `count` entries before position `end`)."""
+        stop = max(0, end - self.dropped)
+        start = max(0, stop - count)
+        return start, self.entries[start:stop]
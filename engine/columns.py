@@ -0,0 +1,7 @@
+# Column names
+COMPETITION_COL = "Nom commun"
+RESTRICTION_COL = "Restrictions"
+PHASES_COL = "Phases"
+COUNTRY_COL = "Pays"
+GENRE_COL = "Genre"
+DISCIPLINE_COL = "Discipline"
@@ -0,0 +1,232 @@
+"""
+Single search index over every sport of the ANJ workbook.
+
+The Football, Badminton, Golf and Billard sheets are merged into one CompetitionIndex whose
+entries are tagged with their sport, gender and discipline, so a free-text query is answered
+in one pass and ranked across sports, without asking the user to pick a sport first.
+"""
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from engine.aliases import SPORT_ALIASES, ExactIndex, merged_rewrites
+from engine.columns import COMPETITION_COL, COUNTRY_COL, GENRE_COL, DISCIPLINE_COL
+from engine.matcher import CompetitionIndex, rank_rows
+from engine.metrics import timed, timed_call
+
+# Onglet du fichier ANJ pour chaque sport (le Snooker est dans "Billard")
+SPORT_SHEETS = {"Football": "Football", "Badminton": "Badminton", "Golf": "Golf", "Snooker": "Billard"}
+SPORT_COL = "Sport du chatbot"
+
+# Seuil des sports dont le handler n'a pas de classement flou (Badminton, Golf)
+DEFAULT_THRESHOLD = 60
+# Bonus des compétitions du sport cité dans la question ("ryder cup golf")
+SPORT_HINT_BONUS = 10
+# Fenêtre autour du meilleur score, comme get_matches_multiples
+SCORE_WINDOW = 10
+
+# Mots qui désignent un sport ; les noms de sport eux-mêmes sont retirés de la requête
+SPORT_KEYWORDS = {
+    "Football": ["football", "soccer", "fifa", "uefa", "concacaf", "conmebol"],
+    "Badminton": ["badminton", "bwf", "uber", "thomas", "sudirman"],
+    "Golf": ["golf", "pga", "lpga", "ryder", "solheim"],
+    "Snooker": ["snooker", "billard", "billiards", "wst"],
+}
+BADMINTON_TEAM_CUPS = ("uber", "thomas", "sudirman")
+SPORT_NAME_WORDS = {"football", "soccer", "badminton", "golf", "snooker", "billard", "billiards"}
+
+# Traductions de tous les handlers plus celles propres à la recherche multi-sports (aliases.json)
+_MAPPING = merged_rewrites(SPORT_ALIASES)
+_WORD_RE = re.compile(r"[\w']+")
+
+
+def merge_sheets(sheets: dict) -> pd.DataFrame:
+    """Competition, gender, country and discipline columns of every sport sheet, tagged with the sport."""
+    frames = []
+    for sport, sheet in SPORT_SHEETS.items():
+        df = sheets.get(sheet)
+        if df is None or df.empty or COMPETITION_COL not in df.columns:
+            continue
+        part = pd.DataFrame({
+            COMPETITION_COL: df[COMPETITION_COL].to_numpy(),
+            GENRE_COL: df[GENRE_COL].to_numpy() if GENRE_COL in df.columns else np.nan,
+            COUNTRY_COL: df[COUNTRY_COL].to_numpy() if COUNTRY_COL in df.columns else np.nan,
+            DISCIPLINE_COL: df[DISCIPLINE_COL].to_numpy() if DISCIPLINE_COL in df.columns else np.nan,
+        })
+        part[SPORT_COL] = sport
+        frames.append(part)
+    if not frames:
+        return pd.DataFrame(columns=[COMPETITION_COL, GENRE_COL, COUNTRY_COL, DISCIPLINE_COL, SPORT_COL])
+    return pd.concat(frames, ignore_index=True)
+
+
+class CrossSportIndex:
+    """
+    CompetitionIndex of the merged sheets plus the sport / discipline of each entry.
+    An entry is a distinct (competition, gender, country, sport, discipline) row.
+    """
+
+    def __init__(self, merged: pd.DataFrame, previous: "CrossSportIndex" = None):
+        self.competitions = CompetitionIndex.from_frame(merged, group_cols=(SPORT_COL, DISCIPLINE_COL),
+                                                        previous=previous.competitions if previous else None)
+        first_rows = merged.iloc[self.competitions.positions]
+        self.sports = first_rows[SPORT_COL].to_numpy()
+        self.disciplines = tuple(str(d).lower() if isinstance(d, str) else "" for d in first_rows[DISCIPLINE_COL])
+        # Noms exacts et surnoms de tous les sports
+        self.exact = ExactIndex.from_names(self.competitions.names, self.competitions.genres,
+                                           [pair for aliases in SPORT_ALIASES.values() for pair in aliases.nicknames.items()])
+        self._rows_cache = {}
+
+    @classmethod
+    def from_sheets(cls, sheets: dict) -> "CrossSportIndex":
+        return cls(merge_sheets(sheets))
+
+    def __len__(self):
+        return len(self.competitions)
+
+    def rows(self, sports=None, discipline: str = None):
+        """Sorted entry positions of the given sports / badminton discipline (None = everything)."""
+        key = (tuple(sorted(sports)) if sports else None, discipline)
+        if key not in self._rows_cache:
+            mask = np.ones(len(self), dtype=bool)
+            if sports:
+                mask &= np.isin(self.sports, list(sports))
+            if discipline:
+                # Mêmes règles que le handler badminton : "Simple et double" vaut pour les deux,
+                # les coupes par équipes (Uber, Thomas, Sudirman) ignorent la discipline
+                search_val = "simple" if discipline == "Singles" else "double"
+                mask &= np.array([
+                    sport != "Badminton" or search_val in disc
+                    or any(cup in str(name).lower() for cup in BADMINTON_TEAM_CUPS)
+                    for sport, disc, name in zip(self.sports, self.disciplines, self.competitions.names)
+                ], dtype=bool)
+            self._rows_cache[key] = None if mask.all() else np.flatnonzero(mask)
+        return self._rows_cache[key]
+
+
+# Un index par contenu du classeur
+_CROSS_INDEX_CACHE = {}
+_CROSS_INDEX_CACHE_SIZE = 4
+_CROSS_INDEX_LOCK = threading.Lock()
+
+
+def _index_key(sheets: dict) -> tuple | None:
+    key = tuple(
+        (sheet, df.attrs.get('content_hash'), len(df))
+        for sheet, df in ((s, sheets.get(s)) for s in SPORT_SHEETS.values()) if df is not None
+    )
+    if any(content_hash is None for _, content_hash, _ in key):
+        return None
+    return key
+
+
+def _store_index(key, index) -> CrossSportIndex:
+    """Caches index under key, or returns the one another thread cached first."""
+    with _CROSS_INDEX_LOCK:
+        if key in _CROSS_INDEX_CACHE:
+            return _CROSS_INDEX_CACHE[key]
+        if len(_CROSS_INDEX_CACHE) >= _CROSS_INDEX_CACHE_SIZE:
+            _CROSS_INDEX_CACHE.pop(next(iter(_CROSS_INDEX_CACHE)))
+        _CROSS_INDEX_CACHE[key] = index
+        return index
+
+
+def get_cross_sport_index(sheets: dict) -> CrossSportIndex:
+    """Merged index of the loaded sheets, built once per workbook content."""
+    key = _index_key(sheets)
+    if key is None:
+        return CrossSportIndex.from_sheets(sheets)
+
+    index = _CROSS_INDEX_CACHE.get(key)
+    if index is None:
+        with timed("index_build", "auto"):
+            index = CrossSportIndex.from_sheets(sheets)
+        index = _store_index(key, index)
+    return index
+
+
+def carry_over_index(old_sheets: dict, new_sheets: dict):
+    """Builds the merged index of a refreshed workbook from the cached index of the previous one."""
+    old_key, new_key = _index_key(old_sheets), _index_key(new_sheets)
+    previous = _CROSS_INDEX_CACHE.get(old_key) if old_key else None
+    if previous is None or new_key is None or new_key in _CROSS_INDEX_CACHE:
+        return
+    with timed("index_update", "auto"):
+        _store_index(new_key, CrossSportIndex(merge_sheets(new_sheets), previous=previous))
+
+
+def sport_thresholds() -> dict:
+    """Minimum score per sport: the handlers' own thresholds, so tuning one tunes both searches."""
+    # Import local : les handlers importent anj_loader, qui importe ce module
+    from engine import football_handler, snooker_handler
+    thresholds = dict.fromkeys(SPORT_SHEETS, DEFAULT_THRESHOLD)
+    thresholds["Football"] = football_handler.FOOTBALL_THRESHOLD
+    thresholds["Snooker"] = snooker_handler.SNOOKER_THRESHOLD
+    return thresholds
+
+
+def infer_sports(user_prompt: str) -> list:
+    """Sports named or implied by the query ("ryder cup" -> Golf), in SPORT_KEYWORDS order."""
+    words = set(_WORD_RE.findall(str(user_prompt).lower()))
+    return [sport for sport, keywords in SPORT_KEYWORDS.items() if words.intersection(keywords)]
+
+
+def prepare_query(user_prompt: str) -> str:
+    """English -> French wording of the sheets, without the sport names themselves."""
+    query = _MAPPING.rewrite(str(user_prompt).lower().strip())
+    words = [w for w in query.split() if w not in SPORT_NAME_WORDS]
+    # "golf" seul : on garde la requête telle quelle plutôt qu'une chaîne vide
+    return " ".join(words) or query
+
+
+@timed_call("search", "auto")
+def search_all_sports(user_prompt: str, sheets: dict, sports=None, discipline: str = None) -> list:
+    """
+    Ranks the competitions of every sport (or of `sports` only) against the query in one pass.
+    Returns (competition, score, genre, sport) tuples, best first; the first one gives the
+    inferred sport. Entries of a sport cited in the query get SPORT_HINT_BONUS.
+    """
+    index = get_cross_sport_index(sheets)
+    if not len(index):
+        return []
+
+    hinted = [s for s in infer_sports(user_prompt) if not sports or s in sports]
+    bonus = np.zeros(len(index))
+    if hinted:
+        bonus[np.isin(index.sports, hinted)] = SPORT_HINT_BONUS
+
+    # Seuils lus à chaque appel pour pouvoir les régler sans reconstruire l'index
+    thresholds = sport_thresholds()
+    floor = min(thresholds.values()) - (SPORT_HINT_BONUS if hinted else 0)
+    query = prepare_query(user_prompt)
+    rows = index.rows(sports, discipline)
+    exact = index.exact.rows(user_prompt, query)
+    if exact is not None and rows is not None:
+        exact = exact[np.isin(exact, rows)]
+    if exact is not None and len(exact):
+        # Nom exact ou surnom connu : score plein, sans classement flou
+        ranked = [(i, 100.0) for i in exact]
+    else:
+        # Le bonus de sport peut faire remonter dans la fenêtre un candidat classé plus bas
+        window = SCORE_WINDOW + (SPORT_HINT_BONUS if hinted else 0)
+        ranked = rank_rows(query, index.competitions, threshold=floor, rows=rows, window=window)
+
+    scored = [(i, score + bonus[i]) for i, score in ranked if score + bonus[i] >= thresholds[index.sports[i]]]
+    if not scored:
+        return []
+    # Tri stable : à score égal, l'ordre du classement flou (donc du fichier) est conservé
+    scored.sort(key=lambda item: -item[1])
+
+    best_score = scored[0][1]
+    names, genres = index.competitions.names, index.competitions.genres
+    matches, seen = [], set()
+    for i, score in scored:
+        if score < best_score - SCORE_WINDOW:
+            break
+        key = (names[i], genres[i] if isinstance(genres[i], str) else None, index.sports[i])
+        if key not in seen:
+            seen.add(key)
+            matches.append((names[i], float(score), genres[i], str(index.sports[i])))
+    return matches
@@ -0,0 +1,147 @@
+import threading
+from dataclasses import dataclass
+
+import pandas as pd
+
+from engine.columns import COMPETITION_COL, GENRE_COL, DISCIPLINE_COL
+from engine.metrics import timed
+
+
+@dataclass(frozen=True, slots=True)
+class DecisionRecord:
+    """Decision for one (competition, genre, discipline) row, codes already resolved."""
+    competition: str
+    genre: str
+    country: str
+    restrictions: object
+    phases: object
+
+
+class DecisionTable:
+    """
+    Hash index (competition, genre, discipline) -> DecisionRecord of one sheet.
+
+    Each row is also registered under the "any genre" / "any discipline" wildcards, keeping the
+    first row of the file for every key, like df[mask].iloc[0] did.
+    """
+
+    def __init__(self, records: dict, casefold: bool, has_genre: bool, has_discipline: bool, resolve=None):
+        self._records = records
+        self.casefold = casefold
+        self.has_genre = has_genre
+        self.has_discipline = has_discipline
+        self.resolve = resolve
+
+    def _key(self, value):
+        # Les cellules non textuelles ne matchaient jamais les masques .str / == d'origine
+        if not isinstance(value, str):
+            return None
+        return value.lower() if self.casefold else value
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, resolve, casefold: bool = False) -> "DecisionTable":
+        """resolve(row: dict) -> DecisionRecord computes the codes of a row once."""
+        if COMPETITION_COL not in df.columns:
+            raise KeyError(COMPETITION_COL)
+        has_genre = GENRE_COL in df.columns
+        has_discipline = DISCIPLINE_COL in df.columns
+        table = cls({}, casefold, has_genre, has_discipline, resolve)
+        table._add_rows(df.to_dict("records"))
+        return table
+
+    def _add_rows(self, rows):
+        records = self._records
+        for row in rows:
+            comp = self._key(row.get(COMPETITION_COL))
+            if comp is None:
+                continue
+            record = self.resolve(row)
+            genres = [None]
+            if self.has_genre and self._key(row[GENRE_COL]) is not None:
+                genres.append(self._key(row[GENRE_COL]))
+            disciplines = [None]
+            if self.has_discipline and isinstance(row[DISCIPLINE_COL], str):
+                disciplines.append(row[DISCIPLINE_COL].lower())
+            for genre in genres:
+                for discipline in disciplines:
+                    records.setdefault((comp, genre, discipline), record)
+
+    def updated(self, df: pd.DataFrame, competitions) -> "DecisionTable":
+        """
+        Table of a new version of the sheet where only `competitions` changed: their keys are
+        dropped and rebuilt from their rows in df, the other records are shared with this table.
+        """
+        if (GENRE_COL in df.columns) != self.has_genre or (DISCIPLINE_COL in df.columns) != self.has_discipline:
+            return DecisionTable.from_frame(df, self.resolve, self.casefold)
+        changed = {self._key(c) for c in competitions} - {None}
+        table = DecisionTable({key: record for key, record in self._records.items() if key[0] not in changed},
+                              self.casefold, self.has_genre, self.has_discipline, self.resolve)
+        mask = df[COMPETITION_COL].map(lambda value: self._key(value) in changed).to_numpy(dtype=bool)
+        table._add_rows(df[mask].to_dict("records"))
+        return table
+
+    def lookup(self, competition, genre=None, discipline=None) -> DecisionRecord | None:
+        """genre / discipline = None means "any"; discipline is compared case-insensitively."""
+        comp = self._key(competition)
+        if comp is None:
+            return None
+        genre_key = None
+        if genre is not None:
+            genre_key = self._key(genre)
+            if genre_key is None or not self.has_genre:
+                return None
+        discipline_key = None
+        if discipline is not None:
+            if not isinstance(discipline, str) or not self.has_discipline:
+                return None
+            discipline_key = discipline.lower()
+        return self._records.get((comp, genre_key, discipline_key))
+
+    def __len__(self):
+        return len(self._records)
+
+
+# Une table par (feuille, contenu, règle de décision)
+_TABLE_CACHE = {}
+_TABLE_CACHE_SIZE = 32
+_TABLE_LOCK = threading.Lock()
+
+
+def get_decision_table(df: pd.DataFrame, name: str, resolve, casefold: bool = False) -> DecisionTable:
+    """Decision table of a loaded sheet for the rule set `name`, built once per sheet content."""
+    content_hash = df.attrs.get('content_hash')
+    if content_hash is None:
+        return DecisionTable.from_frame(df, resolve, casefold)
+
+    key = (df.attrs.get('sport_name'), content_hash, len(df), name)
+    table = _TABLE_CACHE.get(key)
+    if table is None:
+        with timed("decision_table_build"):
+            table = DecisionTable.from_frame(df, resolve, casefold)
+        table = _store_table(key, table)
+    return table
+
+
+def _store_table(key, table) -> DecisionTable:
+    """Caches table under key, or returns the one another thread cached first."""
+    with _TABLE_LOCK:
+        if key in _TABLE_CACHE:
+            return _TABLE_CACHE[key]
+        if len(_TABLE_CACHE) >= _TABLE_CACHE_SIZE:
+            _TABLE_CACHE.pop(next(iter(_TABLE_CACHE)))
+        _TABLE_CACHE[key] = table
+        return table
+
+
+def carry_over_tables(old_df: pd.DataFrame, new_df: pd.DataFrame, competitions):
+    """Updates the cached tables of the previous version of a sheet for its refreshed version."""
+    old_key = (old_df.attrs.get('sport_name'), old_df.attrs.get('content_hash'), len(old_df))
+    new_key = (new_df.attrs.get('sport_name'), new_df.attrs.get('content_hash'), len(new_df))
+    if new_key[1] is None:
+        return
+    with _TABLE_LOCK:
+        cached = list(_TABLE_CACHE.items())
+    for key, table in cached:
+        if key[:3] == old_key and new_key + key[3:] not in _TABLE_CACHE:
+            with timed("decision_table_update"):
+                _store_table(new_key + key[3:], table.updated(new_df, competitions))
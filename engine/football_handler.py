@@ -1,54 +1,74 @@
 import pandas as pd
-from engine.matcher import get_matches_multiples
+from engine.aliases import SPORT_ALIASES, get_exact_index
+from engine.matcher import get_matches_multiples, get_competition_index
 from engine.anj_loader import COMPETITION_COL, GENRE_COL, RESTRICTION_COL, PHASES_COL, COUNTRY_COL
+from engine.decision_table import DecisionRecord, get_decision_table
+from engine.metrics import timed_call
+from engine.query_cache import cached_query
 
+# Score minimum d'un candidat (voir benchmarks/relevance.py pour le réglage)
+FOOTBALL_THRESHOLD = 60
 
+
+@timed_call("search", "Football")
+@cached_query(normalize_text=True)
 def handle_football_search(user_prompt, df_anj):
     """Logique de recherche dédiée au Football (Version Stable)"""
-    query = user_prompt.lower()
-    # Mapping spécifique au football
-    mapping = {
-        "olympic games": "jeux olympiques",
-        "european championship": "championnat d'europe",
-        "world cup": "coupe du monde"
-    }
-    for eng, fr in mapping.items():
-        query = query.replace(eng, fr)
+    query = SPORT_ALIASES["Football"].rewrites.rewrite(user_prompt.lower())
+
+    # Nom exact ou surnom connu : réponse directe, sans score flou
+    exact = get_exact_index(df_anj, "Football")
+    rows = exact.rows(user_prompt, query)
+    if rows is not None:
+        return exact.matches(rows, 100.0)
+
+    return get_matches_multiples(query, get_competition_index(df_anj), threshold=FOOTBALL_THRESHOLD)
+
+
+def _resolve_football(row: dict) -> DecisionRecord:
+    """Codes FIFA / restrictions / phases d'une ligne, calculés une fois au chargement"""
+    restrictions_value = row[RESTRICTION_COL]
+    phases_value = row[PHASES_COL]
+
+    if str(restrictions_value).strip() == "Classement FIFA **":
+        restrictions_code = "Classement FIFA **"
+        phases_code = "** FIFA category A international friendly matches, between two teams both ranked in the top fifty of the FIFA rankings."
+    else:
+        is_restrictions_none = pd.isna(restrictions_value) or str(restrictions_value).strip().lower() == 'aucune'
+        is_phases_none = pd.isna(phases_value) or str(phases_value).strip().lower() == 'aucune'
+        restrictions_code = "NONE" if is_restrictions_none else str(restrictions_value)
+        phases_code = "ALL" if is_phases_none else str(phases_value)
+        if phases_code != "ALL":
+            restrictions_code = "LIMITED_PHASES"
 
-    return get_matches_multiples(query, df_anj, threshold=60)
+    return DecisionRecord(
+        competition=row[COMPETITION_COL],
+        genre=str(row[GENRE_COL]) if GENRE_COL in row else "N/A",
+        country=str(row[COUNTRY_COL]) if not pd.isna(row[COUNTRY_COL]) else "International",
+        restrictions=restrictions_code,
+        phases=phases_code,
+    )
 
 
+@timed_call("decide", "Football")
+@cached_query(normalize_text=False)
 def decide_football(comp_name: str, df: pd.DataFrame, genre: str = None):
     """Logique de décision FIFA et extraction (Version Stable)"""
     try:
-        mask = df[COMPETITION_COL].str.lower() == comp_name.lower()
-        if genre:
-            mask = mask & (df[GENRE_COL].str.lower() == genre.lower())
-
-        row = df[mask].iloc[0]
-        restrictions_value = row[RESTRICTION_COL]
-        phases_value = row[PHASES_COL]
-
-        if str(restrictions_value).strip() == "Classement FIFA **":
-            restrictions_code = "Classement FIFA **"
-            phases_code = "** FIFA category A international friendly matches, between two teams both ranked in the top fifty of the FIFA rankings."
-        else:
-            is_restrictions_none = pd.isna(restrictions_value) or str(restrictions_value).strip().lower() == 'aucune'
-            is_phases_none = pd.isna(phases_value) or str(phases_value).strip().lower() == 'aucune'
-            restrictions_code = "NONE" if is_restrictions_none else str(restrictions_value)
-            phases_code = "ALL" if is_phases_none else str(phases_value)
-            if phases_code != "ALL":
-                restrictions_code = "LIMITED_PHASES"
+        table = get_decision_table(df, "football", _resolve_football, casefold=True)
+        record = table.lookup(comp_name.lower(), genre=genre.lower() if genre else None)
+        if record is None:
+            raise LookupError(comp_name)
 
         return {
             "allowed": True,
             "competition": comp_name,
-            "restrictions": restrictions_code,
-            "phases": phases_code,
+            "restrictions": record.restrictions,
+            "phases": record.phases,
             "source": df.attrs.get('source_ref', "ANJ Source"),
-            "country": str(row[COUNTRY_COL]) if not pd.isna(row[COUNTRY_COL]) else "International",
+            "country": record.country,
             "sport": "Football",
-            "genre": str(row[GENRE_COL]) if GENRE_COL in row.index else "N/A"
+            "genre": record.genre
         }
     except:
-        return {"allowed": False, "competition": comp_name, "source": df.attrs.get('source_ref')}
\ No newline at end of file
+        return {"allowed": False, "competition": comp_name, "source": df.attrs.get('source_ref')}
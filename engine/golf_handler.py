@@ -1,50 +1,76 @@
 import pandas as pd
+from dataclasses import dataclass
 from engine.anj_loader import COMPETITION_COL, GENRE_COL, RESTRICTION_COL, PHASES_COL, COUNTRY_COL
+from engine.aliases import SPORT_ALIASES, get_exact_index
+from engine.decision_table import DecisionRecord, get_decision_table
+from engine.metrics import timed_call
+from engine.query_cache import cached_query
+from engine.substring_index import SubstringIndex, get_sheet_index
 
 
+@dataclass(frozen=True, eq=False)
+class GolfIndex:
+    """Names (lower-cased, stripped) and genres of the golf sheet, computed once at load."""
+    names: tuple
+    genres: tuple
+    substrings: SubstringIndex
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "GolfIndex":
+        names = tuple(str(n) for n in df[COMPETITION_COL])
+        return cls(names=names, genres=tuple(df[GENRE_COL]),
+                   substrings=SubstringIndex([n.lower().strip() for n in names]))
+
+
+@timed_call("search", "Golf")
+@cached_query(normalize_text=True)
 def handle_golf_search(user_prompt, df_anj):
     """Recherche Golf avec priorité aux noms exacts"""
-    query = user_prompt.lower().strip()
+    # Mapping universel pour les JO ("jo" en mot entier : "jordan open" reste tel quel)
+    query = SPORT_ALIASES["Golf"].rewrites.rewrite(user_prompt.lower().strip())
 
-    # Mapping universel pour les JO
-    mapping = {
-        "olympic games": "jeux olympiques",
-        "olympic": "jeux olympiques",
-        "jo": "jeux olympiques"
-    }
-    for eng, fr in mapping.items():
-        query = query.replace(eng, fr)
+    # Nom exact ou surnom connu : réponse directe
+    exact = get_exact_index(df_anj, "Golf")
+    rows = exact.rows(user_prompt, query)
+    if rows is not None:
+        return exact.matches(rows, 100)
 
-    matches = []
-    for idx, row in df_anj.iterrows():
-        file_name_orig = str(row[COMPETITION_COL])
-        file_name_clean = file_name_orig.lower().strip()
+    index = get_sheet_index(df_anj, "golf", GolfIndex.from_frame)
 
-        # 1. MATCH EXACT OU CONTENU : On vérifie si la Ryder Cup ou Solheim Cup est citée
-        if query == file_name_clean or query in file_name_clean:
-            matches.append((file_name_orig, 100, row[GENRE_COL]))
+    # 1. MATCH EXACT OU CONTENU : On vérifie si la Ryder Cup ou Solheim Cup est citée
+    rows = index.substrings.rows_containing(query)
+    return list({(index.names[i], 100, index.genres[i]): None for i in rows})
 
-    return list(set(matches))
 
+def _resolve_golf(row: dict) -> DecisionRecord:
+    return DecisionRecord(
+        competition=row[COMPETITION_COL],
+        genre=str(row[GENRE_COL]),
+        country=str(row[COUNTRY_COL]) if not pd.isna(row[COUNTRY_COL]) else "International",
+        restrictions=row[RESTRICTION_COL] if not pd.isna(row[RESTRICTION_COL]) else "NONE",
+        phases=row[PHASES_COL] if not pd.isna(row[PHASES_COL]) else "ALL",
+    )
 
+
+@timed_call("decide", "Golf")
+@cached_query(normalize_text=False)
 def decide_golf(comp_name: str, df: pd.DataFrame, genre: str = None):
     """Logique de décision standard pour le Golf"""
     try:
-        mask = (df[COMPETITION_COL] == comp_name)
-        if genre:
-            mask = mask & (df[GENRE_COL] == genre)
-
-        row = df[mask].iloc[0]
+        table = get_decision_table(df, "golf", _resolve_golf)
+        record = table.lookup(comp_name, genre=genre or None)
+        if record is None:
+            raise LookupError(comp_name)
 
         return {
             "allowed": True,
             "competition": comp_name,
-            "restrictions": row[RESTRICTION_COL] if not pd.isna(row[RESTRICTION_COL]) else "NONE",
-            "phases": row[PHASES_COL] if not pd.isna(row[PHASES_COL]) else "ALL",
+            "restrictions": record.restrictions,
+            "phases": record.phases,
             "source": df.attrs.get('source_ref', "ANJ Source"),
-            "country": str(row[COUNTRY_COL]) if not pd.isna(row[COUNTRY_COL]) else "International",
+            "country": record.country,
             "sport": "Golf",
-            "genre": str(row[GENRE_COL])
+            "genre": record.genre
         }
     except:
-        return {"allowed": False, "competition": comp_name}
\ No newline at end of file
+        return {"allowed": False, "competition": comp_name}
@@ -1,7 +1,14 @@
 from rapidfuzz import process, fuzz
+from dataclasses import dataclass, field
+from functools import cached_property
 import itertools
+import math
+import threading
+import numpy as np
 import pandas as pd
 
+from engine.metrics import timed
+
 
 def get_language(text: str) -> str:
     return "en"
@@ -28,69 +35,378 @@ def normalize(text: str) -> str:
     return " ".join(t.split())
 
 
-def generate_variations(query: str) -> list:
-    query_words = normalize(query).split()
-    words_possibilities = []
-    for word in query_words:
-        found_group = False
+# Table inverse variante -> concept (le premier groupe gagne, comme le parcours linéaire)
+CONCEPT_LOOKUP = {}
+for _key, _variants in CONCEPT_GROUPS.items():
+    for _variant in [_key] + _variants:
+        CONCEPT_LOOKUP.setdefault(_variant, _key)
+
+MAX_VARIATIONS = 15
+
+
+def iter_variations(query: str):
+    """
+    Lazily yields the query variations: the product of each word's concept variants, the word
+    as typed first, then its CONCEPT_GROUPS variants in the order they are listed.
+    """
+    options = []
+    for word in normalize(query).split():
+        key = CONCEPT_LOOKUP.get(word)
+        options.append(tuple(dict.fromkeys([word] + CONCEPT_GROUPS[key])) if key else (word,))
+    # Produit parcouru sans être construit : seules les `limit` premières combinaisons servent
+    for combo in itertools.product(*options):
+        yield " ".join(combo)
+
+
+def generate_variations(query: str, limit: int = MAX_VARIATIONS) -> list:
+    return list(itertools.islice(iter_variations(query), limit))
+
+
+# Threads utilisés par rapidfuzz.process.cdist (-1 = tous les coeurs)
+SCORING_WORKERS = -1
+COUNTRY_BONUS = 10
+COUNTRY_PENALTY = 30
+SUPER_PENALTY = 15
+# Candidats gardés : score >= meilleur score - MATCH_WINDOW
+MATCH_WINDOW = 10
+
+# --- PRÉ-FILTRAGE PAR INDEX INVERSÉ ---
+# En dessous de PRUNE_MIN_ROWS candidats, le scan complet est plus rapide que l'index
+PRUNE_MIN_ROWS = 2000
+# Candidats transmis au scoring fuzzy, doublés tant que les moins proches de la requête
+# donnent encore des résultats dans la fenêtre du meilleur score
+PRUNE_MAX_CANDIDATES = 1000
+# Filet de sécurité : scan complet si le meilleur score pré-filtré est sous ce seuil
+# (None = scan complet uniquement quand le pré-filtrage ne trouve rien)
+PRUNE_FALLBACK_SCORE = 80
+
+
+def index_terms(text: str) -> set:
+    """Termes indexés d'un texte normalisé : mots, clés de concept et trigrammes de caractères."""
+    terms = set()
+    for word in text.split():
+        terms.add("w:" + word)
+        key = CONCEPT_LOOKUP.get(word)
+        if key:
+            terms.add("c:" + key)
+        padded = f" {word} "
+        terms.update("g:" + padded[i:i + 3] for i in range(len(padded) - 2))
+    return terms
+
+
+class TokenIndex:
+    """
+    Inverted index term -> row ids over the "name country" targets.
+    Candidates are ranked by the IDF-weighted sum of the query terms they contain
+    (whole words and concept keys weigh double), normalized by the target length.
+    """
+
+    def __init__(self, targets):
+        postings, lengths = {}, []
+        for row, target in enumerate(targets):
+            terms = index_terms(target)
+            lengths.append(len(terms))
+            for term in terms:
+                postings.setdefault(term, []).append(row)
+        self.size = len(targets)
+        # Normalisation par la longueur : un nom court qui contient la requête passe devant
+        self.norms = _frozen_array(np.sqrt(np.maximum(lengths, 1)), dtype=np.float64)
+        self.postings = {term: _frozen_array(rows, dtype=np.int32) for term, rows in postings.items()}
+
+    def updated(self, targets, old_rows: np.ndarray) -> "TokenIndex":
+        """
+        Index of the new targets, old_rows[i] being the row of target i in this index (-1 = new
+        target): the postings of the kept rows are renumbered, only the new targets are tokenized.
+        """
+        old_rows = np.asarray(old_rows, dtype=np.int64)
+        kept = old_rows >= 0
+        new_of_old = np.full(self.size, -1, dtype=np.int64)
+        new_of_old[old_rows[kept]] = np.flatnonzero(kept)
+
+        norms = np.empty(len(targets), dtype=np.float64)
+        norms[kept] = self.norms[old_rows[kept]]
+        added = {}
+        for row in np.flatnonzero(~kept):
+            terms = index_terms(targets[row])
+            norms[row] = math.sqrt(max(len(terms), 1))
+            for term in terms:
+                added.setdefault(term, []).append(row)
+
+        postings = {}
+        for term, rows in self.postings.items():
+            moved = new_of_old[rows]
+            moved = moved[moved >= 0]
+            if len(moved):
+                postings[term] = moved
+        for term, rows in added.items():
+            postings[term] = np.concatenate([postings[term], rows]) if term in postings else np.asarray(rows)
+
+        index = TokenIndex.__new__(TokenIndex)
+        index.size = len(targets)
+        index.norms = _frozen_array(norms)
+        index.postings = {term: _frozen_array(np.sort(rows), dtype=np.int32) for term, rows in postings.items()}
+        return index
+
+    def ranked(self, texts) -> np.ndarray:
+        """Row ids sharing a term with any of the given normalized texts, best overlap first."""
+        terms = set()
+        for text in texts:
+            terms |= index_terms(text)
+
+        lists, weights = [], []
+        for term in terms:
+            rows = self.postings.get(term)
+            if rows is None:
+                continue
+            weight = math.log(1 + self.size / len(rows)) * (1 if term.startswith("g:") else 2)
+            lists.append(rows)
+            weights.append(np.full(len(rows), weight))
+        if not lists:
+            return np.empty(0, dtype=np.int64)
+
+        hits = np.bincount(np.concatenate(lists), weights=np.concatenate(weights), minlength=self.size) / self.norms
+        rows = np.flatnonzero(hits)
+        return rows[np.argsort(-hits[rows], kind="stable")]
+
+
+def _frozen_array(values, dtype=None) -> np.ndarray:
+    arr = np.asarray(values, dtype=dtype)
+    arr.flags.writeable = False
+    return arr
+
+
+@dataclass(frozen=True, eq=False)
+class CompetitionIndex:
+    """
+    Pre-cleaned candidates of one sheet: deduplicated (Nom commun, Genre, Pays) rows
+    with their normalized names, "name country" targets and country concept keys.
+    positions[i] is the position in the frame of the first row behind entry i and keys[i]
+    its raw (Nom commun, Genre, Pays, *group_cols) values.
+    """
+    keys: tuple
+    names: tuple
+    genres: tuple
+    countries: tuple
+    norm_names: tuple
+    targets: tuple
+    country_keys: tuple
+    has_super: tuple
+    # Vues numpy (lecture seule) utilisées par le scoring vectorisé
+    country_masks: dict = field(default_factory=dict, repr=False)
+    international: np.ndarray = field(default=None, repr=False)
+    super_mask: np.ndarray = field(default=None, repr=False)
+    positions: np.ndarray = field(default=None, repr=False)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, group_cols: tuple = (),
+                   previous: "CompetitionIndex" = None) -> "CompetitionIndex":
+        """
+        group_cols: extra columns kept apart by the deduplication (e.g. the sport of a merged frame).
+        previous: index of an earlier version of the sheet; its normalized names and, when it was
+        built, its token index are reused for the entries that did not change.
+        """
+        if df.empty:
+            rows, positions, entry_keys = [], [], ()
+        else:
+            cols = ["Nom commun", "Genre", "Pays"] + list(group_cols)
+            positions = np.flatnonzero(~df.duplicated(subset=cols).to_numpy())
+            selected = df[cols].iloc[positions].astype(object)
+            rows = selected[cols[:3]].values.tolist()
+            # Cellules vides ramenées à None : NaN ou None selon la façon dont la feuille a été relue
+            selected = selected.where(selected.notna(), None)
+            entry_keys = tuple(zip(*(selected[col].tolist() for col in cols)))
+        names, genres, countries = (tuple(col) for col in zip(*rows)) if rows else ((), (), ())
+
+        known = dict(zip(previous.names, previous.norm_names)) if previous is not None else {}
+        norm_names = tuple(known[n] if n in known else normalize(n) for n in names)
+        db_countries = [str(c).lower() for c in countries]
+        # Clés calculées une fois par pays distinct
+        keys_by_country = {
+            c: frozenset(key for key, variants in CONCEPT_GROUPS.items()
+                         if key != "cup" and any(v in c for v in variants))
+            for c in set(db_countries)
+        }
+        country_keys = tuple(keys_by_country[c] for c in db_countries)
+        has_super = tuple("super" in n for n in norm_names)
+        index = cls(
+            keys=entry_keys,
+            names=names,
+            genres=genres,
+            countries=tuple(db_countries),
+            norm_names=norm_names,
+            targets=tuple(f"{n} {c}" for n, c in zip(norm_names, db_countries)),
+            country_keys=country_keys,
+            has_super=has_super,
+            country_masks={
+                key: _frozen_array([key in keys for keys in country_keys], dtype=bool)
+                for key in CONCEPT_GROUPS if key != "cup"
+            },
+            international=_frozen_array([c == "international" for c in db_countries], dtype=bool),
+            super_mask=_frozen_array(has_super, dtype=bool),
+            positions=_frozen_array(positions, dtype=np.int64),
+        )
+        if previous is not None:
+            index._carry_over(previous)
+        return index
+
+    def _carry_over(self, previous: "CompetitionIndex"):
+        # Entrée inchangée = même clé (nom, genre, pays, groupe) donc même cible
+        old_row = {key: row for row, key in enumerate(previous.keys)}
+        old_rows = np.fromiter((old_row.get(key, -1) for key in self.keys), dtype=np.int64, count=len(self.keys))
+        if "token_index" in previous.__dict__:
+            self.__dict__["token_index"] = previous.token_index.updated(self.targets, old_rows)
+
+    def __len__(self):
+        return len(self.names)
+
+    @cached_property
+    def token_index(self) -> TokenIndex:
+        return TokenIndex(self.targets)
+
+
+# Un index par feuille chargée, clé = (feuille, empreinte du contenu)
+_INDEX_CACHE = {}
+_INDEX_CACHE_SIZE = 16
+_INDEX_LOCK = threading.Lock()
+
+
+def get_competition_index(df: pd.DataFrame) -> CompetitionIndex:
+    """Index of a loaded sheet, built once per sheet content."""
+    content_hash = df.attrs.get('content_hash')
+    if content_hash is None:
+        return CompetitionIndex.from_frame(df)
+
+    key = (df.attrs.get('sport_name'), content_hash, len(df))
+    index = _INDEX_CACHE.get(key)
+    if index is None:
+        with timed("index_build"):
+            index = CompetitionIndex.from_frame(df)
+        index = _store_index(key, index)
+    return index
+
+
+def _store_index(key, index) -> CompetitionIndex:
+    """Caches index under key, or returns the one another thread cached first."""
+    with _INDEX_LOCK:
+        if key in _INDEX_CACHE:
+            return _INDEX_CACHE[key]
+        if len(_INDEX_CACHE) >= _INDEX_CACHE_SIZE:
+            _INDEX_CACHE.pop(next(iter(_INDEX_CACHE)))
+        _INDEX_CACHE[key] = index
+        return index
+
+
+def carry_over_index(old_df: pd.DataFrame, new_df: pd.DataFrame):
+    """Builds the index of a refreshed sheet from the cached index of its previous version, if any."""
+    old_key = (old_df.attrs.get('sport_name'), old_df.attrs.get('content_hash'), len(old_df))
+    new_key = (new_df.attrs.get('sport_name'), new_df.attrs.get('content_hash'), len(new_df))
+    previous = _INDEX_CACHE.get(old_key)
+    if previous is None or new_key[1] is None or new_key in _INDEX_CACHE:
+        return
+    with timed("index_update"):
+        _store_index(new_key, CompetitionIndex.from_frame(new_df, previous=previous))
+
+
+def _score_candidates(index: CompetitionIndex, rows, user_variations, target_country_key,
+                      penalize_super: bool, threshold) -> list:
+    """Scores the given rows (None = every row) and returns [(row, score)] ranked, file order on ties."""
+    if rows is None:
+        rows, sel, targets = range(len(index)), slice(None), index.targets
+    else:
+        sel, targets = rows, [index.targets[i] for i in rows]
+    if not len(targets):
+        return []
+
+    # Matrice variantes x candidats en un seul appel
+    # Le seul ajustement positif est le bonus pays : en dessous de ce seuil, aucun candidat ne peut passer
+    score_cutoff = max(0, threshold - (COUNTRY_BONUS if target_country_key else 0))
+    matrix = process.cdist(user_variations, targets, scorer=fuzz.token_set_ratio,
+                           score_cutoff=score_cutoff, dtype=np.float64, workers=SCORING_WORKERS)
+    scores = matrix.max(axis=0)
+
+    # --- AJUSTEMENTS ---
+    if target_country_key:
+        scores = np.where(index.country_masks[target_country_key][sel], scores + COUNTRY_BONUS,
+                          np.where(index.international[sel], scores, scores - COUNTRY_PENALTY))
+
+    if penalize_super:
+        scores = np.where(index.super_mask[sel], scores - SUPER_PENALTY, scores)
+
+    passing = np.flatnonzero(scores >= threshold)
+    # Tri stable : à score égal, l'ordre du fichier est conservé
+    ranked = passing[np.argsort(-scores[passing], kind="stable")]
+    return [(int(rows[i]), float(scores[i])) for i in ranked]
+
+
+def _window_reaches(scored: list, rows: np.ndarray, window: float) -> bool:
+    """True if one of rows scores within window of the best score."""
+    if not scored or not len(rows):
+        return False
+    rows, floor = set(rows.tolist()), scored[0][1] - window
+    for row, score in scored:
+        if score < floor:
+            return False
+        if row in rows:
+            return True
+    return False
+
+
+def rank_rows(user_query: str, index: CompetitionIndex, threshold: int = 65, prune: bool = True,
+              rows=None, window: float = None) -> list:
+    """
+    Fuzzy ranking of the index entries against the query: [(entry, score)], best first.
+    rows (sorted entry positions) restricts the search to a subset of the index.
+    window: score gap below the best that the caller keeps (MATCH_WINDOW by default); the
+    pre-filter widens until its least overlapping candidates no longer reach it.
+    """
+    window = MATCH_WINDOW if window is None else window
+    if not len(index): return []
+
+    with timed("variations"):
+        user_norm = normalize(user_query)
+
+        # 1. DÉTECTION DU PAYS
+        target_country_key = None
         for key, variants in CONCEPT_GROUPS.items():
-            if word == key or word in variants:
-                words_possibilities.append(list(set([word] + variants)))
-                found_group = True
+            if key == "cup": continue
+            if any(v in user_norm for v in variants):
+                target_country_key = key
                 break
-        if not found_group:
-            words_possibilities.append([word])
-    combos = list(itertools.product(*words_possibilities))
-    return [" ".join(c) for c in combos][:15]
-
-
-def get_matches_multiples(user_query: str, df: pd.DataFrame, threshold: int = 65):
-    if df.empty: return []
-
-    user_norm = normalize(user_query)
-    competition_options = df[["Nom commun", "Genre", "Pays"]].drop_duplicates().values.tolist()
-
-    # 1. DÉTECTION DU PAYS
-    target_country_key = None
-    for key, variants in CONCEPT_GROUPS.items():
-        if key == "cup": continue
-        if any(v in user_norm for v in variants):
-            target_country_key = key
-            break
-
-    # 2. GÉNÉRATION DES VARIANTES (Crucial pour Spanish Cup -> Copa Rey)
-    user_variations = generate_variations(user_query)
-
-    scored_results = []
-    for opt in competition_options:
-        db_name = normalize(opt[0])
-        db_country = str(opt[2]).lower()
-        combined_target = f"{db_name} {db_country}"
-
-        # On teste chaque variante générée contre le nom en base
-        best_var_score = 0
-        for var in user_variations:
-            var_score = fuzz.token_set_ratio(var, combined_target)
-            if var_score > best_var_score:
-                best_var_score = var_score
-
-        score = best_var_score
-
-        # --- AJUSTEMENTS ---
-        if target_country_key:
-            country_variants = CONCEPT_GROUPS[target_country_key]
-            if any(v in db_country for v in country_variants):
-                score += 10
-            elif db_country != "international":
-                score -= 30
-
-        if "super" in db_name and "super" not in user_norm:
-            score -= 15
-
-        if score >= threshold:
-            scored_results.append((opt[0], score, opt[1]))
-
-    scored_results.sort(key=lambda x: x[1], reverse=True)
+
+        # 2. GÉNÉRATION DES VARIANTES (Crucial pour Spanish Cup -> Copa Rey)
+        user_variations = generate_variations(user_query)
+        penalize_super = "super" not in user_norm
+
+    # 3. SCORING (pré-filtré par l'index inversé sur les gros catalogues)
+    with timed("scoring"):
+        scored = None
+        if prune and len(index) >= PRUNE_MIN_ROWS and (rows is None or len(rows) >= PRUNE_MIN_ROWS):
+            ranked = index.token_index.ranked(user_variations)
+            if rows is not None:
+                ranked = ranked[np.isin(ranked, rows, assume_unique=True)]
+            limit = PRUNE_MAX_CANDIDATES
+            while True:
+                scored = _score_candidates(index, np.sort(ranked[:limit]), user_variations, target_country_key,
+                                           penalize_super, threshold)
+                # Moitié la moins proche encore dans la fenêtre : les suivants pourraient l'être aussi
+                if limit >= len(ranked) or not _window_reaches(scored, ranked[limit // 2:limit], window):
+                    break
+                limit *= 2
+            if not scored or (PRUNE_FALLBACK_SCORE is not None and scored[0][1] < PRUNE_FALLBACK_SCORE):
+                scored = None
+
+        if scored is None:
+            scored = _score_candidates(index, rows, user_variations, target_country_key,
+                                       penalize_super, threshold)
+    return scored
+
+
+def get_matches_multiples(user_query: str, df, threshold: int = 65, prune: bool = True, window: float = None):
+    index = df if isinstance(df, CompetitionIndex) else get_competition_index(df)
+    window = MATCH_WINDOW if window is None else window
+    scored_results = [(index.names[i], score, index.genres[i])
+                      for i, score in rank_rows(user_query, index, threshold, prune, window=window)]
+
     if not scored_results: return []
 
     best_score = scored_results[0][1]
@@ -98,10 +414,10 @@ def get_matches_multiples(user_query: str, df: pd.DataFrame, threshold: int = 65
     seen = set()
 
     for res in scored_results:
-        if res[1] >= (best_score - 10):
+        if res[1] >= (best_score - window):
             key = f"{res[0]}_{res[2]}"
             if key not in seen:
                 valid_matches.append(res)
                 seen.add(key)
 
-    return valid_matches
\ No newline at end of file
+    return valid_matches
@@ -0,0 +1,199 @@
+"""
+Per-stage latency histograms (download, parse, variations, scoring, search, decide, ...) by sport.
+
+Disabled by default: timed() then returns a shared no-op context manager and the decorated
+functions only test a flag. Enable with ANJ_METRICS=1 or metrics.enable(). The histograms
+are exported in Prometheus text format by render_prometheus() / write_prometheus(path).
+"""
+import bisect
+import contextvars
+import functools
+import os
+import threading
+import time
+from collections import deque
+
+ENABLED = os.environ.get("ANJ_METRICS", "").lower() in ("1", "true", "yes")
+
+# Bornes (secondes) des buckets Prometheus
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0)
+# Échantillons récents conservés par histogramme pour les percentiles
+RECENT_SAMPLES = 1024
+METRIC_NAME = "anj_stage_duration_seconds"
+
+# Sport de la recherche en cours : les étapes internes (matcher) en héritent
+_current_sport = contextvars.ContextVar("anj_metrics_sport", default="")
+
+
+class Histogram:
+    def __init__(self):
+        self.bucket_counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds: float):
+        self.bucket_counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.recent.append(seconds)
+
+    def quantile(self, q: float) -> float | None:
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class Registry:
+    """Histograms keyed by (stage, sport), shared by every thread of the process."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, sport: str = ""):
+        key = (stage, sport)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self) -> list:
+        """One dict per (stage, sport): count, total and p50 / p95 / p99 in milliseconds."""
+        with self._lock:
+            items = sorted(self._histograms.items())
+            rows = []
+            for (stage, sport), h in items:
+                rows.append({
+                    "stage": stage,
+                    "sport": sport or "all",
+                    "count": h.count,
+                    "total_ms": round(h.sum * 1000, 3),
+                    **{f"p{int(q * 100)}_ms": None if h.quantile(q) is None else round(h.quantile(q) * 1000, 3)
+                       for q in (0.5, 0.95, 0.99)},
+                })
+            return rows
+
+    def render_prometheus(self) -> str:
+        lines = [f"# HELP {METRIC_NAME} Duration of the compliance engine stages.",
+                 f"# TYPE {METRIC_NAME} histogram"]
+        with self._lock:
+            for (stage, sport), h in sorted(self._histograms.items()):
+                labels = f'stage="{_escape(stage)}",sport="{_escape(sport or "all")}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS + (float("inf"),), h.bucket_counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{METRIC_NAME}_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"{METRIC_NAME}_sum{{{labels}}} {h.sum!r}")
+                lines.append(f"{METRIC_NAME}_count{{{labels}}} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = Registry()
+
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+
+class _Timer:
+    __slots__ = ("stage", "sport", "start", "token")
+
+    def __init__(self, stage: str, sport: str = None):
+        self.stage = stage
+        self.sport = sport
+        self.token = None
+
+    def __enter__(self):
+        if self.sport is not None:
+            self.token = _current_sport.set(self.sport)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        if self.token is not None:
+            _current_sport.reset(self.token)
+            self.token = None
+        REGISTRY.observe(self.stage, elapsed, self.sport if self.sport is not None else _current_sport.get())
+        return False
+
+    def stop(self, sport: str = None):
+        """Records the time since the timer was created/entered (timers not used as `with`)."""
+        REGISTRY.observe(self.stage, time.perf_counter() - self.start,
+                         sport if sport is not None else (self.sport or ""))
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def stop(self, sport: str = None):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timed(stage: str, sport: str = None):
+    """with timed("parse"): ... records the block; sport=None inherits the enclosing search's sport."""
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(stage, sport)
+
+
+def start_timer(stage: str, sport: str = None):
+    """Timer started now and recorded by .stop(); for spans that do not fit a `with` block."""
+    if not ENABLED:
+        return _NULL_TIMER
+    timer = _Timer(stage, sport)
+    timer.start = time.perf_counter()
+    return timer
+
+
+def timed_call(stage: str, sport: str = None):
+    """Decorator version of timed()."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with _Timer(stage, sport):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render_prometheus() -> str:
+    return REGISTRY.render_prometheus()
+
+
+def write_prometheus(path: str):
+    """Writes the histograms atomically to `path` (node_exporter textfile collector format)."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
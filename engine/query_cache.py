@@ -0,0 +1,220 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Taille et durée de vie (secondes) du cache, surchargées par variables d'environnement
+QUERY_CACHE_SIZE = int(os.environ.get("QUERY_CACHE_SIZE", "2048"))
+QUERY_CACHE_TTL = float(os.environ.get("QUERY_CACHE_TTL", "3600"))
+
+
+class QueryCache:
+    """
+    Bounded LRU with TTL for search / decide results, shared by every session of the process.
+
+    Entries are grouped by namespace (the list and the sheet) and belong to a generation
+    (source_ref + content hash of the loaded sheet): the first lookup made with a new generation
+    drops everything cached for that sheet under the previous one. Lookups still made with the
+    replaced generation (requests on the frames served while the refreshed ones are warmed)
+    bypass the cache instead of switching the sheet back to it, until register() is told which
+    generation is actually served.
+    """
+
+    def __init__(self, maxsize: int = QUERY_CACHE_SIZE, ttl: float = QUERY_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generations = {}
+        # Génération remplacée de chaque namespace, encore servie jusqu'au swap
+        self._replaced = {}
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def _check_generation(self, namespace, generation) -> bool:
+        """False for a lookup made with the generation the sheet was refreshed from (not cached)."""
+        previous = self._generations.setdefault(namespace, generation)
+        if previous == generation:
+            return True
+        if self._replaced.get(namespace) == generation:
+            return False
+        self._switch(namespace, generation)
+        return True
+
+    def _switch(self, namespace, generation):
+        """Replaces the generation of a namespace, dropping its entries."""
+        self._replace(namespace, generation)
+        stale = [key for key in self._entries if key[0] == namespace]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += 1
+
+    def _replace(self, namespace, generation):
+        if namespace in self._generations:
+            self._replaced[namespace] = self._generations[namespace]
+        self._generations[namespace] = generation
+
+    def register(self, namespace, generation):
+        """
+        Records the generation of the sheet actually served. A different one (a refresh whose
+        warm-up failed, a list back to a previous version without a carry-over) becomes the
+        current generation again, so lookups on the served frames are cached instead of bypassed.
+        """
+        with self._lock:
+            if self._generations.get(namespace, generation) != generation:
+                self._switch(namespace, generation)
+
+    def get(self, namespace, key, generation=None):
+        """Returns (found, value)."""
+        key = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(key) if self._check_generation(namespace, generation) else None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            expires_at, value = entry
+            if self.ttl and time.monotonic() > expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, namespace, key, value, generation=None):
+        key = (namespace, key)
+        with self._lock:
+            if not self._check_generation(namespace, generation) or self.maxsize <= 0:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def carry_over(self, namespace, old_generation, new_generation, keep):
+        """
+        Moves the entries of a sheet to its refreshed generation, keeping those for which
+        keep(key) is true; does nothing if the sheet is no longer cached under old_generation.
+        """
+        with self._lock:
+            if self._generations.get(namespace) != old_generation:
+                return
+            stale = [key for key in self._entries if key[0] == namespace and not keep(key[1])]
+            for key in stale:
+                del self._entries[key]
+            self._replace(namespace, new_generation)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+            self._replaced.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            sizes = dict.fromkeys(self._generations, 0)
+            for key in self._entries:
+                sizes[key[0]] = sizes.get(key[0], 0) + 1
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "namespaces": {_label(namespace): size for namespace, size in sizes.items()},
+            }
+
+
+def _label(namespace) -> str:
+    return " / ".join(map(str, namespace)) if isinstance(namespace, tuple) else str(namespace)
+
+
+QUERY_CACHE = QueryCache()
+
+
+def _copy(value):
+    # Les appelants peuvent modifier le résultat (dict de décision, liste de matches)
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
+def namespace(df) -> tuple:
+    """Namespace of the entries cached for a sheet: its list (URL, else reference) and its name."""
+    return df.attrs.get('source_url') or df.attrs.get('source_ref'), df.attrs.get('sport_name')
+
+
+def generation(df):
+    """Generation of the entries cached for a sheet: its source reference and content hash."""
+    return df.attrs.get('source_ref'), df.attrs.get('content_hash')
+
+
+def carry_over(old_df, new_df, competitions):
+    """
+    Keeps the cached decisions of a refreshed sheet whose competition did not change;
+    searches are dropped since any changed row can change their ranking.
+    """
+    if generation(old_df)[0] != generation(new_df)[0]:
+        return
+    changed = {str(c).lower().strip() for c in competitions}
+
+    def keep(key):
+        name, text = key[1], key[2]
+        return name.startswith("decide_") and text.lower().strip() not in changed
+
+    QUERY_CACHE.carry_over(namespace(new_df), generation(old_df), generation(new_df), keep)
+
+
+def register(sheets):
+    """QueryCache.register() for each loaded sheet of a served workbook."""
+    for df in sheets.values():
+        if df.attrs.get('content_hash') is not None:
+            QUERY_CACHE.register(namespace(df), generation(df))
+
+
+def cached_query(normalize_text: bool):
+    """
+    Caches a handle_*_search / decide_* function taking (text, df, ...) in QUERY_CACHE.
+
+    Key: (function, sheet, text, other arguments). normalize_text=True lower-cases and strips
+    the text (searches are case-insensitive); decisions keep it exact since some are
+    case-sensitive. Frames without a content hash (not loaded by anj_loader) bypass the cache.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(text, df, *args, **kwargs):
+            content_hash = df.attrs.get('content_hash')
+            if content_hash is None or not isinstance(text, str):
+                return fn(text, df, *args, **kwargs)
+
+            bound = signature.bind(text, df, *args, **kwargs)
+            bound.apply_defaults()
+            extra = tuple(list(bound.arguments.values())[2:])
+            key = (fn.__module__, fn.__name__, text.lower().strip() if normalize_text else text, extra)
+            try:
+                hash(key)
+            except TypeError:
+                return fn(text, df, *args, **kwargs)
+            sheet = namespace(df)
+            current = generation(df)
+
+            found, value = QUERY_CACHE.get(sheet, key, current)
+            if not found:
+                value = fn(text, df, *args, **kwargs)
+                QUERY_CACHE.set(sheet, key, value, current)
+            return _copy(value)
+
+        return wrapper
+    return decorator
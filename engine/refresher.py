@@ -0,0 +1,188 @@
+"""
+Background refresh of the ANJ sheets (stale-while-revalidate).
+
+A DatasetRefresher loads the sheets once, then revalidates them against the source every
+`interval` seconds in a daemon thread. A new version is warmed (indexes, decision tables)
+before it is swapped in, so requests keep being served from the current sheets and never
+wait for a download or a parse. A failed refresh keeps the current sheets and is retried
+with exponential backoff.
+"""
+import logging
+import os
+import threading
+import time
+from types import MappingProxyType
+
+from engine import query_cache
+from engine.anj_loader import refresh_workbook
+from engine.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Intervalle (secondes) entre deux revalidations de la liste, 0 = pas de refresh en arrière-plan
+REFRESH_INTERVAL = float(os.environ.get("ANJ_REFRESH_INTERVAL", "3600"))
+# Premier délai de nouvel essai après un échec, doublé à chaque échec jusqu'au plafond
+RETRY_DELAY = 30.0
+MAX_RETRY_DELAY = float(os.environ.get("ANJ_REFRESH_MAX_BACKOFF", "1800"))
+
+
+def load_sheets(url: str, initial: bool, store=None, layout=None) -> dict:
+    """First load: snapshot allowed (fresh enough or offline); later ones: real revalidation."""
+    if initial:
+        return refresh_workbook(url, store=store, layout=layout)
+    return refresh_workbook(url, store=store, max_age=0, offline=False, layout=layout)
+
+
+def _same_content(old: dict, new: dict) -> bool:
+    return old.keys() == new.keys() and all(
+        old[s].attrs.get('content_hash') is not None
+        and old[s].attrs.get('content_hash') == new[s].attrs.get('content_hash')
+        for s in old
+    )
+
+
+class DatasetRefresher:
+    """
+    Current version of the ANJ sheets, refreshed in the background.
+
+    Readers take `sheets` (or `current()`) once per request and use that mapping throughout: it
+    is read-only and shared by every reader without any copy, a refresh replaces the whole
+    mapping and never mutates the frames being served.
+    warm(sheets) runs on a new version before the swap, on_swap(sheets) right after it.
+    store / layout: snapshot and sheet layout of the list (default: those of the regulator at url).
+    """
+
+    def __init__(self, url: str, interval: float = REFRESH_INTERVAL, load=load_sheets, warm=None,
+                 on_swap=None, retry_delay: float = RETRY_DELAY, max_retry_delay: float = MAX_RETRY_DELAY,
+                 store=None, layout=None):
+        self.url = url
+        self.store = store
+        self.layout = layout
+        self.interval = interval
+        self.load = load
+        self.warm = warm
+        self.on_swap = on_swap
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+
+        self.sheets = None
+        self.version = 0
+        # Date à laquelle les données servies ont été confirmées à jour par la source
+        self.verified_at = None
+        self.last_attempt = None
+        self.last_error = None
+        self.failures = 0
+        self.next_attempt_at = None
+        self.refreshing = False
+
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> "DatasetRefresher":
+        """Starts the background thread; it loads the sheets right away if none are loaded yet."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="anj-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def refresh_now(self):
+        """Asks the background thread for an immediate revalidation (does not wait for it)."""
+        self._wake.set()
+
+    def current(self, timeout: float = None) -> MappingProxyType:
+        """Sheets being served, waiting for the first load if needed."""
+        self._ready.wait(timeout)
+        sheets = self.sheets
+        if sheets is None:
+            raise RuntimeError(f"ANJ data not loaded: {self.last_error or 'still loading'}")
+        return sheets
+
+    def dataset(self, timeout: float = None) -> tuple:
+        """(version, sheets) read together."""
+        self.current(timeout)
+        with self._lock:
+            return self.version, self.sheets
+
+    def refresh(self) -> bool:
+        """Loads, warms and swaps in the latest sheets; False (current sheets kept) on failure."""
+        initial = self.sheets is None
+        self.last_attempt = time.time()
+        self.refreshing = True
+        try:
+            with timed("refresh"):
+                sheets = MappingProxyType(dict(self.load(self.url, initial, store=self.store, layout=self.layout)))
+                current = self.sheets
+                if current is not None and _same_content(current, sheets):
+                    # Liste inchangée : on garde les DataFrames (et leurs caches) déjà servis
+                    sheets = current
+                elif self.warm is not None:
+                    self.warm(sheets)
+            with self._lock:
+                swapped = sheets is not self.sheets
+                self.sheets = sheets
+                if swapped:
+                    self.version += 1
+            if initial:
+                # Premier chargement éventuellement servi depuis le snapshot : son âge est celui du snapshot
+                fetched = [df.attrs.get('fetched_at') for df in sheets.values() if df.attrs.get('fetched_at')]
+                self.verified_at = min(fetched) if fetched else time.time()
+            else:
+                self.verified_at = time.time()
+            self.failures = 0
+            self.last_error = None
+            if swapped and self.on_swap is not None:
+                self.on_swap(sheets)
+            return True
+        except Exception as e:
+            self.failures += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            logger.warning("ANJ refresh failed (%d in a row), serving the current data: %s", self.failures, e)
+            return False
+        finally:
+            if self.sheets is not None:
+                # Génération réellement servie (l'ancienne si le préchauffage a échoué)
+                query_cache.register(self.sheets)
+            self.refreshing = False
+            self._ready.set()
+
+    def _retry_delay(self) -> float:
+        return min(self.max_retry_delay, self.retry_delay * 2 ** (self.failures - 1))
+
+    def _run(self):
+        # interval = 0 : plus de revalidation périodique, seulement refresh_now()
+        periodic = self.interval or None
+        delay = 0 if self.sheets is None else periodic
+        while True:
+            self.next_attempt_at = None if delay is None else time.time() + delay
+            self._wake.wait(delay)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            delay = periodic if self.refresh() else self._retry_delay()
+
+    def age(self) -> float | None:
+        """Seconds since the served data was last confirmed current."""
+        return None if self.verified_at is None else time.time() - self.verified_at
+
+    def status(self) -> dict:
+        now = time.time()
+        return {
+            "version": self.version,
+            "age_seconds": self.age(),
+            "verified_at": self.verified_at,
+            "refreshing": self.refreshing,
+            "last_attempt": self.last_attempt,
+            "last_error": self.last_error,
+            "failures": self.failures,
+            "next_attempt_in": max(0.0, self.next_attempt_at - now) if self.next_attempt_at else None,
+            "interval": self.interval,
+        }
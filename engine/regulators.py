@@ -0,0 +1,86 @@
+"""
+Registry of the regulators whose lists the bot answers for, and the layout of each list.
+
+regulators.json (plus the file named by ANJ_REGULATORS_FILE, whose entries are added or
+replace those of the same key) describes one source per regulator:
+
+    "anj": {"name": "ANJ (France)", "url": "https://... | file:///...", "layout": {...}}
+
+A layout maps the workbook of a regulator to the common schema of the engine (engine.columns
+and the sheet names of SPORT_SHEETS):
+- "sheets": tab of the workbook -> sheet name ("Soccer" -> "Football"), other tabs kept as is,
+- "columns": header of the regulator -> engine column ("Competition" -> "Nom commun"),
+- "header_rows": sheet -> row of the header when it is not found in the first rows,
+  "default_header_row" for the other sheets,
+- "source_ref": fixed reference of the list (default: cell A1 of each sheet),
+- "propagate": engine columns filled down from merged cells.
+"""
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+REGULATORS_FILE = Path(__file__).resolve().parent / "regulators.json"
+DEFAULT_REGULATOR = "anj"
+
+# List of columns to propagate (ffill)
+PROPAGATION_COLS = ('Sport', 'Discipline', 'Pays', 'Club/Nation', 'Nom générique', 'Genre')
+
+
+@dataclass(frozen=True)
+class SheetLayout:
+    sheets: dict = field(default_factory=dict)
+    columns: dict = field(default_factory=dict)
+    header_rows: dict = field(default_factory=dict)
+    default_header_row: int = 4
+    source_ref: str = None
+    propagate: tuple = PROPAGATION_COLS
+
+    def sheet_name(self, tab: str) -> str:
+        return self.sheets.get(tab, tab)
+
+    def column(self, header: str) -> str:
+        return self.columns.get(header, header)
+
+    def header_row(self, sheet: str) -> int:
+        return self.header_rows.get(sheet, self.default_header_row)
+
+    @classmethod
+    def from_dict(cls, layout: dict) -> "SheetLayout":
+        layout = dict(layout)
+        if "propagate" in layout:
+            layout["propagate"] = tuple(layout["propagate"])
+        return cls(**layout)
+
+
+@dataclass(frozen=True)
+class RegulatorSource:
+    key: str
+    name: str
+    url: str
+    layout: SheetLayout = field(default_factory=SheetLayout)
+
+
+def load_regulators(*paths) -> dict:
+    """key -> RegulatorSource of regulators.json files, later files adding or replacing sources."""
+    sources = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for key, source in json.load(f).items():
+                sources[key] = RegulatorSource(key, source.get("name", key), source["url"],
+                                               SheetLayout.from_dict(source.get("layout", {})))
+    return sources
+
+
+REGULATORS = load_regulators(REGULATORS_FILE, *filter(None, [os.environ.get("ANJ_REGULATORS_FILE")]))
+ANJ_LAYOUT = REGULATORS[DEFAULT_REGULATOR].layout
+
+
+def regulator_for_url(url: str) -> RegulatorSource | None:
+    return next((source for source in REGULATORS.values() if source.url == url), None)
+
+
+def layout_for_url(url: str) -> SheetLayout:
+    """Layout of the registered source at url, the ANJ layout for any other URL."""
+    source = regulator_for_url(url)
+    return source.layout if source is not None else ANJ_LAYOUT
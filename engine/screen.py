@@ -0,0 +1,397 @@
+"""
+Headless bulk screening of fixtures against the ANJ list.
+
+    python -m engine.screen fixtures.csv [--output results.csv] [--workbook anj.xlsx]
+
+The input is a CSV with a header (or a .jsonl file) with the fields sport, competition,
+gender and discipline (gender and discipline may be empty). An empty sport, or "auto",
+searches every sport at once and keeps the best match. Rows are streamed in chunks
+and one decision record is written per input row as soon as its chunk is screened, so
+memory stays bounded whatever the input size.
+"""
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+from engine import matcher, metrics
+from engine.aliases import get_exact_index
+from engine.anj_loader import ANJ_URL, _resolve_fr_sport, read_workbook, refresh_workbook, snapshot_store_for_url
+from engine.autocomplete import get_autocomplete_index
+from engine.decision_table import get_decision_table
+from engine.regulators import DEFAULT_REGULATOR, REGULATORS
+from engine.cross_sport import SPORT_SHEETS, get_cross_sport_index, search_all_sports
+from engine.football_handler import _resolve_football, handle_football_search, decide_football
+from engine.badminton_handler import BadmintonIndex, _resolve_badminton, handle_badminton_search, decide_badminton
+from engine.golf_handler import GolfIndex, _resolve_golf, handle_golf_search, decide_golf
+from engine.substring_index import get_sheet_index
+from engine.snooker_handler import handle_snooker_search, decide_snooker
+
+# Sport à déduire de la compétition (recherche sur toutes les feuilles)
+AUTO_SPORT = "Auto"
+
+GENDER_ALIASES = {
+    "homme": "Homme", "men": "Homme", "man": "Homme", "male": "Homme", "m": "Homme", "h": "Homme",
+    "femme": "Femme", "women": "Femme", "woman": "Femme", "female": "Femme", "f": "Femme", "w": "Femme",
+    "mixte": "Mixte", "mixed": "Mixte",
+}
+DISCIPLINE_ALIASES = {"singles": "Singles", "simple": "Singles", "doubles": "Doubles", "double": "Doubles"}
+
+INPUT_FIELDS = ["sport", "competition", "gender", "discipline"]
+RESULT_FIELDS = INPUT_FIELDS + [
+    "matched_competition", "matched_sport", "score", "candidates", "allowed", "restrictions", "phases",
+    "country", "genre", "source_ref", "error",
+]
+
+# Nombre maximum de décisions mémorisées (LRU) pour les compétitions répétées
+MEMO_SIZE = 100_000
+CHUNK_SIZE = 10_000
+# Chunks envoyés au pool sans attendre leurs résultats, par worker (mémoire bornée)
+IN_FLIGHT_CHUNKS_PER_WORKER = 2
+
+
+def search_sport(sport, text, df, discipline=None):
+    """handle_*_search of the given sport (Football, Badminton, Golf, Snooker)."""
+    if sport == "Football":
+        return handle_football_search(text, df)
+    if sport == "Badminton":
+        return handle_badminton_search(text, df, discipline or "Singles")
+    if sport == "Golf":
+        return handle_golf_search(text, df)
+    return handle_snooker_search(text, df)
+
+
+def decide_sport(sport, comp_name, df, genre=None, discipline=None):
+    """decide_* of the given sport."""
+    if sport == "Football":
+        return decide_football(comp_name, df, genre=genre)
+    if sport == "Badminton":
+        return decide_badminton(comp_name, df, genre=genre, discipline=discipline)
+    if sport == "Golf":
+        return decide_golf(comp_name, df, genre=genre)
+    return decide_snooker(comp_name, df)
+
+
+# Index propre à chaque feuille et table de décision (nom, résolution, casefold) des handlers
+SHEET_INDEXES = {"Badminton": ("badminton", BadmintonIndex.from_frame), "Golf": ("golf", GolfIndex.from_frame)}
+DECISION_TABLES = {
+    "Football": ("football", _resolve_football, True),
+    "Badminton": ("badminton", _resolve_badminton, False),
+    "Golf": ("golf", _resolve_golf, False),
+    "Snooker": ("fr_sport", _resolve_fr_sport, True),
+}
+
+
+def _warm_competitions(index: matcher.CompetitionIndex):
+    if len(index) >= matcher.PRUNE_MIN_ROWS:
+        _ = index.token_index
+
+
+def warm_sheets(sheets: dict):
+    """
+    Builds the matcher indexes and decision tables of every sheet. The handlers are not
+    called, so the query cache and the search / decide metrics are left untouched.
+    """
+    for sport, sheet in SPORT_SHEETS.items():
+        df = sheets.get(sheet)
+        if df is None or df.empty:
+            continue
+        get_exact_index(df, sport)
+        if sport in SHEET_INDEXES:
+            get_sheet_index(df, *SHEET_INDEXES[sport])
+        else:
+            _warm_competitions(matcher.get_competition_index(df))
+        name, resolve, casefold = DECISION_TABLES[sport]
+        get_decision_table(df, name, resolve, casefold=casefold)
+    _warm_competitions(get_cross_sport_index(sheets).competitions)
+    get_autocomplete_index(sheets)
+
+
+def normalize_sport(value) -> str | None:
+    value = str(value or "").strip().lower()
+    if value in ("billard", "billiards"):
+        return "Snooker"
+    if value in ("", "auto", "all"):
+        return AUTO_SPORT
+    return next((sport for sport in SPORT_SHEETS if sport.lower() == value), None)
+
+
+class Screener:
+    """
+    Screens (sport, competition text, gender, discipline) rows with the chatbot's handlers.
+    Loaded sheets, their indexes and the decisions of already seen inputs are reused across rows.
+    """
+
+    def __init__(self, sheets: dict, memo_size: int = MEMO_SIZE):
+        self.sheets = sheets
+        self.memo_size = memo_size
+        self._memo = OrderedDict()
+        self._memo_lock = threading.Lock()
+        self.rows = 0
+        self.memo_hits = 0
+        self.memo_misses = 0
+        self.elapsed = 0.0
+
+    @classmethod
+    def from_url(cls, url: str = ANJ_URL, store=None, layout=None) -> "Screener":
+        return cls(refresh_workbook(url, store=store, layout=layout))
+
+    @classmethod
+    def from_file(cls, path: str, layout=None) -> "Screener":
+        with open(path, "rb") as f:
+            return cls(read_workbook(f.read(), layout))
+
+    @property
+    def unique_rows(self) -> int:
+        """Rows that actually went through search + decide (memo misses)."""
+        return self.memo_misses
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def screen_row(self, sport, competition, gender=None, discipline=None) -> dict:
+        sport_name = normalize_sport(sport)
+        text = str(competition or "").strip()
+        genre = GENDER_ALIASES.get(str(gender or "").strip().lower())
+        disc = DISCIPLINE_ALIASES.get(str(discipline or "").strip().lower())
+
+        key = (sport_name, text.lower(), genre, disc)
+        with self._memo_lock:
+            result = self._memo.get(key)
+            if result is not None:
+                self._memo.move_to_end(key)
+                self.memo_hits += 1
+        if result is None:
+            result = self._screen(sport_name, text, genre, disc)
+            with self._memo_lock:
+                self.memo_misses += 1
+                self._memo[key] = result
+                if len(self._memo) > self.memo_size:
+                    self._memo.popitem(last=False)
+
+        return {"sport": sport, "competition": competition, "gender": gender, "discipline": discipline, **result}
+
+    def _screen(self, sport, text, genre, discipline) -> dict:
+        result = {field: None for field in RESULT_FIELDS[len(INPUT_FIELDS):]}
+        result.update(allowed=False, candidates=0)
+        if sport is None:
+            result["error"] = "unknown sport"
+            return result
+        if sport == AUTO_SPORT:
+            ranked = search_all_sports(text, self.sheets, discipline=discipline)
+            if genre:
+                ranked = [m for m in ranked if not isinstance(m[2], str) or m[2] == genre]
+            # Le sport du meilleur résultat est le sport déduit ; ses compétitions sont les candidates
+            sport = ranked[0][3] if ranked else None
+            matches = [m[:3] for m in ranked if m[3] == sport]
+        else:
+            matches = None
+
+        df = self.sheets.get(SPORT_SHEETS[sport]) if sport else None
+        if sport and (df is None or df.empty):
+            result["error"] = f"sheet {SPORT_SHEETS[sport]} not loaded"
+            return result
+        if df is not None:
+            result["source_ref"] = df.attrs.get('source_ref')
+            result["matched_sport"] = sport
+
+        if matches is None:
+            matches = search_sport(sport, text, df, discipline)
+        if genre:
+            # Les lignes sans genre (Snooker) restent candidates
+            matches = [m for m in matches if not isinstance(m[2], str) or m[2] == genre]
+        result["candidates"] = len(matches)
+        if not matches:
+            result["error"] = "competition not recognised"
+            return result
+
+        # Meilleur score, puis ordre alphabétique pour départager les recherches non triées
+        best = sorted(matches, key=lambda m: (-m[1], str(m[0])))[0]
+        result["matched_competition"] = best[0]
+        result["score"] = best[1]
+
+        data = decide_sport(sport, best[0], df, best[2] if isinstance(best[2], str) else None, discipline)
+        result["allowed"] = bool(data.get("allowed"))
+        for field in ("restrictions", "phases", "country", "genre"):
+            result[field] = data.get(field)
+        return result
+
+    def warm(self):
+        """Builds the matcher indexes and decision tables of every sheet (before forking workers)."""
+        warm_sheets(self.sheets)
+
+    def use_sheets(self, sheets: dict):
+        """Swaps in a refreshed version of the sheets; the memoized decisions belong to the old one."""
+        with self._memo_lock:
+            self.sheets = sheets
+            self._memo.clear()
+
+    def _screen_any(self, row) -> dict:
+        if isinstance(row, dict):
+            return self.screen_row(*(row.get(field) for field in INPUT_FIELDS))
+        return self.screen_row(*row)
+
+    def screen(self, rows) -> list:
+        """rows: iterable of dicts (keys of INPUT_FIELDS) or (sport, competition, gender, discipline) tuples."""
+        return list(self.screen_stream(rows, chunk_size=CHUNK_SIZE))
+
+    def screen_stream(self, rows, chunk_size: int = CHUNK_SIZE, progress=None):
+        """
+        Generator version of screen(): reads `rows` chunk by chunk and yields the results of each
+        chunk before reading the next one. progress(screener) is called after every chunk.
+        """
+        rows = iter(rows)
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                return
+            start = time.perf_counter()
+            results = [self._screen_any(row) for row in chunk]
+            self.rows += len(results)
+            self.elapsed += time.perf_counter() - start
+            if progress:
+                progress(self)
+            yield from results
+
+    def screen_parallel(self, rows, workers: int, chunk_size: int = CHUNK_SIZE, progress=None):
+        """
+        Same as screen_stream() on a pool of `workers` processes. The sheets, indexes and decision
+        tables are built once here and inherited copy-on-write by the forked workers; chunks are
+        screened in parallel and the results come back in input order.
+        """
+        if workers <= 1:
+            yield from self.screen_stream(rows, chunk_size, progress)
+            return
+
+        self.warm()
+        global _WORKER_SCREENER
+        _WORKER_SCREENER = self
+        methods = multiprocessing.get_all_start_methods()
+        if "fork" in methods:
+            ctx, initargs = multiprocessing.get_context("fork"), (None,)
+        else:
+            # Pas de fork (Windows) : chaque worker reçoit une copie des feuilles
+            ctx, initargs = multiprocessing.get_context("spawn"), (dict(self.sheets),)
+
+        rows = iter(rows)
+        chunks = iter(lambda: list(itertools.islice(rows, chunk_size)), [])
+        start = time.perf_counter()
+        with ctx.Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+            # Fenêtre bornée de chunks en cours, rendus dans l'ordre d'entrée : l'entrée n'est lue
+            # qu'au fur et à mesure (pool.imap lirait tout le générateur d'avance)
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.apply_async(_screen_chunk, (chunk,)))
+                if len(pending) >= IN_FLIGHT_CHUNKS_PER_WORKER * workers:
+                    yield from self._collect_chunk(pending.popleft(), start, progress)
+            while pending:
+                yield from self._collect_chunk(pending.popleft(), start, progress)
+
+    def _collect_chunk(self, result, start: float, progress) -> list:
+        results, hits, misses = result.get()
+        self.rows += len(results)
+        self.memo_hits += hits
+        self.memo_misses += misses
+        self.elapsed = time.perf_counter() - start
+        if progress:
+            progress(self)
+        return results
+
+    def progress_line(self) -> str:
+        hit_rate = self.memo_hits / self.rows if self.rows else 0.0
+        return (f"{self.rows:,} rows ({self.unique_rows:,} screened, memo hit rate {hit_rate:.0%}) "
+                f"in {self.elapsed:.2f}s - {self.rows_per_sec:,.0f} rows/sec")
+
+
+# Screener hérité par les workers (fork) ou reconstruit à leur démarrage (spawn)
+_WORKER_SCREENER = None
+
+
+def _init_worker(sheets):
+    global _WORKER_SCREENER
+    if sheets is not None:
+        _WORKER_SCREENER = Screener(sheets)
+        _WORKER_SCREENER.warm()
+    # Un seul thread rapidfuzz par process : le parallélisme vient du pool
+    matcher.SCORING_WORKERS = 1
+
+
+def _screen_chunk(chunk):
+    screener = _WORKER_SCREENER
+    hits, misses = screener.memo_hits, screener.memo_misses
+    results = [screener._screen_any(row) for row in chunk]
+    return results, screener.memo_hits - hits, screener.memo_misses - misses
+
+
+def iter_fixtures(path: str):
+    """Streams the fixtures of a CSV (with header) or JSONL file, one dict per row."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def write_results(results, out, fmt: str = "csv"):
+    """Writes results (any iterable, consumed lazily) to an open file."""
+    if fmt == "jsonl":
+        for result in results:
+            out.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+        return
+    writer = csv.DictWriter(out, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for result in results:
+        writer.writerow(result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="fixtures CSV or JSONL (sport, competition, gender, discipline)")
+    parser.add_argument("--output", "-o", help="results file (default: stdout)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("--regulator", choices=list(REGULATORS), default=DEFAULT_REGULATOR,
+                        help="regulator whose list is loaded (engine/regulators.json)")
+    parser.add_argument("--url", help="workbook URL, file:// for a local copy (default: the regulator's)")
+    parser.add_argument("--workbook", help="local ANJ xlsx instead of the URL (offline)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--memo-size", type=int, default=MEMO_SIZE)
+    parser.add_argument("--workers", "-j", type=int, default=1, help="screening processes (default: 1)")
+    parser.add_argument("--quiet", "-q", action="store_true", help="no progress counters")
+    parser.add_argument("--metrics-file", help="write the stage timings there (Prometheus text format; main process only with -j)")
+    args = parser.parse_args(argv)
+
+    if args.metrics_file:
+        metrics.enable()
+
+    regulator = REGULATORS[args.regulator]
+    if args.workbook:
+        screener = Screener.from_file(args.workbook, regulator.layout)
+    else:
+        url = args.url or regulator.url
+        screener = Screener.from_url(url, store=snapshot_store_for_url(url), layout=regulator.layout)
+    screener.memo_size = args.memo_size
+    progress = None if args.quiet else (lambda s: print(s.progress_line(), file=sys.stderr, flush=True))
+    results = screener.screen_parallel(iter_fixtures(args.input), workers=args.workers,
+                                       chunk_size=args.chunk_size, progress=progress)
+
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as out:
+            write_results(results, out, args.format)
+    else:
+        write_results(results, sys.stdout, args.format)
+
+    print(f"Done: {screener.progress_line()}", file=sys.stderr)
+    if args.metrics_file:
+        metrics.write_prometheus(args.metrics_file)
+
+
+if __name__ == "__main__":
+    main()
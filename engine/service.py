@@ -0,0 +1,294 @@
+"""
+Headless HTTP/JSON decision service in front of the engine (asyncio, standard library only).
+
+    python -m engine.service [--host 127.0.0.1] [--port 8080] [--regulator anj | --url URL | --workbook anj.xlsx]
+                             [--refresh-interval 3600]
+
+    POST /search  {"sport": "Football", "query": "ligue 1", "discipline": null}   (sport "auto": every sport)
+    POST /decide  {"sport": "Football", "competition": "Ligue 1", "genre": "Homme", "lang": "en"}
+    POST /screen  {"rows": [{"sport": "Golf", "competition": "ryder cup"}, ...]}
+    POST /suggest {"query": "coupe de fr", "sport": "auto", "k": 8}   (typeahead over competition names)
+    GET  /health, GET /stats, GET /metrics (Prometheus text format)
+
+The ANJ sheets are loaded and warmed at startup, then revalidated in the background every
+--refresh-interval seconds (URL mode); a new version is swapped in once warmed. Matching and
+decisions run in a thread pool so the event loop only parses requests and writes responses.
+"""
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from engine import metrics
+from engine.anj_loader import snapshot_store_for_url
+from engine.regulators import DEFAULT_REGULATOR, REGULATORS
+from engine.query_cache import QUERY_CACHE
+from engine.autocomplete import DEFAULT_SUGGESTIONS, suggest
+from engine.cross_sport import search_all_sports
+from engine.refresher import REFRESH_INTERVAL, DatasetRefresher
+from engine.screen import Screener, SPORT_SHEETS, AUTO_SPORT, normalize_sport, search_sport, decide_sport, warm_sheets
+from engine.templates import TEMPLATES, render_decision
+
+# Latences conservées par route pour les percentiles de /stats
+LATENCY_WINDOW = 10_000
+MAX_BODY_BYTES = 10 * 1024 * 1024
+MAX_SUGGESTIONS = 50
+
+
+def _json_safe(value):
+    # NaN (cellules vides du fichier) n'est pas du JSON valide
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    return value
+
+
+class TextResponse:
+    """Non-JSON response body (e.g. the Prometheus exposition format)."""
+
+    def __init__(self, text: str, content_type: str = "text/plain; version=0.0.4; charset=utf-8"):
+        self.text = text
+        self.content_type = content_type
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def percentile(values, q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+class DecisionService:
+    """Routes of the service; every handler takes the JSON body and returns a JSON-able dict."""
+
+    def __init__(self, screener: Screener, executor_workers: int = None, refresher: DatasetRefresher = None):
+        self.screener = screener
+        self.refresher = refresher
+        self.executor = ThreadPoolExecutor(max_workers=executor_workers, thread_name_prefix="engine")
+        self.latencies = {}
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/stats"): self.stats,
+            ("GET", "/metrics"): self.metrics,
+            ("POST", "/search"): self.search,
+            ("POST", "/decide"): self.decide,
+            ("POST", "/screen"): self.screen,
+            ("POST", "/suggest"): self.suggest,
+        }
+
+    def _sheet(self, body: dict):
+        sport = normalize_sport(body.get("sport"))
+        if sport is None or sport == AUTO_SPORT:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"unknown sport: {body.get('sport')!r}")
+        df = self.screener.sheets.get(SPORT_SHEETS[sport])
+        if df is None or df.empty:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, f"sheet {SPORT_SHEETS[sport]} not loaded")
+        return sport, df
+
+    async def run_blocking(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def health(self, body):
+        sheets = self.screener.sheets
+        df = next(iter(sheets.values()), None)
+        health = {"status": "ok", "sheets": list(sheets),
+                  "source_ref": df.attrs.get('source_ref') if df is not None else None}
+        if self.refresher is not None:
+            health["data"] = self.refresher.status()
+        return health
+
+    async def stats(self, body):
+        routes = {}
+        for route, values in self.latencies.items():
+            values = list(values)
+            routes[route] = {"count": len(values), "p50_ms": percentile(values, 50),
+                             "p99_ms": percentile(values, 99)}
+        return {"routes": routes, "screened_rows": self.screener.rows,
+                "memo_hits": self.screener.memo_hits, "query_cache": QUERY_CACHE.stats()}
+
+    async def metrics(self, body):
+        return TextResponse(metrics.render_prometheus())
+
+    async def search(self, body):
+        query = str(body.get("query") or "")
+        if normalize_sport(body.get("sport")) == AUTO_SPORT:
+            matches = await self.run_blocking(search_all_sports, query, self.screener.sheets, None,
+                                              body.get("discipline"))
+            return {"sport": matches[0][3] if matches else None, "query": query,
+                    "matches": [{"competition": m[0], "score": m[1], "genre": m[2], "sport": m[3]}
+                                for m in matches]}
+        sport, df = self._sheet(body)
+        matches = await self.run_blocking(search_sport, sport, query, df, body.get("discipline"))
+        return {"sport": sport, "query": query,
+                "matches": [{"competition": m[0], "score": m[1], "genre": m[2]} for m in matches]}
+
+    async def decide(self, body):
+        sport, df = self._sheet(body)
+        if not body.get("competition"):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "missing competition")
+        data = await self.run_blocking(decide_sport, sport, body["competition"], df,
+                                       body.get("genre"), body.get("discipline"))
+        lang = body.get("lang")
+        if lang:
+            if lang not in TEMPLATES:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"unknown lang: {lang!r}")
+            if data.get("allowed"):
+                data["text"] = render_decision(data, lang, body.get("discipline"))
+            else:
+                data["text"] = TEMPLATES[lang]["not_found"].format(source=df.attrs.get('source_ref', "ANJ List"))
+        return data
+
+    async def screen(self, body):
+        rows = body.get("rows")
+        if not isinstance(rows, list):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "rows must be a list")
+        return {"results": await self.run_blocking(self.screener.screen, rows)}
+
+    async def suggest(self, body):
+        query = str(body.get("query") or "")
+        sport = normalize_sport(body.get("sport"))
+        if sport is None:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"unknown sport: {body.get('sport')!r}")
+        k = body.get("k", DEFAULT_SUGGESTIONS)
+        if not isinstance(k, int) or not 0 < k <= MAX_SUGGESTIONS:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"k must be an integer between 1 and {MAX_SUGGESTIONS}")
+        suggestions = await self.run_blocking(suggest, query, self.screener.sheets, k,
+                                              None if sport == AUTO_SPORT else [sport])
+        return {"query": query, "suggestions": [{"competition": s.competition, "sport": s.sport,
+                                                 "genre": s.genre, "weight": s.weight} for s in suggestions]}
+
+    async def dispatch(self, method: str, path: str, raw_body: bytes):
+        route = path.split("?", 1)[0]
+        handler = self.routes.get((method, route))
+        if handler is None:
+            known = any(r == route for _, r in self.routes)
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED if known else HTTPStatus.NOT_FOUND, route)
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "invalid JSON body")
+        if not isinstance(body, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "JSON body must be an object")
+
+        start = time.perf_counter()
+        result = await handler(body)
+        self.latencies.setdefault(route, deque(maxlen=LATENCY_WINDOW)).append(
+            (time.perf_counter() - start) * 1000)
+        return result
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              and version.upper() == "HTTP/1.1")
+                try:
+                    length = int(headers.get("content-length") or 0)
+                    if length > MAX_BODY_BYTES:
+                        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "body too large")
+                    raw_body = await reader.readexactly(length) if length else b""
+                    status, payload = HTTPStatus.OK, await self.dispatch(method.upper(), path, raw_body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                    keep_alive = keep_alive and e.status != HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+                except Exception as e:
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": repr(e)}
+
+                if isinstance(payload, TextResponse):
+                    body, content_type = payload.text.encode("utf-8"), payload.content_type
+                else:
+                    body = json.dumps(_json_safe(payload), ensure_ascii=False, default=str).encode("utf-8")
+                    content_type = "application/json; charset=utf-8"
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080):
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+async def serve(screener: Screener, host: str, port: int, refresher: DatasetRefresher = None):
+    service = DecisionService(screener, refresher=refresher)
+    # Index et tables construits avant la première requête
+    await service.run_blocking(screener.warm)
+    if refresher is not None:
+        refresher.start()
+    server = await service.start(host, port)
+    print(f"Compliance decision service listening on http://{host}:{port}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--regulator", choices=list(REGULATORS), default=DEFAULT_REGULATOR,
+                        help="regulator whose list is loaded (engine/regulators.json)")
+    parser.add_argument("--url", help="workbook URL, file:// for a local copy (default: the regulator's)")
+    parser.add_argument("--workbook", help="local ANJ xlsx instead of the URL (offline)")
+    parser.add_argument("--refresh-interval", type=float, default=REFRESH_INTERVAL,
+                        help="seconds between background revalidations of the URL (0 = never)")
+    parser.add_argument("--no-metrics", action="store_true", help="disable the stage timings of /metrics")
+    args = parser.parse_args(argv)
+
+    if not args.no_metrics:
+        metrics.enable()
+
+    refresher = None
+    regulator = REGULATORS[args.regulator]
+    if args.workbook:
+        screener = Screener.from_file(args.workbook, regulator.layout)
+    else:
+        url = args.url or regulator.url
+        refresher = DatasetRefresher(url, interval=args.refresh_interval, warm=warm_sheets,
+                                     store=snapshot_store_for_url(url), layout=regulator.layout)
+        if not refresher.refresh():
+            raise SystemExit(f"Could not load the ANJ list: {refresher.last_error}")
+        screener = Screener(refresher.sheets)
+        refresher.on_swap = screener.use_sheets
+    try:
+        asyncio.run(serve(screener, args.host, args.port, refresher))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
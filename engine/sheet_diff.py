@@ -0,0 +1,181 @@
+"""
+Keyed diff between two versions of the ANJ sheets.
+
+A competition row is identified by (Nom commun, Pays, Discipline, Genre). Rows are compared
+competition by competition: a competition whose rows are identical and in the same order is
+unchanged, otherwise its rows are paired on the full key, then on the key without Genre (a
+gender change), and what is left is added / removed.
+
+    python -m engine.sheet_diff old.xlsx new.xlsx [--out changes.json]
+"""
+import argparse
+import hashlib
+import json
+import sys
+import time
+
+import pandas as pd
+
+from engine.columns import COMPETITION_COL, COUNTRY_COL, DISCIPLINE_COL, GENRE_COL
+
+KEY_COLS = [COMPETITION_COL, COUNTRY_COL, DISCIPLINE_COL, GENRE_COL]
+
+
+def sheet_hash(df: pd.DataFrame) -> str:
+    """Content fingerprint of one cleaned sheet (columns and values, not the index)."""
+    digest = hashlib.sha256("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _cell(value):
+    # NaN (lecture Excel) et None (relecture Parquet) sont la même cellule vide
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return value
+
+
+def _row_signatures(df: pd.DataFrame) -> dict:
+    """Nom commun -> hashes of its rows, in file order."""
+    signatures = {}
+    hashes = pd.util.hash_pandas_object(df, index=False).tolist()
+    for name, row_hash in zip(df[COMPETITION_COL].tolist(), hashes):
+        signatures.setdefault(name, []).append(row_hash)
+    return signatures
+
+
+def _candidate_competitions(old: pd.DataFrame, new: pd.DataFrame) -> set | None:
+    """Competitions whose rows may differ (None = compare everything)."""
+    if list(old.columns) != list(new.columns) or COMPETITION_COL not in old.columns:
+        return None
+    old_sigs, new_sigs = _row_signatures(old), _row_signatures(new)
+    return {name for name in old_sigs.keys() | new_sigs.keys() if old_sigs.get(name) != new_sigs.get(name)}
+
+
+def _rows_by_competition(df: pd.DataFrame, names: set = None) -> dict:
+    """Nom commun -> [row dict], in file order (only the given competitions if names is set)."""
+    groups = {}
+    columns = list(df.columns)
+    if names is not None:
+        df = df[df[COMPETITION_COL].isin(names)]
+    for values in df.itertuples(index=False, name=None):
+        row = {col: _cell(v) for col, v in zip(columns, values)}
+        groups.setdefault(row.get(COMPETITION_COL), []).append(row)
+    return groups
+
+
+def _key(row: dict, with_genre: bool = True) -> tuple:
+    cols = KEY_COLS if with_genre else KEY_COLS[:-1]
+    return tuple(row.get(col) for col in cols)
+
+
+def _identity(row: dict) -> dict:
+    return {col: row[col] for col in KEY_COLS if col in row}
+
+
+def _changes(old: dict, new: dict) -> dict:
+    """Field-level changes between two paired rows (key columns other than Genre excluded)."""
+    fields = [c for c in dict.fromkeys(list(old) + list(new)) if c not in KEY_COLS[:-1]]
+    return {col: {"old": old.get(col), "new": new.get(col)} for col in fields if old.get(col) != new.get(col)}
+
+
+def _pair(old_rows: list, new_rows: list, with_genre: bool):
+    """Pairs rows with the same key in order; returns (pairs, unpaired old, unpaired new)."""
+    pending = {}
+    for row in old_rows:
+        pending.setdefault(_key(row, with_genre), []).append(row)
+    pairs, added = [], []
+    for row in new_rows:
+        candidates = pending.get(_key(row, with_genre))
+        if candidates:
+            pairs.append((candidates.pop(0), row))
+        else:
+            added.append(row)
+    removed = [row for rows in pending.values() for row in rows]
+    return pairs, removed, added
+
+
+def diff_sheet(old: pd.DataFrame, new: pd.DataFrame) -> dict:
+    """Added / removed / modified rows of one sheet and the competitions they touch."""
+    # Pré-filtre vectorisé : seules les compétitions dont l'empreinte des lignes change sont comparées
+    candidates = _candidate_competitions(old, new)
+    old_groups, new_groups = _rows_by_competition(old, candidates), _rows_by_competition(new, candidates)
+    added, removed, modified, competitions = [], [], [], []
+    for name in dict.fromkeys(list(old_groups) + list(new_groups)):
+        old_rows, new_rows = old_groups.get(name, []), new_groups.get(name, [])
+        if old_rows == new_rows:
+            continue
+        # Touchée même si seul l'ordre de ses lignes change : la première ligne est celle servie
+        competitions.append(name)
+        pairs, gone, new_only = _pair(old_rows, new_rows, with_genre=True)
+        genre_pairs, gone, new_only = _pair(gone, new_only, with_genre=False)
+        for before, after in pairs + genre_pairs:
+            changes = _changes(before, after)
+            if changes:
+                modified.append({**_identity(before), "changes": changes})
+        removed.extend(gone)
+        added.extend(new_only)
+    return {
+        "rows_before": len(old),
+        "rows_after": len(new),
+        "added": added,
+        "removed": removed,
+        "modified": modified,
+        "competitions": competitions,
+    }
+
+
+def diff_workbook(old_sheets: dict, new_sheets: dict) -> dict:
+    """Per-sheet diffs; sheets with the same content hash are skipped without a row comparison."""
+    sheets = {}
+    for sheet in dict.fromkeys(list(old_sheets) + list(new_sheets)):
+        old, new = old_sheets.get(sheet), new_sheets.get(sheet)
+        if old is not None and new is not None:
+            old_hash = old.attrs.get("content_hash") or sheet_hash(old)
+            new_hash = new.attrs.get("content_hash") or sheet_hash(new)
+            if old_hash == new_hash:
+                continue
+        diff = diff_sheet(old if old is not None else pd.DataFrame(), new if new is not None else pd.DataFrame())
+        if old is None or new is None:
+            diff["sheet_added" if old is None else "sheet_removed"] = True
+        elif not diff["competitions"]:
+            # Empreintes calculées différemment (ancien snapshot) mais mêmes lignes
+            continue
+        sheets[sheet] = diff
+    return {"generated_at": time.time(), "sheets": sheets}
+
+
+def summary(changes: dict) -> str:
+    """One-line description of a diff_workbook result, for the logs."""
+    parts = [f"{sheet}: +{len(d['added'])} -{len(d['removed'])} ~{len(d['modified'])}"
+             for sheet, d in changes["sheets"].items()]
+    return ", ".join(parts) or "no change"
+
+
+def main(argv=None):
+    from engine.anj_loader import read_workbook
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("old", help="previous ANJ xlsx")
+    parser.add_argument("new", help="new ANJ xlsx")
+    parser.add_argument("--out", help="write the change log to this file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    sheets = []
+    for path in (args.old, args.new):
+        with open(path, "rb") as f:
+            sheets.append(read_workbook(f.read()))
+    changes = diff_workbook(*sheets)
+    print(summary(changes), file=sys.stderr)
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        json.dump(changes, out, ensure_ascii=False, indent=2, default=str)
+        out.write("\n")
+    finally:
+        if args.out:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
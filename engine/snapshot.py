@@ -0,0 +1,110 @@
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from engine.metrics import timed_call
+
+# Dossier du snapshot local (surchargé par ANJ_SNAPSHOT_DIR)
+DEFAULT_SNAPSHOT_DIR = Path(__file__).resolve().parent.parent / ".anj_snapshot"
+META_FILE = "meta.json"
+# Journal des différences entre versions successives de la liste (une ligne JSON par refresh)
+CHANGE_LOG_FILE = "changes.jsonl"
+
+
+class SnapshotStore:
+    """
+    On-disk copy of the cleaned ANJ sheets.
+
+    Each sheet is stored as Parquet (pickle when a column cannot be converted to Arrow)
+    and meta.json records the source_ref, the content hash, the HTTP validators
+    (ETag / Last-Modified) and the fetch time. meta.json is written last, so a crash
+    during a save leaves the previous snapshot readable. changes.jsonl keeps the diff
+    of every refresh that changed the list.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = Path(directory or os.environ.get("ANJ_SNAPSHOT_DIR") or DEFAULT_SNAPSHOT_DIR)
+
+    @property
+    def meta_path(self) -> Path:
+        return self.directory / META_FILE
+
+    def load_meta(self) -> dict | None:
+        try:
+            with open(self.meta_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def age(self, meta: dict = None) -> float | None:
+        """Seconds since the snapshot was last fetched or revalidated."""
+        meta = meta if meta is not None else self.load_meta()
+        if not meta or "fetched_at" not in meta:
+            return None
+        return time.time() - meta["fetched_at"]
+
+    @timed_call("snapshot_load")
+    def load_sheets(self, meta: dict = None) -> dict:
+        meta = meta if meta is not None else self.load_meta()
+        if not meta:
+            raise FileNotFoundError(f"No ANJ snapshot in {self.directory}")
+
+        sheets = {}
+        for sport_name, entry in meta["sheets"].items():
+            path = self.directory / entry["file"]
+            if entry["format"] == "parquet":
+                df = pd.read_parquet(path)
+            else:
+                df = pd.read_pickle(path)
+            df.attrs = {
+                'source_url': meta.get("source_url"),
+                'source_ref': meta.get("source_ref"),
+                'sport_name': sport_name,
+                # Empreinte de la feuille (snapshots récents) ou du classeur
+                'content_hash': entry.get("content_hash") or meta.get("content_hash"),
+                'fetched_at': meta.get("fetched_at"),
+            }
+            sheets[sport_name] = df
+        return sheets
+
+    def save(self, sheets: dict, meta: dict) -> dict:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        prefix = (meta.get("content_hash") or "sheet")[:12]
+
+        entries = {}
+        for i, (sport_name, df) in enumerate(sheets.items()):
+            stem = f"{prefix}_{i:02d}"
+            try:
+                df.to_parquet(self.directory / f"{stem}.parquet", index=False)
+                entries[sport_name] = {"file": f"{stem}.parquet", "format": "parquet"}
+            except Exception:
+                # Colonnes à types mixtes ou noms dupliqués : Arrow refuse, on garde pandas
+                df.to_pickle(self.directory / f"{stem}.pkl")
+                entries[sport_name] = {"file": f"{stem}.pkl", "format": "pickle"}
+            if df.attrs.get('content_hash'):
+                entries[sport_name]["content_hash"] = df.attrs['content_hash']
+
+        meta = dict(meta, sheets=entries)
+        self.write_meta(meta)
+
+        # Purge des fichiers des snapshots précédents
+        keep = {e["file"] for e in entries.values()} | {META_FILE}
+        for path in self.directory.iterdir():
+            if path.is_file() and path.name not in keep and path.suffix in (".parquet", ".pkl"):
+                path.unlink(missing_ok=True)
+        return meta
+
+    def append_change_log(self, changes: dict):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / CHANGE_LOG_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(changes, ensure_ascii=False, default=str) + "\n")
+
+    def write_meta(self, meta: dict):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp_path, self.meta_path)
@@ -1,23 +1,30 @@
 import pandas as pd
-from engine.matcher import get_matches_multiples
+from engine.aliases import SPORT_ALIASES, get_exact_index
+from engine.matcher import get_matches_multiples, get_competition_index
 from engine.anj_loader import decide_fr_sport
+from engine.metrics import timed_call
+from engine.query_cache import cached_query
 
+# Score minimum d'un candidat (voir benchmarks/relevance.py pour le réglage)
+SNOOKER_THRESHOLD = 65
+
+@timed_call("search", "Snooker")
+@cached_query(normalize_text=True)
 def handle_snooker_search(user_prompt, df_anj):
     """Recherche Snooker en utilisant le Matcher global avec un pré-nettoyage"""
-    query = user_prompt.lower().strip()
+    query = SPORT_ALIASES["Snooker"].rewrites.rewrite(user_prompt.lower().strip())
 
-    # On garde ton mapping malin pour aider le matcher
-    mapping = {
-        "world snooker tour": "wst",
-        "world championship": "championnat du monde",
-        "masters": "masters"
-    }
-    for eng, fr in mapping.items():
-        query = query.replace(eng, fr)
+    # Nom exact ou surnom connu (WST...) : réponse directe, sans score flou
+    exact = get_exact_index(df_anj, "Snooker")
+    rows = exact.rows(user_prompt, query)
+    if rows is not None:
+        return exact.matches(rows, 100.0)
 
     # On appelle ton matcher global (threshold à 65 comme demandé)
-    return get_matches_multiples(query, df_anj, threshold=65)
+    return get_matches_multiples(query, get_competition_index(df_anj), threshold=SNOOKER_THRESHOLD)
 
+@timed_call("decide", "Snooker")
+@cached_query(normalize_text=False)
 def decide_snooker(comp_name: str, df: pd.DataFrame):
     """
     Logique de décision pour le Snooker.
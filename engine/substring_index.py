@@ -0,0 +1,146 @@
+"""
+Substring search over the cleaned competition names of a sheet, in both directions:
+names contained in the query (Aho-Corasick automaton) and names containing the query
+(scan of all the names joined in one string).
+"""
+import bisect
+import threading
+from collections import deque
+
+import numpy as np
+
+# Séparateur absent des noms nettoyés : une occurrence ne peut pas chevaucher deux noms
+SEPARATOR = "\x00"
+
+
+class AhoCorasick:
+    """Multi-pattern automaton: every pattern occurring in a text, in one walk of the text."""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for pattern_id, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append(pattern_id)
+
+        # Liens d'échec en largeur ; chaque état hérite des sorties de son lien d'échec
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def find_in(self, text: str) -> set:
+        """Ids of the patterns occurring in text (the empty pattern always occurs)."""
+        found = set(self.output[0])
+        state = 0
+        goto, fail, output = self.goto, self.fail, self.output
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+class SubstringIndex:
+    """
+    Distinct cleaned names of a sheet and the rows behind each of them.
+    Lookups return the sorted positions of the matching rows.
+    """
+
+    def __init__(self, clean_names):
+        ids, self.names = {}, []
+        row_ids = []
+        for name in clean_names:
+            name_id = ids.get(name)
+            if name_id is None:
+                name_id = ids[name] = len(self.names)
+                self.names.append(name)
+            row_ids.append(name_id)
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        order = np.argsort(row_ids, kind="stable")
+        bounds = np.searchsorted(row_ids[order], np.arange(len(self.names) + 1))
+        self.rows = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.names))]
+
+        self.automaton = AhoCorasick(self.names)
+        self.joined = SEPARATOR.join(self.names)
+        # Début de chaque nom dans la chaîne jointe
+        self.starts = []
+        offset = 0
+        for name in self.names:
+            self.starts.append(offset)
+            offset += len(name) + len(SEPARATOR)
+
+    def _rows(self, name_ids) -> np.ndarray:
+        if not name_ids:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate([self.rows[i] for i in name_ids]))
+
+    def names_in(self, query: str) -> set:
+        """Ids of the names contained in the query."""
+        return self.automaton.find_in(query)
+
+    def names_containing(self, query: str) -> set:
+        """Ids of the names containing the query."""
+        if not query:
+            return set(range(len(self.names)))
+        found = set()
+        joined, starts = self.joined, self.starts
+        pos = joined.find(query)
+        while pos != -1:
+            name_id = bisect.bisect_right(starts, pos) - 1
+            found.add(name_id)
+            # Nom suivant : une seule occurrence suffit par nom
+            pos = joined.find(query, starts[name_id + 1] if name_id + 1 < len(starts) else len(joined))
+        return found
+
+    def rows_containing(self, query: str) -> np.ndarray:
+        return self._rows(self.names_containing(query))
+
+    def rows_either_way(self, query: str) -> np.ndarray:
+        """Rows whose name contains the query or is contained in it."""
+        return self._rows(self.names_containing(query) | self.names_in(query))
+
+
+# Un index par (feuille, contenu, règle de nettoyage)
+_SUBSTRING_CACHE = {}
+_SUBSTRING_CACHE_SIZE = 16
+_SUBSTRING_LOCK = threading.Lock()
+
+
+def get_sheet_index(df, name: str, build):
+    """build(df) computed once per sheet content and rule set `name` (e.g. the badminton arrays)."""
+    content_hash = df.attrs.get('content_hash')
+    if content_hash is None:
+        return build(df)
+
+    key = (df.attrs.get('sport_name'), content_hash, len(df), name)
+    index = _SUBSTRING_CACHE.get(key)
+    if index is None:
+        index = build(df)
+        # Sous verrou : le service appelle les handlers depuis plusieurs threads
+        with _SUBSTRING_LOCK:
+            if key in _SUBSTRING_CACHE:
+                return _SUBSTRING_CACHE[key]
+            if len(_SUBSTRING_CACHE) >= _SUBSTRING_CACHE_SIZE:
+                _SUBSTRING_CACHE.pop(next(iter(_SUBSTRING_CACHE)))
+            _SUBSTRING_CACHE[key] = index
+    return index
@@ -113,13 +113,34 @@ DEFAULT_TRANSLATIONS = {
 def get_emoji(country_name):
     return COUNTRY_EMOJIS.get(country_name, "🗺️")
 
+def translation_key(value) -> str:
+    """Lookup key of a phrase: spaces collapsed, case folded ("A partir des  quarts de finale " = "a partir des quarts de finale")."""
+    return " ".join(str(value).split()).casefold()
+
+# Index des traductions de phases sur la clé normalisée : les variantes d'espaces / de casse du fichier sont traduites
+PHASES_INDEX = {translation_key(phrase): translations for phrase, translations in PHASES_TRANSLATIONS.items()}
+
 def localize_value(value: str, lang: str, value_type: str) -> str:
     if value in DEFAULT_TRANSLATIONS:
         return DEFAULT_TRANSLATIONS[value].get(lang, value)
-    if value_type == 'phases' and value in PHASES_TRANSLATIONS:
-        return PHASES_TRANSLATIONS[value].get(lang, value)
+    if value_type == 'phases' and isinstance(value, str):
+        translations = PHASES_TRANSLATIONS.get(value) or PHASES_INDEX.get(translation_key(value))
+        if translations:
+            return translations.get(lang, value)
     return value
 
+GENRE_LABELS = {"Homme": "Men", "Femme": "Women", "Mixte": "Mixed", "N/A": "Open/Mixed"}
+
+def render_decision(data: dict, lang: str = "en", discipline: str = None) -> str:
+    """Texte de la réponse finale pour une décision "allowed" (data = retour d'un decide_*)"""
+    values = dict(data)
+    values['restrictions'] = localize_value(data['restrictions'], lang, 'restrictions')
+    values['phases'] = localize_value(data['phases'], lang, 'phases')
+    values['emoji'] = get_emoji(data.get('country', 'International'))
+    values['genre_en'] = GENRE_LABELS.get(data.get('genre'), "Open/Mixed")
+    values['discipline_en'] = discipline if discipline else "N/A"
+    return TEMPLATES[lang]["allowed"].format(**values)
+
 TEMPLATES = {
     "en": {
         "allowed": "\n **ANJ**\n---\n✅ **Status : Allowed**\n\n🏟️ **Sport :** {sport}\n\n{emoji} **Country :** {country}\n\n🏆 **Competition :** {competition}\n\n🏸 **Category :** {discipline_en} - {genre_en}\n\n---\n**Restrictions :** {restrictions}\n\n**Allowed phases :** {phases}\n\n📄 **Source :** {source}",
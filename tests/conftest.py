@@ -0,0 +1,14 @@
+import pytest
+
+from benchmarks.workbook import synthetic_workbook
+from engine.anj_loader import read_workbook
+
+
+@pytest.fixture(scope="session")
+def workbook() -> bytes:
+    return synthetic_workbook(300)
+
+
+@pytest.fixture
+def sheets(workbook) -> dict:
+    return read_workbook(workbook)
@@ -0,0 +1,68 @@
+import dataclasses
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.workbook import synthetic_sheet_frames, write_workbook
+from engine.columns import COMPETITION_COL, DISCIPLINE_COL
+from engine.regulators import DEFAULT_REGULATOR, REGULATORS
+
+APP = str(Path(__file__).resolve().parent.parent / "app.py")
+
+
+@pytest.fixture
+def frames() -> dict:
+    frames = synthetic_sheet_frames(300, seed=2)
+    # "Masters" au Football comme au Snooker : une recherche multi-sports à résultats mélangés
+    football = frames["Football"]
+    frames["Football"] = pd.concat([football, football.iloc[[0]].assign(**{COMPETITION_COL: "Masters"})],
+                                   ignore_index=True)
+    return frames
+
+
+@pytest.fixture
+def chatbot(frames, tmp_path, monkeypatch) -> AppTest:
+    path = tmp_path / "list.xlsx"
+    write_workbook(frames, path)
+    monkeypatch.setenv("ANJ_SNAPSHOT_DIR", str(tmp_path / "snapshot"))
+    monkeypatch.setitem(REGULATORS, DEFAULT_REGULATOR,
+                        dataclasses.replace(REGULATORS[DEFAULT_REGULATOR], url=path.as_uri()))
+    at = AppTest.from_file(APP, default_timeout=60).run()
+    at.sidebar.radio[0].set_value("💬 Compliance ChatBot").run()
+    assert not at.exception
+    return at
+
+
+def _options(at: AppTest, question: str) -> list:
+    """(competition, sport) of the option buttons shown for a question in auto mode."""
+    at.chat_input[0].set_value(question).run()
+    assert not at.exception
+    options = []
+    for button in at.button:
+        if " · " in button.label and button.key.startswith("btn_"):
+            label, sport = button.label.rsplit(" · ", 1)
+            options.append((label.rsplit(" (", 1)[0], sport))
+    return options
+
+
+def test_mixed_results_are_offered_per_sport(chatbot):
+    # Snooker en tête (sport cité), le Football dans la fenêtre
+    sports = {sport for _, sport in _options(chatbot, "masters snooker")}
+    assert sports == {"Football", "Snooker"}
+
+
+def test_snooker_only_results_get_the_snooker_rules(chatbot):
+    assert _options(chatbot, "grand prix") == []
+    assert "World Snooker Tour" in chatbot.chat_message[-1].markdown[0].value
+
+
+def test_auto_badminton_results_follow_the_discipline(chatbot, frames):
+    badminton = frames["Badminton"]
+    doubles_only = set(badminton.loc[badminton[DISCIPLINE_COL] == "Double", COMPETITION_COL])
+    radio = next(r for r in chatbot.radio if r.label == "Badminton discipline:")
+    radio.set_value("Singles").run()
+
+    names = {name for name, sport in _options(chatbot, "super 750") if sport == "Badminton"}
+    assert names and not names & doubles_only
@@ -0,0 +1,26 @@
+import inspect
+
+import pandas as pd
+
+from engine.badminton_handler import handle_badminton_search
+from engine.columns import COMPETITION_COL, DISCIPLINE_COL
+
+search = inspect.unwrap(handle_badminton_search)
+
+
+def _with_rows(df: pd.DataFrame, rows: list) -> pd.DataFrame:
+    extra = pd.DataFrame([dict(df.iloc[0], **row) for row in rows])
+    out = pd.concat([df, extra], ignore_index=True)
+    out.attrs = dict(df.attrs, content_hash=None)
+    return out
+
+
+def test_exact_hit_outside_the_discipline_falls_back_to_substrings(sheets):
+    df = _with_rows(sheets["Badminton"], [
+        {COMPETITION_COL: "Berdel Masters", DISCIPLINE_COL: "Simple"},
+        {COMPETITION_COL: "Peberdel Masters Espoirs", DISCIPLINE_COL: "Double"},
+    ])
+    singles = search("peberdel masters espoirs", df, "Singles")
+    assert [name for name, _, _ in singles] == ["Berdel Masters"]
+    doubles = search("peberdel masters espoirs", df, "Doubles")
+    assert [name for name, _, _ in doubles] == ["Peberdel Masters Espoirs"]
@@ -0,0 +1,77 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from engine import cross_sport, decision_table, matcher, substring_index
+from engine.autocomplete import PICK_WEIGHT, AutocompleteIndex
+
+STORES = [
+    (matcher._store_index, matcher._INDEX_CACHE, matcher._INDEX_CACHE_SIZE),
+    (decision_table._store_table, decision_table._TABLE_CACHE, decision_table._TABLE_CACHE_SIZE),
+    (cross_sport._store_index, cross_sport._CROSS_INDEX_CACHE, cross_sport._CROSS_INDEX_CACHE_SIZE),
+    (lambda key, value: substring_index.get_sheet_index(_Sheet(key), "test", lambda df: value),
+     substring_index._SUBSTRING_CACHE, substring_index._SUBSTRING_CACHE_SIZE),
+]
+
+
+class _Sheet:
+    def __init__(self, key):
+        self.attrs = {"sport_name": "Test", "content_hash": str(key)}
+
+    def __len__(self):
+        return 1
+
+
+@pytest.fixture
+def fast_switching():
+    # Bascule de thread très fréquente : la course éviction / insertion devient reproductible
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+@pytest.mark.parametrize("store, cache, size", STORES)
+def test_concurrent_inserts_keep_the_cache_bounded(store, cache, size, fast_switching):
+    saved = dict(cache)
+    try:
+        with ThreadPoolExecutor(8) as pool:
+            for future in [pool.submit(lambda i: [store(("test", i, j), object()) for j in range(200)], i)
+                           for i in range(8)]:
+                future.result()
+        assert len(cache) <= size
+    finally:
+        cache.clear()
+        cache.update(saved)
+
+
+def test_concurrent_builds_share_one_index():
+    saved = dict(matcher._INDEX_CACHE)
+    try:
+        first, second = object(), object()
+        assert matcher._store_index(("test", "same"), first) is first
+        assert matcher._store_index(("test", "same"), second) is first
+    finally:
+        matcher._INDEX_CACHE.clear()
+        matcher._INDEX_CACHE.update(saved)
+
+
+def test_concurrent_picks_keep_a_whole_ranking(sheets, fast_switching):
+    index = AutocompleteIndex.from_cross_sport(cross_sport.CrossSportIndex.from_sheets(sheets))
+    picked = index.suggest("ligue", k=1)[0]
+    expected = np.arange(1, len(index) + 1)
+
+    def pick():
+        for _ in range(500):
+            index.record_pick(picked)
+
+    def read():
+        # Une suggestion lue pendant un choix voit l'ancien rang ou le nouveau, jamais un mélange
+        return all(np.array_equal(np.sort(index._rank), expected) for _ in range(500))
+
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(pick) for _ in range(4)] + [pool.submit(read) for _ in range(4)]
+        assert all(future.result() is not False for future in futures)
+    assert index.suggest("ligue", k=1)[0].weight == picked.weight + 4 * 500 * PICK_WEIGHT
@@ -0,0 +1,23 @@
+from engine import football_handler, snooker_handler
+from engine.aliases import CROSS_SPORT, SPORT_ALIASES
+from engine.cross_sport import prepare_query, search_all_sports
+
+
+def test_auto_search_uses_the_handler_thresholds(sheets, monkeypatch):
+    found = search_all_sports("coupe de frnce", sheets, sports=["Football"])
+    assert found and all(score < 100 for _, score, _, _ in found)
+
+    # Un réglage balayé par benchmarks/relevance.py s'applique aussi à la recherche multi-sports
+    monkeypatch.setattr(football_handler, "FOOTBALL_THRESHOLD", max(score for _, score, _, _ in found) + 1)
+    assert search_all_sports("coupe de frnce", sheets, sports=["Football"]) == []
+    monkeypatch.setattr(snooker_handler, "SNOOKER_THRESHOLD", 101)
+    assert search_all_sports("uk championshp", sheets, sports=["Snooker"]) == []
+
+
+def test_auto_rewrites_come_from_the_sport_tables():
+    for sport, aliases in SPORT_ALIASES.items():
+        for phrase, text in aliases.rewrites.rewrites.items():
+            if phrase not in SPORT_ALIASES[CROSS_SPORT].rewrites.rewrites:
+                assert prepare_query(phrase) == text, sport
+    # "olympic" : "olympiques" au Badminton, "jeux olympiques" au Golf ; la table "auto" tranche
+    assert prepare_query("olympic badminton") == "jeux olympiques"
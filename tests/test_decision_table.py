@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+
+from engine.anj_loader import _resolve_fr_sport, decide_fr_sport
+from engine.columns import COMPETITION_COL, DISCIPLINE_COL, GENRE_COL
+from engine.decision_table import DecisionTable
+
+
+def _scanned(df: pd.DataFrame, comp_name: str, genre: str = None, discipline: str = None) -> dict:
+    """decide_fr_sport as it was: boolean masks over the whole sheet, first matching row."""
+    mask = df[COMPETITION_COL].str.lower() == comp_name.lower()
+    if genre and GENRE_COL in df.columns and genre != "N/A":
+        mask = mask & (df[GENRE_COL].str.lower() == genre.lower())
+    if discipline and DISCIPLINE_COL in df.columns:
+        search_discipline = "Simple" if discipline == "Singles" else "Double"
+        mask = mask & (df[DISCIPLINE_COL].str.lower() == search_discipline.lower())
+    if not mask.any():
+        return {"allowed": False, "competition": comp_name}
+    record = _resolve_fr_sport(df[mask].iloc[0].to_dict())
+    return {
+        "allowed": True,
+        "competition": comp_name,
+        "restrictions": record.restrictions,
+        "phases": record.phases,
+        "source": df.attrs.get('source_ref', "ANJ Source"),
+        "country": record.country,
+        "sport": df.attrs.get('sport_name'),
+        "genre": record.genre,
+        "discipline": discipline if discipline else "N/A"
+    }
+
+
+@pytest.mark.parametrize("sheet", ["Football", "Badminton", "Golf", "Billard"])
+def test_lookups_match_the_row_scan(sheets, sheet):
+    df = sheets[sheet]
+    table = DecisionTable.from_frame(df, _resolve_fr_sport, casefold=True)
+    # Noms en double (un par genre) d'abord : les jokers doivent rendre la première ligne du fichier
+    duplicated = df[COMPETITION_COL].duplicated(keep=False)
+    names = list(dict.fromkeys(df.loc[duplicated, COMPETITION_COL].tolist() + df[COMPETITION_COL].tolist()))[:40]
+    queries = names + [names[0].upper(), "Pas une compétition"]
+    genres = [None, "N/A", "Homme", "femme", "Mixte"]
+    disciplines = [None, "Singles", "Doubles"]
+
+    for comp_name in queries:
+        for genre in genres:
+            for discipline in disciplines:
+                expected = _scanned(df, comp_name, genre, discipline)
+                assert decide_fr_sport(comp_name, df, genre, discipline) == expected
+                if genre not in (None, "N/A") or discipline is not None:
+                    continue
+                record = table.lookup(comp_name)
+                assert (record is not None) == expected["allowed"]
+                if record is not None:
+                    assert (record.restrictions, record.phases, record.genre) == \
+                           (expected["restrictions"], expected["phases"], expected["genre"])
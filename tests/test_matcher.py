@@ -0,0 +1,20 @@
+from benchmarks.synthetic import synthetic_competitions, synthetic_queries
+from engine.matcher import MAX_VARIATIONS, PRUNE_MIN_ROWS, CompetitionIndex, generate_variations, get_matches_multiples
+
+
+def test_pruned_search_returns_the_full_scan_matches():
+    df = synthetic_competitions(3000)
+    index = CompetitionIndex.from_frame(df)
+    assert len(index) >= PRUNE_MIN_ROWS
+    for query in synthetic_queries(df, 60, seed=3000):
+        assert get_matches_multiples(query, index, threshold=60) == \
+            get_matches_multiples(query, index, threshold=60, prune=False), query
+
+
+def test_variations_follow_the_concept_groups_order():
+    variations = generate_variations("Spanish Cup")
+    assert len(variations) == MAX_VARIATIONS
+    assert variations[:7] == ["spanish cup", "spanish coupe", "spanish coppa", "spanish copa",
+                              "spanish taça", "spanish taca", "spain cup"]
+    # 7^12 combinaisons : le produit n'est jamais construit
+    assert len(generate_variations("spanish " * 12)) == MAX_VARIATIONS
@@ -0,0 +1,108 @@
+import pytest
+
+from engine.football_handler import decide_football
+from engine.query_cache import QUERY_CACHE, carry_over, register
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    QUERY_CACHE.clear()
+    yield
+    QUERY_CACHE.clear()
+
+
+def _listed(df, url):
+    view = df.copy(deep=False)
+    view.attrs = dict(df.attrs, source_url=url)
+    return view
+
+
+def test_regulators_do_not_share_a_namespace(sheets):
+    first = _listed(sheets["Football"], "file:///first.xlsx")
+    second = _listed(sheets["Football"], "file:///second.xlsx")
+    second.attrs["content_hash"] = "another version"
+    name = first["Nom commun"].iloc[0]
+    before = QUERY_CACHE.stats()
+
+    for _ in range(5):
+        decide_football(name, first)
+        decide_football(name, second)
+
+    stats = QUERY_CACHE.stats()
+    assert stats["misses"] - before["misses"] == 2
+    assert stats["hits"] - before["hits"] == 8
+    assert stats["invalidations"] == before["invalidations"]
+    assert stats["namespaces"] == {"file:///first.xlsx / Football": 1, "file:///second.xlsx / Football": 1}
+
+
+def test_new_generation_drops_the_namespace(sheets):
+    df = _listed(sheets["Football"], "file:///list.xlsx")
+    name = df["Nom commun"].iloc[0]
+    decide_football(name, df)
+    refreshed = _listed(df, "file:///list.xlsx")
+    refreshed.attrs["content_hash"] = "next version"
+    before = QUERY_CACHE.stats()
+
+    decide_football(name, refreshed)
+
+    stats = QUERY_CACHE.stats()
+    assert stats["hits"] == before["hits"]
+    assert stats["invalidations"] - before["invalidations"] == 1
+
+
+def _refreshed(df):
+    refreshed = _listed(df, df.attrs["source_url"])
+    refreshed.attrs["content_hash"] = "next version"
+    return refreshed
+
+
+def test_requests_on_the_served_frames_keep_the_carried_entries(sheets):
+    df = _listed(sheets["Football"], "file:///list.xlsx")
+    name = df["Nom commun"].iloc[0]
+    decide_football(name, df)
+    refreshed = _refreshed(df)
+    carry_over(df, refreshed, competitions=[])
+
+    # Refresh en cours de préchauffage : les requêtes lisent encore les anciens DataFrames
+    before = QUERY_CACHE.stats()
+    decide_football(name, df)
+    decide_football(name, refreshed)
+
+    stats = QUERY_CACHE.stats()
+    assert stats["invalidations"] == before["invalidations"]
+    assert stats["hits"] - before["hits"] == 1
+    assert stats["namespaces"] == {"file:///list.xlsx / Football": 1}
+
+
+def test_warming_does_not_bounce_between_generations(sheets):
+    df = _listed(sheets["Football"], "file:///list.xlsx")
+    names = df["Nom commun"].iloc[:2].tolist()
+    decide_football(names[0], df)
+    refreshed = _refreshed(df)
+    before = QUERY_CACHE.stats()
+
+    decide_football(names[1], refreshed)
+    for name in names:
+        decide_football(name, df)
+    decide_football(names[1], refreshed)
+
+    stats = QUERY_CACHE.stats()
+    assert stats["invalidations"] - before["invalidations"] == 1
+    assert stats["hits"] - before["hits"] == 1
+
+
+def test_served_generation_is_cached_again_after_a_failed_swap(sheets):
+    df = _listed(sheets["Football"], "file:///list.xlsx")
+    name = df["Nom commun"].iloc[0]
+    decide_football(name, df)
+    carry_over(df, _refreshed(df), competitions=[])
+
+    # Préchauffage raté : les anciens DataFrames restent servis
+    register({"Football": df})
+    before = QUERY_CACHE.stats()
+    for _ in range(3):
+        decide_football(name, df)
+
+    stats = QUERY_CACHE.stats()
+    assert stats["misses"] - before["misses"] == 1
+    assert stats["hits"] - before["hits"] == 2
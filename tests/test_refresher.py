@@ -0,0 +1,46 @@
+from engine.football_handler import decide_football
+from engine.query_cache import QUERY_CACHE, carry_over
+from engine.refresher import DatasetRefresher
+
+
+def test_served_sheets_are_read_only_views(sheets):
+    refresher = DatasetRefresher("file:///list.xlsx", load=lambda url, initial, **kwargs: sheets)
+    assert refresher.refresh()
+    shared = refresher.current()["Football"]
+    before = shared.iloc[0].tolist()
+
+    # Ce que load_anj_data() rend à une session
+    view = refresher.current()["Football"].copy(deep=False)
+    view.iloc[0, 0] = "written by a session"
+    view.loc[view.index[0], "Nom commun"] = "written by a session"
+
+    assert shared.iloc[0].tolist() == before
+
+
+def test_failed_warm_up_keeps_the_served_sheets_cached(sheets):
+    old = {"Football": sheets["Football"].copy(deep=False)}
+    new = {"Football": old["Football"].copy(deep=False)}
+    new["Football"].attrs = dict(old["Football"].attrs, content_hash="next version")
+    name = old["Football"]["Nom commun"].iloc[0]
+
+    def load(url, initial, **kwargs):
+        if initial:
+            return old
+        carry_over(old["Football"], new["Football"], competitions=[])
+        return new
+
+    def warm(sheets):
+        raise RuntimeError("warm-up failed")
+
+    QUERY_CACHE.clear()
+    refresher = DatasetRefresher("file:///list.xlsx", load=load)
+    assert refresher.refresh()
+    decide_football(name, refresher.current()["Football"])
+    refresher.warm = warm
+    assert not refresher.refresh()
+
+    before = QUERY_CACHE.stats()
+    decide_football(name, refresher.current()["Football"])
+    decide_football(name, refresher.current()["Football"])
+    assert QUERY_CACHE.stats()["hits"] - before["hits"] == 1
+    QUERY_CACHE.clear()
@@ -0,0 +1,68 @@
+import time
+
+import pandas as pd
+import pytest
+
+from engine.anj_loader import (ANJ_URL, content_hash, http_session, read_workbook, refresh_workbook,
+                               snapshot_store, snapshot_store_for_url)
+from engine.columns import COMPETITION_COL, COUNTRY_COL, GENRE_COL
+from engine.regulators import SheetLayout
+from engine.screen import Screener
+
+OTHER_LAYOUT = SheetLayout(sheets={"Soccer": "Football"},
+                           columns={"Competition": COMPETITION_COL, "Country": COUNTRY_COL, "Gender": GENRE_COL},
+                           default_header_row=0, source_ref="Other list")
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "snapshot"
+    monkeypatch.setenv("ANJ_SNAPSHOT_DIR", str(directory))
+    return directory
+
+
+@pytest.fixture
+def other_url(tmp_path, sheets) -> str:
+    path = tmp_path / "other.xlsx"
+    renamed = {COMPETITION_COL: "Competition", COUNTRY_COL: "Country", GENRE_COL: "Gender"}
+    with pd.ExcelWriter(path) as writer:
+        sheets["Football"].rename(columns=renamed).to_excel(writer, sheet_name="Soccer", index=False)
+        pd.DataFrame({"Notes": ["legend"]}).to_excel(writer, sheet_name="Readme", index=False)
+    return path.as_uri()
+
+
+def test_layout_maps_to_engine_schema(other_url, sheets):
+    loaded = read_workbook(http_session().get(other_url).content, OTHER_LAYOUT)
+    assert list(loaded) == ["Football"]
+    football = loaded["Football"]
+    assert football.attrs["source_ref"] == "Other list"
+    assert {COMPETITION_COL, COUNTRY_COL, GENRE_COL} <= set(football.columns)
+    assert football[COMPETITION_COL].tolist() == sheets["Football"][COMPETITION_COL].tolist()
+
+
+def test_file_urls_answer_not_modified(other_url):
+    first = http_session().get(other_url)
+    assert first.status_code == 200
+    again = http_session().get(other_url, headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert again.status_code == 304
+    assert http_session().get(other_url + ".missing").status_code == 404
+
+
+def test_unregistered_url_keeps_the_anj_snapshot(snapshot_dir, other_url, workbook, sheets):
+    anj_store = snapshot_store()
+    anj_store.save(sheets, {"source_url": ANJ_URL, "content_hash": content_hash(workbook), "fetched_at": time.time()})
+    anj_meta = anj_store.load_meta()
+
+    loaded = refresh_workbook(other_url, layout=OTHER_LAYOUT)
+
+    assert list(loaded) == ["Football"]
+    assert anj_store.load_meta() == anj_meta
+    other_store = snapshot_store_for_url(other_url)
+    assert other_store.directory != anj_store.directory
+    assert other_store.load_meta()["source_url"] == other_url
+
+
+def test_screener_from_url_uses_the_given_layout(snapshot_dir, other_url):
+    screener = Screener.from_url(other_url, store=snapshot_store_for_url(other_url), layout=OTHER_LAYOUT)
+    result = screener.screen_row("Football", "ligue 1", None, None)
+    assert result["source_ref"] == "Other list"
@@ -0,0 +1,44 @@
+import multiprocessing
+
+import pytest
+
+from engine import metrics
+from engine.query_cache import QUERY_CACHE
+from engine.screen import IN_FLIGHT_CHUNKS_PER_WORKER, Screener, warm_sheets
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_screen_parallel_reads_input_lazily(sheets):
+    workers, chunk_size, total = 2, 5, 2_000
+    read = 0
+
+    def rows():
+        nonlocal read
+        for i in range(total):
+            read += 1
+            yield ("Football", f"ligue {i % 7}", None, None)
+
+    results = Screener(sheets).screen_parallel(rows(), workers=workers, chunk_size=chunk_size)
+    next(results)
+    # Une fenêtre de chunks en cours (plus celui en lecture), pas tout le générateur
+    assert read <= (IN_FLIGHT_CHUNKS_PER_WORKER * workers + 1) * chunk_size
+    assert 1 + sum(1 for _ in results) == total
+
+
+def test_screen_parallel_keeps_input_order(sheets):
+    rows = [("Football", name, None, None) for name in ("ligue 1", "coupe de france", "premier league")] * 7
+    screener = Screener(sheets)
+    expected = [r["competition"] for r in screener.screen(rows)]
+    parallel = Screener(sheets).screen_parallel(rows, workers=2, chunk_size=2)
+    assert [r["competition"] for r in parallel] == expected
+
+
+def test_warm_sheets_leaves_the_query_cache_and_metrics_alone(sheets, monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    metrics.REGISTRY.clear()
+    before = QUERY_CACHE.stats()
+    warm_sheets(sheets)
+    after = QUERY_CACHE.stats()
+    assert {k: after[k] for k in ("size", "hits", "misses")} == {k: before[k] for k in ("size", "hits", "misses")}
+    assert not {row["stage"] for row in metrics.REGISTRY.snapshot()} & {"search", "decide"}
+    metrics.REGISTRY.clear()
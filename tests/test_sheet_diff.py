@@ -0,0 +1,131 @@
+import inspect
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.workbook import synthetic_sheet_frames, write_workbook
+from engine.anj_loader import refresh_workbook
+from engine.badminton_handler import handle_badminton_search
+from engine.columns import COMPETITION_COL, DISCIPLINE_COL, GENRE_COL, RESTRICTION_COL
+from engine.decision_table import DecisionTable, get_decision_table
+from engine.football_handler import _resolve_football, decide_football
+from engine.golf_handler import handle_golf_search
+from engine.matcher import CompetitionIndex, get_competition_index
+from engine.query_cache import QUERY_CACHE, generation, namespace
+from engine.sheet_diff import diff_workbook
+from engine.snapshot import SnapshotStore
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    QUERY_CACHE.clear()
+    yield
+    QUERY_CACHE.clear()
+
+
+def _edited(football: pd.DataFrame) -> tuple:
+    """Football sheet with one row modified, one gender changed, one removed and one added."""
+    df = football.copy()
+    df.loc[5, RESTRICTION_COL] = "Hors phases finales"
+    df.loc[20, GENRE_COL] = "Femme" if df.loc[20, GENRE_COL] == "Homme" else "Homme"
+    added = df.iloc[[0]].assign(**{COMPETITION_COL: "Zzz Nouvelle Coupe"})
+    df = pd.concat([df.iloc[:100], added, df.iloc[100:]]).drop(index=30).reset_index(drop=True)
+    changed = {football.loc[i, COMPETITION_COL] for i in (5, 20, 30)} | {"Zzz Nouvelle Coupe"}
+    return df, changed
+
+
+def _load(frames: dict, path, store: SnapshotStore, mtime: float) -> dict:
+    write_workbook(frames, path)
+    os.utime(path, (mtime, mtime))
+    return refresh_workbook(path.as_uri(), store=store, max_age=0, offline=False)
+
+
+def test_refresh_carries_over_what_a_rebuild_computes(tmp_path):
+    frames = synthetic_sheet_frames(300, seed=1)
+    football, changed = _edited(frames["Football"])
+    path, store = tmp_path / "list.xlsx", SnapshotStore(tmp_path / "snapshot")
+
+    old = _load(frames, path, store, 1_000_000)["Football"]
+    index = get_competition_index(old)
+    index.token_index
+    old_table = get_decision_table(old, "football", _resolve_football, casefold=True)
+    decided = old[COMPETITION_COL].drop_duplicates().head(40).tolist() + sorted(changed)
+    for name in decided:
+        decide_football(name, old)
+
+    new = _load(dict(frames, Football=football), path, store, 2_000_000)["Football"]
+    diff = diff_workbook({"Football": old}, {"Football": new})["sheets"]["Football"]
+    assert (len(diff["added"]), len(diff["removed"]), len(diff["modified"])) == (1, 1, 2)
+    assert set(diff["competitions"]) == changed
+
+    carried, fresh = get_competition_index(new), CompetitionIndex.from_frame(new)
+    assert "token_index" in carried.__dict__
+    assert carried.keys == fresh.keys and carried.targets == fresh.targets
+    assert carried.token_index.size == fresh.token_index.size
+    assert np.array_equal(carried.token_index.norms, fresh.token_index.norms)
+    assert carried.token_index.postings.keys() == fresh.token_index.postings.keys()
+    for term, rows in fresh.token_index.postings.items():
+        assert np.array_equal(carried.token_index.postings[term], rows)
+
+    table = get_decision_table(new, "football", _resolve_football, casefold=True)
+    assert table._records == DecisionTable.from_frame(new, _resolve_football, casefold=True)._records
+    kept = next(key for key in table._records if key[0] not in {c.lower() for c in changed})
+    assert table._records[kept] is old_table._records[kept]
+
+    # Décisions gardées : celles des compétitions hors du diff, identiques à un recalcul
+    survivors = [key for ns, key in QUERY_CACHE._entries if ns == namespace(new)]
+    assert {text for _, _, text, _ in survivors} == set(decided) - changed
+    decide = inspect.unwrap(decide_football)
+    for key in survivors:
+        _, value = QUERY_CACHE.get(namespace(new), key, generation(new))
+        assert value == decide(key[2], new, *key[3])
+
+
+def _rebuilt(df: pd.DataFrame) -> pd.DataFrame:
+    """Same sheet without a content hash: every index is built from scratch and nothing is cached."""
+    fresh = df.copy()
+    fresh.attrs = dict(df.attrs, content_hash=None)
+    return fresh
+
+
+def test_refreshed_substring_searches_match_a_rebuild(tmp_path):
+    frames = synthetic_sheet_frames(300, seed=1)
+    badminton, golf = frames["Badminton"].copy(), frames["Golf"].copy()
+    # Championnat du monde : Simple -> Double ; Jeux Olympiques restreints ; Jeux Européens retirés ;
+    # un Masters ajouté
+    badminton.loc[4, DISCIPLINE_COL] = "Double"
+    badminton.loc[3, RESTRICTION_COL] = "Hors phases finales"
+    added = badminton.iloc[[3]].assign(**{COMPETITION_COL: "Masters de Paris", DISCIPLINE_COL: "Simple"})
+    badminton = pd.concat([badminton, added]).drop(index=6).reset_index(drop=True)
+    # Solheim Cup : genre changé ; Ryder Cup restreinte ; Evian retiré ; un Open ajouté
+    golf.loc[1, GENRE_COL] = "Femme"
+    golf.loc[0, RESTRICTION_COL] = "Hors phases finales"
+    golf = pd.concat([golf, golf.iloc[[0]].assign(**{COMPETITION_COL: "Open de Paris"})]).drop(index=2)
+    golf = golf.reset_index(drop=True)
+    path, store = tmp_path / "list.xlsx", SnapshotStore(tmp_path / "snapshot")
+
+    searches = {
+        "Badminton": lambda query, df: [handle_badminton_search(query, df, discipline)
+                                        for discipline in ("Singles", "Doubles")],
+        "Golf": lambda query, df: handle_golf_search(query, df),
+    }
+    queries = ["championnat du monde bwf", "jeux européens", "masters de paris", "paris", "uber cup",
+               "jeux olympiques", "solheim cup", "evian championship", "open", "cup"]
+
+    old = _load(frames, path, store, 1_000_000)
+    for sheet, search in searches.items():
+        for query in queries:
+            search(query, old[sheet])
+
+    new = _load(dict(frames, Badminton=badminton, Golf=golf), path, store, 2_000_000)
+    diff = diff_workbook(old, new)["sheets"]
+    # Discipline changée : la ligne sort sous son ancienne clé et revient sous la nouvelle
+    counts = {sheet: tuple(len(diff[sheet][kind]) for kind in ("added", "removed", "modified")) for sheet in searches}
+    assert counts == {"Badminton": (2, 2, 1), "Golf": (1, 1, 2)}
+
+    for sheet, search in searches.items():
+        for query in queries:
+            assert search(query, new[sheet]) == search(query, _rebuilt(new[sheet])), (sheet, query)
+    assert search("evian championship", new["Golf"]) != search("evian championship", old["Golf"])